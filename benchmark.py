@@ -0,0 +1,623 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Banco de pruebas de velocidad de descarga sin conexión a Internet
+Levanta un servidor HTTP local con medios sintéticos y descarga con el mismo
+camino que script.py (pool de YoutubeDL, limitador, descarga segmentada y
+conversión de audio) a través del extractor genérico de yt-dlp.
+También graba las peticiones HTTP de una extracción en casetes y las reproduce
+para medir por fases el camino de metadatos sin acceder a las plataformas.
+Requiere: pip install yt-dlp y ffmpeg en el PATH
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+
+import script
+
+PERFILES_BENCHMARK = {
+    'video': ('youtube-video', 'video'),
+    'mp3': ('youtube-mp3', 'audio'),
+    'wav': ('youtube-wav', 'audio'),
+}
+
+# ===================== MEDIOS SINTÉTICOS =====================
+def nombre_medio(clase, tamano_mb):
+    """Nombre del archivo sintético de una clase ('video' o 'audio') y tamaño"""
+    return f"{clase}-{tamano_mb}.mp4" if clase == 'video' else f"{clase}-{tamano_mb}.m4a"
+
+def generar_medio(ffmpeg, carpeta, clase, tamano_mb):
+    """Genera con ffmpeg un medio sintético de aproximadamente tamano_mb MiB
+    
+    El video lleva ruido temporal para que el codificador no pueda comprimirlo
+    por debajo de la tasa pedida. Los archivos se reutilizan entre ejecuciones.
+    """
+    import subprocess
+    
+    ruta = os.path.join(carpeta, nombre_medio(clase, tamano_mb))
+    if os.path.exists(ruta):
+        return ruta
+    
+    bits = tamano_mb * 1048576 * 8
+    if clase == 'video':
+        duracion = max(2.0, bits / 8128000)
+        comando = [
+            ffmpeg, '-y', '-hide_banner', '-loglevel', 'error',
+            '-f', 'lavfi', '-i', 'testsrc2=size=640x360:rate=25',
+            '-f', 'lavfi', '-i', 'sine=frequency=440:sample_rate=48000',
+            '-t', f'{duracion:.2f}', '-vf', 'noise=alls=60:allf=t',
+            '-c:v', 'mpeg4', '-b:v', '8000k', '-minrate', '8000k', '-maxrate', '8000k', '-bufsize', '4000k',
+            '-c:a', 'aac', '-b:a', '128k', '-movflags', '+faststart',
+        ]
+    else:
+        duracion = max(2.0, bits / 256000)
+        comando = [
+            ffmpeg, '-y', '-hide_banner', '-loglevel', 'error',
+            '-f', 'lavfi', '-i', 'anoisesrc=color=pink:amplitude=0.3:sample_rate=48000',
+            '-t', f'{duracion:.2f}', '-c:a', 'aac', '-b:a', '256k', '-movflags', '+faststart',
+        ]
+    
+    temporal = ruta + '.part' + os.path.splitext(ruta)[1]
+    subprocess.run(comando + [temporal], check=True)
+    os.replace(temporal, ruta)
+    return ruta
+
+# ===================== SERVIDOR LOCAL =====================
+def crear_servidor(carpeta, rangos=True, latencia=0.0, ancho_banda=None):
+    """Crea un servidor HTTP local que sirve los medios de una carpeta
+    
+    latencia son los segundos de espera antes de cada respuesta y ancho_banda
+    el límite en bytes por segundo de cada conexión (None sin límite). Sin
+    rangos se ignoran las cabeceras Range y se envía siempre el archivo completo.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    import re
+    
+    bloque = 64 * 1024
+    
+    class ManejadorMedios(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        
+        def log_message(self, formato, *args):
+            pass
+        
+        def do_HEAD(self):
+            self.responder(cuerpo=False)
+        
+        def do_GET(self):
+            self.responder(cuerpo=True)
+        
+        def responder(self, cuerpo):
+            nombre = os.path.basename(self.path.split('?', 1)[0])
+            ruta = os.path.join(carpeta, nombre)
+            if not nombre or not os.path.isfile(ruta):
+                self.send_error(404)
+                return
+            
+            if latencia:
+                time.sleep(latencia)
+            
+            total = os.path.getsize(ruta)
+            inicio, fin = 0, total - 1
+            coincidencia = re.match(r'bytes=(\d*)-(\d*)$', self.headers.get('Range') or '')
+            parcial = rangos and coincidencia and (coincidencia.group(1) or coincidencia.group(2))
+            if parcial:
+                if coincidencia.group(1):
+                    inicio = int(coincidencia.group(1))
+                    if coincidencia.group(2):
+                        fin = min(int(coincidencia.group(2)), total - 1)
+                else:
+                    inicio = max(0, total - int(coincidencia.group(2)))
+                if inicio >= total or inicio > fin:
+                    self.send_response(416)
+                    self.send_header('Content-Range', f'bytes */{total}')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+            
+            self.send_response(206 if parcial else 200)
+            self.send_header('Content-Type', 'video/mp4' if nombre.endswith('.mp4') else 'audio/mp4')
+            self.send_header('Content-Length', str(fin - inicio + 1))
+            if rangos:
+                self.send_header('Accept-Ranges', 'bytes')
+            if parcial:
+                self.send_header('Content-Range', f'bytes {inicio}-{fin}/{total}')
+            self.end_headers()
+            if not cuerpo:
+                return
+            
+            comienzo = time.monotonic()
+            enviado = 0
+            try:
+                with open(ruta, 'rb') as archivo:
+                    archivo.seek(inicio)
+                    pendiente = fin - inicio + 1
+                    while pendiente > 0:
+                        datos = archivo.read(min(bloque, pendiente))
+                        if not datos:
+                            break
+                        self.wfile.write(datos)
+                        pendiente -= len(datos)
+                        enviado += len(datos)
+                        if ancho_banda:
+                            adelanto = enviado / ancho_banda - (time.monotonic() - comienzo)
+                            if adelanto > 0:
+                                time.sleep(adelanto)
+            except (BrokenPipeError, ConnectionResetError):
+                # El extractor genérico cierra la conexión tras leer las cabeceras
+                self.close_connection = True
+    
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), ManejadorMedios)
+    servidor.daemon_threads = True
+    return servidor
+
+# ===================== EJECUCIÓN DE UNA CONFIGURACIÓN =====================
+def uso_recursos():
+    """Devuelve (segundos de CPU, RSS máximo propio, RSS máximo de los hijos) en bytes
+    
+    El RSS de los hijos es el del mayor de ellos (ffmpeg); en Linux parte del
+    tamaño del proceso en el momento del fork. En Windows no existe el módulo
+    resource y solo se mide el tiempo de CPU propio.
+    """
+    try:
+        import resource
+    except ImportError:
+        tiempos = os.times()
+        return tiempos.user + tiempos.system, None, None
+    
+    propio = resource.getrusage(resource.RUSAGE_SELF)
+    hijos = resource.getrusage(resource.RUSAGE_CHILDREN)
+    escala = 1 if sys.platform == 'darwin' else 1024
+    cpu = propio.ru_utime + propio.ru_stime + hijos.ru_utime + hijos.ru_stime
+    return cpu, propio.ru_maxrss * escala, hijos.ru_maxrss * escala
+
+def ejecutar_configuracion(configuracion):
+    """Descarga los archivos de una configuración y mide velocidad, CPU y memoria
+    
+    Se ejecuta en un proceso hijo por configuración para que el RSS máximo y el
+    tiempo de CPU (incluido el de ffmpeg) no se mezclen entre configuraciones.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    import shutil
+    import tempfile
+    
+    perfil = PERFILES_BENCHMARK[configuracion['perfil']][0]
+    concurrencia = configuracion['concurrencia']
+    
+    script.DESCARGA_SEGMENTADA['segmentos'] = max(1, configuracion['segmentos'])
+    script.AUDIO_EN_FLUJO['activo'] = configuracion['audio_en_flujo']
+    # El servidor local no tiene límite de peticiones
+    script.LIMITES_PLATAFORMA['desconocida'] = {
+        'tasa': 1000.0, 'tasa_min': 1000.0, 'tasa_max': 1000.0,
+        'rafaga': 1000, 'concurrencia': max(1, concurrencia),
+    }
+    
+    carpeta = tempfile.mkdtemp(prefix='avd-benchmark-')
+    cpu_inicial = uso_recursos()[0]
+    inicio = time.monotonic()
+    
+    def descargar(indice):
+        url = f"{configuracion['url']}?copia={indice}"
+        outtmpl = os.path.join(carpeta, f"archivo_{indice:03d}.%(ext)s")
+        resultado = script.descargar_con_info(url, perfil, outtmpl, silencioso=True)
+        return resultado['metricas']['bytes']
+    
+    try:
+        with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+            transferido = sum(pool.map(descargar, range(configuracion['archivos'])))
+        duracion = time.monotonic() - inicio
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+        script.pool_ydl.cerrar()
+    
+    cpu, rss, rss_hijos = uso_recursos()
+    return {
+        'perfil': configuracion['perfil'],
+        'tamano_mb': configuracion['tamano_mb'],
+        'concurrencia': concurrencia,
+        'archivos': configuracion['archivos'],
+        'bytes': transferido,
+        'duracion_s': round(duracion, 3),
+        'mb_s': round(transferido / 1048576 / duracion, 2) if duracion else None,
+        'cpu_s': round(cpu - cpu_inicial, 3),
+        'rss_max_mb': rss and round(rss / 1048576, 1),
+        'rss_max_hijos_mb': rss_hijos and round(rss_hijos / 1048576, 1),
+    }
+
+def medir_en_subproceso(configuracion):
+    """Ejecuta una configuración en un proceso hijo y devuelve su resultado"""
+    import subprocess
+    
+    proceso = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--configuracion', json.dumps(configuracion)],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    lineas = proceso.stdout.strip().splitlines()
+    if proceso.returncode != 0 or not lineas:
+        error = (proceso.stderr.strip().splitlines() or ['sin salida'])[-1]
+        return {**configuracion, 'error': error}
+    return json.loads(lineas[-1])
+
+# ===================== CASETES DE EXTRACCIÓN =====================
+FASES_EXTRACCION = ('creacion', 'extraccion', 'procesado', 'sanitizado', 'red')
+
+def carpeta_casetes():
+    """Carpeta por defecto de los casetes grabados"""
+    return os.path.join(script.carpeta_cache(), 'casetes')
+
+def ruta_casete(carpeta, url):
+    import hashlib
+    
+    return os.path.join(carpeta, hashlib.sha1(url.encode('utf-8')).hexdigest()[:16] + '.json')
+
+_clase_casete = None
+
+def clase_casete():
+    """Devuelve la subclase de YoutubeDL que graba o reproduce las peticiones HTTP
+    
+    Sin casete las peticiones van a la red y se guardan en self.intercambios;
+    con un casete se responden desde él sin tocar la red. Cada petición se busca
+    por método, URL y cuerpo, y si no aparece (parámetros con marcas de tiempo,
+    por ejemplo) se usa el primer intercambio libre con el mismo método y ruta.
+    En self.tiempo_red se acumula el tiempo pasado dentro de urlopen.
+    """
+    global _clase_casete
+    if _clase_casete is not None:
+        return _clase_casete
+    
+    import base64
+    import hashlib
+    import io
+    from email.message import Message
+    from yt_dlp.networking import Request
+    from yt_dlp.networking.common import Response
+    from yt_dlp.networking.exceptions import HTTPError, RequestError
+    
+    def huella_datos(datos):
+        return hashlib.sha1(datos).hexdigest() if isinstance(datos, bytes) else None
+    
+    def respuesta_de(intercambio):
+        cabeceras = Message()
+        for nombre, valor in intercambio['cabeceras']:
+            cabeceras[nombre] = valor
+        return Response(io.BytesIO(base64.b64decode(intercambio['cuerpo'])), intercambio['url_final'],
+                        cabeceras, status=intercambio['estado'], reason=intercambio['razon'])
+    
+    class YoutubeDLCasete(script.clase_youtube_dl()):
+        def __init__(self, params=None, casete=None):
+            self.casete = casete
+            self.intercambios = []
+            self.tiempo_red = 0.0
+            self._libres = list(casete['intercambios']) if casete else []
+            super().__init__(params)
+        
+        def urlopen(self, req):
+            if isinstance(req, str):
+                req = Request(req)
+            inicio = time.perf_counter()
+            try:
+                if self.casete is not None:
+                    return self._reproducir(req)
+                return self._grabar(req)
+            finally:
+                self.tiempo_red += time.perf_counter() - inicio
+        
+        def _grabar(self, req):
+            error = None
+            try:
+                respuesta = super().urlopen(req)
+            except HTTPError as e:
+                respuesta, error = e.response, e
+            
+            # De los medios solo se guarda el principio: los extractores no leen más
+            tipo = respuesta.headers.get('Content-Type') or ''
+            cuerpo = respuesta.read(64 * 1024) if tipo.startswith(('video/', 'audio/')) else respuesta.read()
+            
+            # El cuerpo ya viene descomprimido, así que sobran esas cabeceras
+            intercambio = {
+                'metodo': req.method,
+                'url': req.url,
+                'datos': huella_datos(req.data),
+                'url_final': respuesta.url,
+                'estado': respuesta.status,
+                'razon': respuesta.reason,
+                'cabeceras': [(nombre, valor) for nombre, valor in respuesta.headers.items()
+                              if nombre.lower() not in ('content-encoding', 'content-length',
+                                                        'transfer-encoding')],
+                'cuerpo': base64.b64encode(cuerpo).decode('ascii'),
+            }
+            respuesta.close()
+            self.intercambios.append(intercambio)
+            
+            if error is not None:
+                raise HTTPError(respuesta_de(intercambio))
+            return respuesta_de(intercambio)
+        
+        def _reproducir(self, req):
+            ruta = req.url.split('?', 1)[0]
+            datos = huella_datos(req.data)
+            elegido = next((i for i in self._libres if i['metodo'] == req.method
+                            and i['url'] == req.url and i['datos'] == datos), None)
+            if elegido is None:
+                elegido = next((i for i in self._libres if i['metodo'] == req.method
+                                and i['url'].split('?', 1)[0] == ruta), None)
+            if elegido is None:
+                raise RequestError(f"La petición no está en el casete: {req.method} {req.url}")
+            
+            self._libres.remove(elegido)
+            respuesta = respuesta_de(elegido)
+            if respuesta.status >= 400:
+                raise HTTPError(respuesta)
+            return respuesta
+    
+    _clase_casete = YoutubeDLCasete
+    return _clase_casete
+
+def opciones_extraccion():
+    """Opciones del perfil de sondeo de script.py sin la caché en disco de yt-dlp
+    
+    Sin caché cada extracción hace todo el trabajo (p. ej. descifrar el
+    reproductor de YouTube), igual que la primera vez en una máquina nueva.
+    """
+    return {**script.opciones_perfil('metadata-probe'), 'cachedir': False}
+
+def grabar_casete(url, carpeta):
+    """Extrae la información de una URL grabando todas sus peticiones HTTP en un casete"""
+    import yt_dlp
+    
+    ydl = clase_casete()(opciones_extraccion())
+    try:
+        info = ydl.extract_info(url, download=False)
+    finally:
+        ydl.close()
+    if info is None:
+        print(f"❌ No se pudo extraer la información de: {url}")
+        return None
+    
+    script.crear_carpeta_si_no_existe(carpeta)
+    ruta = ruta_casete(carpeta, url)
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump({
+            'url': url,
+            'titulo': info.get('title'),
+            'grabado': time.time(),
+            'yt_dlp': yt_dlp.version.__version__,
+            'intercambios': ydl.intercambios,
+        }, archivo, ensure_ascii=False)
+    print(f"📼 {len(ydl.intercambios)} peticiones grabadas en: {ruta}")
+    return ruta
+
+def medir_extraccion(casete, memoria=False):
+    """Reproduce una extracción completa y devuelve las mediciones de cada fase
+    
+    Las fases son las del camino de metadatos de script.py: crear la instancia,
+    extraer (process=False), procesar formatos y sanear la información. El tiempo
+    de red (la reproducción del casete) se descuenta de cada fase y se da aparte.
+    Con memoria=True se mide con tracemalloc el pico de memoria y los bloques
+    que quedan reservados al terminar cada fase; tracemalloc ralentiza mucho, por
+    eso va en una pasada aparte de las de tiempo.
+    """
+    import tracemalloc
+    
+    mediciones = {fase: {'s': 0.0} for fase in FASES_EXTRACCION}
+    ydl = None
+    
+    def contar_bloques():
+        return sum(estadistica.count for estadistica in tracemalloc.take_snapshot().statistics('filename'))
+    
+    def fase(nombre, funcion):
+        red_antes = ydl.tiempo_red if ydl is not None else 0.0
+        if memoria:
+            bloques_antes = contar_bloques()
+            tracemalloc.reset_peak()
+            memoria_antes = tracemalloc.get_traced_memory()[0]
+        inicio = time.perf_counter()
+        resultado = funcion()
+        duracion = time.perf_counter() - inicio
+        if memoria:
+            mediciones[nombre]['pico_kib'] = round((tracemalloc.get_traced_memory()[1] - memoria_antes) / 1024, 1)
+            mediciones[nombre]['bloques'] = contar_bloques() - bloques_antes
+        red = (ydl.tiempo_red if ydl is not None else 0.0) - red_antes
+        mediciones[nombre]['s'] = duracion - red
+        mediciones['red']['s'] += red
+        return resultado
+    
+    if memoria:
+        tracemalloc.start()
+    try:
+        ydl = fase('creacion', lambda: clase_casete()(opciones_extraccion(), casete=casete))
+        info = fase('extraccion', lambda: ydl.extract_info(casete['url'], download=False, process=False))
+        if info is None:
+            raise RuntimeError("La extracción falló al reproducir el casete")
+        info = fase('procesado', lambda: ydl.process_ie_result(info, download=False))
+        fase('sanitizado', lambda: ydl.sanitize_info(info, remove_private_keys=True))
+    finally:
+        if ydl is not None:
+            ydl.close()
+        if memoria:
+            tracemalloc.stop()
+    return mediciones
+
+def benchmark_extraccion(rutas, repeticiones):
+    """Mide la extracción de cada casete y muestra los tiempos y reservas por fase"""
+    import statistics
+    
+    resultados = []
+    for ruta in rutas:
+        with open(ruta, encoding='utf-8') as archivo:
+            casete = json.load(archivo)
+        print(f"📼 {casete.get('titulo') or casete['url']} ({len(casete['intercambios'])} peticiones)")
+        
+        try:
+            # La primera pasada importa los extractores y calienta las cachés internas
+            primera = medir_extraccion(casete)
+            pasadas = [medir_extraccion(casete) for _ in range(repeticiones)]
+            memoria = medir_extraccion(casete, memoria=True)
+        except Exception as e:
+            print(f"   ❌ {e}")
+            resultados.append({'casete': ruta, 'url': casete['url'], 'error': str(e)})
+            continue
+        
+        print(f"   {'Fase':<11} {'Media ms':>9} {'Mediana':>9} {'Mín.':>9} {'Pico KiB':>9} {'Bloques':>9}")
+        fases = {}
+        for nombre in FASES_EXTRACCION:
+            tiempos = [pasada[nombre]['s'] * 1000 for pasada in pasadas]
+            fases[nombre] = {
+                'primera_ms': round(primera[nombre]['s'] * 1000, 3),
+                'media_ms': round(statistics.mean(tiempos), 3),
+                'mediana_ms': round(statistics.median(tiempos), 3),
+                'minimo_ms': round(min(tiempos), 3),
+                'pico_kib': memoria[nombre].get('pico_kib'),
+                'bloques': memoria[nombre].get('bloques'),
+            }
+            f = fases[nombre]
+            print(f"   {nombre:<11} {f['media_ms']:>9.2f} {f['mediana_ms']:>9.2f} {f['minimo_ms']:>9.2f} "
+                  f"{f['pico_kib'] if f['pico_kib'] is not None else '-':>9} "
+                  f"{f['bloques'] if f['bloques'] is not None else '-':>9}")
+        total = sum(pasada[nombre]['s'] for pasada in pasadas for nombre in FASES_EXTRACCION) / repeticiones
+        primera_total = sum(primera[nombre]['s'] for nombre in FASES_EXTRACCION)
+        print(f"   Total: {total * 1000:.2f} ms por extracción (primera: {primera_total * 1000:.2f} ms)")
+        resultados.append({'casete': ruta, 'url': casete['url'], 'repeticiones': repeticiones, 'fases': fases})
+    return resultados
+
+# ===================== PROGRAMA PRINCIPAL =====================
+def lista_enteros(texto):
+    return [int(valor) for valor in texto.split(',') if valor.strip()]
+
+def parsear_argumentos(argv=None):
+    """Define y procesa los argumentos de línea de comandos"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        description="Mide la velocidad de descarga de script.py contra un servidor local "
+                    "con medios sintéticos (sin acceso a Internet).")
+    parser.add_argument('--perfiles', default='video,mp3,wav',
+                        help="Perfiles a medir separados por comas: video, mp3, wav (por defecto: todos)")
+    parser.add_argument('--tamanos', type=lista_enteros, default=[8, 32], metavar='MB,...',
+                        help="Tamaños de los archivos sintéticos en MiB (por defecto: 8,32)")
+    parser.add_argument('--concurrencia', type=lista_enteros, default=[1, 4], metavar='N,...',
+                        help="Niveles de concurrencia a medir (por defecto: 1,4)")
+    parser.add_argument('--archivos', type=int, default=8, metavar='N',
+                        help="Descargas por medición (por defecto: 8)")
+    parser.add_argument('--latencia-ms', type=float, default=0.0, metavar='MS',
+                        help="Latencia añadida por el servidor antes de cada respuesta")
+    parser.add_argument('--ancho-banda', type=float, default=None, metavar='MB/S',
+                        help="Límite de ancho de banda por conexión del servidor en MiB/s")
+    parser.add_argument('--sin-rangos', action='store_true',
+                        help="El servidor ignora las cabeceras Range")
+    parser.add_argument('--segmentos', type=int, default=script.DESCARGA_SEGMENTADA['segmentos'], metavar='N',
+                        help="Conexiones por archivo para la descarga segmentada (1 para desactivar)")
+    parser.add_argument('--audio-en-flujo', action='store_true',
+                        help="Convierte el audio con ffmpeg mientras se descarga")
+    parser.add_argument('--grabar', metavar='URL', action='append', default=[],
+                        help="Graba en un casete las peticiones HTTP de la extracción de una URL "
+                             "(necesita conexión). Se puede repetir")
+    parser.add_argument('--extraccion', action='store_true',
+                        help="Mide la extracción de información reproduciendo los casetes grabados")
+    parser.add_argument('--casetes', metavar='CARPETA', default=None,
+                        help="Carpeta de los casetes (por defecto en la carpeta de caché del usuario)")
+    parser.add_argument('--repeticiones', type=int, default=20, metavar='N',
+                        help="Extracciones por casete con --extraccion (por defecto: 20)")
+    parser.add_argument('--salida', metavar='ARCHIVO',
+                        help="Guarda los resultados en formato JSON")
+    parser.add_argument('--configuracion', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+def mostrar_encabezado():
+    print(f"{'Perfil':<7} {'MiB':>5} {'Conc.':>5} {'MB/s':>8} {'CPU s':>8} {'RSS MB':>8} {'ffmpeg MB':>10}")
+    print("-" * 57)
+
+def mostrar_resultado(r):
+    """Imprime la fila de resultados de una configuración"""
+    if r.get('error'):
+        print(f"{r['perfil']:<7} {r['tamano_mb']:>5} {r['concurrencia']:>5}   ❌ {r['error']}")
+        return
+    print(f"{r['perfil']:<7} {r['tamano_mb']:>5} {r['concurrencia']:>5} {r['mb_s']:>8} "
+          f"{r['cpu_s']:>8} {r['rss_max_mb'] or '-':>8} {r['rss_max_hijos_mb'] or '-':>10}")
+
+def benchmark_descargas(args):
+    """Mide las descargas de cada perfil, tamaño y concurrencia contra el servidor local"""
+    perfiles = [p.strip() for p in args.perfiles.split(',') if p.strip()]
+    for perfil in perfiles:
+        if perfil not in PERFILES_BENCHMARK:
+            print(f"❌ Perfil desconocido: {perfil} (usa {', '.join(PERFILES_BENCHMARK)})")
+            return None
+    
+    ffmpeg = script.sondear_capacidades()['ffmpeg']['ruta']
+    if not ffmpeg:
+        print("❌ ffmpeg no está instalado; hace falta para generar los medios sintéticos")
+        return None
+    
+    carpeta_medios = os.path.join(script.carpeta_cache(), 'benchmark')
+    script.crear_carpeta_si_no_existe(carpeta_medios)
+    print("🎞️  Preparando medios sintéticos...")
+    for clase in sorted({PERFILES_BENCHMARK[p][1] for p in perfiles}):
+        for tamano in args.tamanos:
+            generar_medio(ffmpeg, carpeta_medios, clase, tamano)
+    
+    servidor = crear_servidor(carpeta_medios, rangos=not args.sin_rangos,
+                              latencia=args.latencia_ms / 1000,
+                              ancho_banda=args.ancho_banda and args.ancho_banda * 1048576)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{servidor.server_address[1]}/media"
+    print(f"🌐 Servidor local en {base}")
+    print()
+    mostrar_encabezado()
+    
+    resultados = []
+    try:
+        for perfil in perfiles:
+            for tamano in args.tamanos:
+                for concurrencia in args.concurrencia:
+                    configuracion = {
+                        'perfil': perfil,
+                        'tamano_mb': tamano,
+                        'concurrencia': concurrencia,
+                        'archivos': args.archivos,
+                        'segmentos': args.segmentos,
+                        'audio_en_flujo': args.audio_en_flujo,
+                        'url': f"{base}/{nombre_medio(PERFILES_BENCHMARK[perfil][1], tamano)}",
+                    }
+                    resultado = medir_en_subproceso(configuracion)
+                    resultados.append(resultado)
+                    mostrar_resultado(resultado)
+    finally:
+        servidor.shutdown()
+    
+    return resultados
+
+def main(argv=None):
+    args = parsear_argumentos(argv)
+    
+    if args.configuracion:
+        print(json.dumps(ejecutar_configuracion(json.loads(args.configuracion))))
+        return 0
+    
+    carpeta = args.casetes or carpeta_casetes()
+    if args.grabar:
+        rutas = [grabar_casete(url, carpeta) for url in args.grabar]
+        return 0 if all(rutas) else 1
+    
+    if args.extraccion:
+        rutas = sorted(os.path.join(carpeta, nombre) for nombre in os.listdir(carpeta)
+                       if nombre.endswith('.json')) if os.path.isdir(carpeta) else []
+        if not rutas:
+            print(f"❌ No hay casetes en {carpeta}; grábalos antes con --grabar URL")
+            return 1
+        resultados = benchmark_extraccion(rutas, max(1, args.repeticiones))
+    else:
+        resultados = benchmark_descargas(args)
+        if resultados is None:
+            return 1
+    
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            json.dump(resultados, archivo, ensure_ascii=False, indent=2)
+        print(f"📋 Resultados guardados en: {os.path.abspath(args.salida)}")
+    
+    return 0 if not any(r.get('error') for r in resultados) else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,11 +6,22 @@ Usa yt-dlp para todas las plataformas (más estable y confiable)
 Requiere: pip install yt-dlp
 """
 
+import time
+
+_inicio_importacion = time.perf_counter()
+
 import os
 import sys
 import re
+import json
+import atexit
+import threading
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
 from pathlib import Path
 
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
 def crear_carpeta_si_no_existe(ruta):
     """Crea la carpeta de destino si no existe"""
     try:
@@ -20,16 +31,9 @@ def crear_carpeta_si_no_existe(ruta):
         print(f"Error al crear la carpeta: {e}")
         return False
 
-def detectar_plataforma(url):
-    """Detecta si la URL es de YouTube, Facebook o Instagram"""
-    if re.search(r'(youtube\.com|youtu\.be)', url.lower()):
-        return 'youtube'
-    elif re.search(r'(facebook\.com|fb\.watch|fb\.me)', url.lower()):
-        return 'facebook'
-    elif re.search(r'(instagram\.com|instagr\.am)', url.lower()):
-        return 'instagram'
-    else:
-        return 'desconocida'
+def carpeta_descargas_por_defecto():
+    """Devuelve la carpeta de Descargas del usuario"""
+    return os.path.join(str(Path.home()), "Downloads")
 
 def limpiar_nombre_archivo(nombre):
     """Limpia caracteres no válidos del nombre del archivo"""
@@ -38,601 +42,4556 @@ def limpiar_nombre_archivo(nombre):
         nombre = nombre.replace(char, '_')
     return nombre
 
-# ===================== FUNCIONES PARA YOUTUBE =====================
+# ===================== CLASIFICACIÓN DE URLS =====================
+
+UrlClasificada = namedtuple('UrlClasificada', 'plataforma tipo id_canonico url_canonica')
+
+# Una sola expresión para todas las formas de URL conocidas. Cada alternativa
+# tiene un único grupo con nombre (el id), así que lastgroup indica qué forma
+# coincidió; las últimas alternativas solo reconocen el dominio.
+PATRON_URL = re.compile(r"""
+    \s*(?:[a-z][a-z0-9+.-]*://)?(?:[^/?#@\s]*@)?(?:[a-z0-9-]+\.)*
+    (?:
+        youtu\.be/(?P<yt_corto>[\w-]{11})(?![\w-])
+      | youtube(?:-nocookie)?\.com/
+        (?:
+            (?:watch/?\?(?:[^#]*?&)?v=|embed/|v/|e/)(?P<yt_video>[\w-]{11})(?![\w-])
+          | shorts/(?P<yt_short>[\w-]{11})(?![\w-])
+          | live/(?P<yt_directo>[\w-]{11})(?![\w-])
+          | playlist\?(?:[^#]*?&)?list=(?P<yt_lista>[\w-]+)
+          | @(?P<yt_handle>[\w.%-]+)
+          | channel/(?P<yt_canal>UC[\w-]{22})
+          | c/(?P<yt_c>[\w.%-]+)
+          | user/(?P<yt_usuario>[\w.%-]+)
+        )
+      | fb\.watch/(?P<fb_corto>[\w-]+)
+      | (?:facebook|fb)\.com/
+        (?:
+            (?:watch/?\?(?:[^#]*?&)?v=|video\.php\?(?:[^#]*?&)?v=|[^?#]*?/videos/(?:[^/?#]+/)?)(?P<fb_video>\d+)
+          | reel/(?P<fb_reel>\d+)
+          | share/(?P<fb_compartido>[rv]/[\w-]+)
+        )
+      | (?:instagram\.com|instagr\.am)/(?:[\w.]+/)?
+        (?:
+            p/(?P<ig_post>[\w-]+)
+          | reels?/(?P<ig_reel>[\w-]+)
+          | tv/(?P<ig_tv>[\w-]+)
+        )
+      | (?P<youtube>youtube(?:-nocookie)?\.com|youtu\.be)(?![\w.-])
+      | (?P<facebook>facebook\.com|fb\.watch|fb\.me|fb\.com)(?![\w.-])
+      | (?P<instagram>instagram\.com|instagr\.am)(?![\w.-])
+    )
+""", re.I | re.X)
+
+# grupo -> (plataforma, tipo de contenido, plantilla de la URL canónica, el grupo es el id)
+FORMAS_URL = {
+    'yt_corto': ('youtube', 'video', 'https://www.youtube.com/watch?v={}', True),
+    'yt_video': ('youtube', 'video', 'https://www.youtube.com/watch?v={}', True),
+    'yt_short': ('youtube', 'short', 'https://www.youtube.com/watch?v={}', True),
+    'yt_directo': ('youtube', 'directo', 'https://www.youtube.com/watch?v={}', True),
+    'yt_lista': ('youtube', 'lista', 'https://www.youtube.com/playlist?list={}', True),
+    'yt_handle': ('youtube', 'canal', 'https://www.youtube.com/@{}', True),
+    'yt_canal': ('youtube', 'canal', 'https://www.youtube.com/channel/{}', True),
+    'yt_c': ('youtube', 'canal', 'https://www.youtube.com/c/{}', True),
+    'yt_usuario': ('youtube', 'canal', 'https://www.youtube.com/user/{}', True),
+    'fb_corto': ('facebook', 'video', 'https://fb.watch/{}/', False),
+    'fb_video': ('facebook', 'video', 'https://www.facebook.com/watch/?v={}', True),
+    'fb_reel': ('facebook', 'reel', 'https://www.facebook.com/reel/{}', True),
+    'fb_compartido': ('facebook', 'video', 'https://www.facebook.com/share/{}/', False),
+    # En Instagram posts, reels y videos comparten el código corto
+    'ig_post': ('instagram', 'post', 'https://www.instagram.com/p/{}/', True),
+    'ig_reel': ('instagram', 'reel', 'https://www.instagram.com/p/{}/', True),
+    'ig_tv': ('instagram', 'video', 'https://www.instagram.com/p/{}/', True),
+}
+
+def clasificar_url(url, _buscar=PATRON_URL.match, _formas=FORMAS_URL):
+    """Devuelve UrlClasificada(plataforma, tipo, id_canonico, url_canonica) sin acceder a la red
+    
+    tipo es 'video', 'short', 'directo', 'reel', 'post', 'lista', 'canal' o
+    'desconocido'. Si la URL no lleva el id (fb.watch, enlaces de compartir) o
+    no es de una forma conocida, id_canonico es None y url_canonica es la URL
+    sin espacios. La plataforma es 'desconocida' si no es de ninguna soportada.
+    """
+    coincidencia = _buscar(url)
+    if coincidencia is None:
+        return UrlClasificada('desconocida', 'desconocido', None, url.strip())
+    
+    grupo = coincidencia.lastgroup
+    forma = _formas.get(grupo)
+    if forma is None:
+        return UrlClasificada(grupo, 'desconocido', None, url.strip())
+    
+    plataforma, tipo, plantilla, es_id = forma
+    valor = coincidencia.group(grupo)
+    return UrlClasificada(plataforma, tipo, valor if es_id else None, plantilla.format(valor))
+
+def clave_url(clasificada):
+    """Clave para reconocer el mismo contenido en distintas formas de URL"""
+    if clasificada.id_canonico is not None:
+        return (clasificada.plataforma, clasificada.tipo in ('lista', 'canal') and clasificada.tipo,
+                clasificada.id_canonico)
+    return clasificada.url_canonica
+
+def clasificar_urls(urls):
+    """Clasifica muchas URLs, repitiendo el resultado de las que aparecen varias veces
+    
+    Las URLs idénticas (frecuentes en volcados masivos) se clasifican una sola vez.
+    """
+    vistas = {}
+    buscar, formas = PATRON_URL.match, FORMAS_URL
+    resultado = []
+    for url in urls:
+        clasificada = vistas.get(url)
+        if clasificada is None:
+            clasificada = vistas[url] = clasificar_url(url, buscar, formas)
+        resultado.append(clasificada)
+    return resultado
+
+def deduplicar_urls(urls):
+    """Quita las URLs que apuntan al mismo contenido, sin acceder a la red
+    
+    Devuelve (únicas, duplicadas): únicas es una lista de (url original,
+    UrlClasificada) en el orden de la primera aparición y duplicadas es un
+    diccionario url repetida -> url original que se conserva.
+    """
+    unicas = []
+    duplicadas = {}
+    primera = {}
+    urls = list(urls)
+    for url, clasificada in zip(urls, clasificar_urls(urls)):
+        clave = clave_url(clasificada)
+        if clave in primera:
+            duplicadas[url] = primera[clave]
+        else:
+            primera[clave] = url
+            unicas.append((url, clasificada))
+    return unicas, duplicadas
+
+def detectar_plataforma(url):
+    """Detecta si la URL es de YouTube, Facebook o Instagram"""
+    return clasificar_url(url).plataforma
+
+def identificar_video(url):
+    """Devuelve (plataforma, id del video) a partir de la URL, sin acceder a la red
+    
+    Si el id no aparece en la URL (p. ej. fb.watch) se busca en los alias del
+    archivo de descargas; si tampoco está, el id es None.
+    """
+    clasificada = clasificar_url(url)
+    if clasificada.id_canonico is not None and clasificada.tipo not in ('lista', 'canal'):
+        return clasificada.plataforma, clasificada.id_canonico
+    
+    if archivo_descargas is not None:
+        alias = archivo_descargas.resolver_alias(url)
+        if alias:
+            return alias
+    return clasificada.plataforma, None
+
+# ===================== DESCARGA SEGMENTADA =====================
+
+# segmentos: conexiones simultáneas por archivo (1 desactiva la descarga segmentada)
+# umbral: tamaño mínimo para segmentar; bloque: tamaño de cada lectura
+DESCARGA_SEGMENTADA = {
+    'segmentos': 4,
+    'umbral': 8 * 1024 * 1024,
+    'bloque': 1024 * 1024,
+}
+
+# Video y audio en pistas separadas (DASH): se descargan a la vez, cada una con
+# varios fragmentos simultáneos, y ffmpeg las une copiando los flujos
+DESCARGA_PISTAS = {
+    'paralelo': True,
+    'fragmentos': 4,
+}
+
+def admite_descarga_segmentada(info, nombre):
+    """Indica si un formato es un archivo progresivo HTTP que conviene segmentar"""
+    if DESCARGA_SEGMENTADA['segmentos'] <= 1 or nombre == '-':
+        return False
+    if info.get('protocol', 'https') not in ('http', 'https') or info.get('fragments'):
+        return False
+    if not info.get('url') or info.get('is_live'):
+        return False
+    # Los tramos de tiempo los descarga ffmpeg pidiendo solo los rangos necesarios
+    if info.get('section_start') or info.get('section_end'):
+        return False
+    
+    tamano = info.get('filesize') or info.get('filesize_approx')
+    # Sin tamaño conocido se decide tras la petición de prueba
+    return tamano is None or tamano >= DESCARGA_SEGMENTADA['umbral']
+
+def abrir_rango_http(ydl, url, cabeceras, inicio, fin):
+    """Pide un rango de bytes usando la red de yt-dlp (cookies, proxy, cabeceras)"""
+    from yt_dlp.networking import Request
+    
+    return ydl.urlopen(Request(url, headers={**cabeceras, 'Range': f'bytes={inicio}-{fin}'}))
+
+def notificar_progreso(ydl, estado, info):
+    """Llama a los progress_hooks de yt-dlp desde un descargador propio"""
+    estado = {**estado, 'info_dict': info}
+    for hook in getattr(ydl, '_progress_hooks', []):
+        hook(estado)
+
+def _leer_estado_segmentos(ruta_estado, total):
+    """Carga el estado de una descarga segmentada interrumpida, si es compatible"""
+    try:
+        with open(ruta_estado, encoding='utf-8') as f:
+            estado = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if estado.get('total') != total:
+        return None
+    return estado['segmentos']
 
-def obtener_info_youtube(url):
-    """Obtiene información del video de YouTube usando yt-dlp"""
+def _guardar_estado_segmentos(ruta_estado, total, segmentos):
+    temporal = ruta_estado + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump({'total': total, 'segmentos': segmentos}, f)
+    os.replace(temporal, ruta_estado)
+
+def descargar_por_segmentos(fd, nombre, info):
+    """Descarga un archivo HTTP en varios rangos de bytes en paralelo
+    
+    Cada segmento se escribe directamente en su posición del archivo .part y el
+    progreso se guarda en un archivo .segmentos junto a él, de modo que tras una
+    caída se reanuda cada segmento desde donde se quedó. Si el servidor no
+    admite rangos se usa el descargador HTTP normal de yt-dlp.
+    """
+    from yt_dlp.downloader.http import HttpFD
+    
+    url = info['url']
+    cabeceras = dict(info.get('http_headers') or {})
+    
+    def abrir_rango(inicio, fin):
+        return abrir_rango_http(fd.ydl, url, cabeceras, inicio, fin)
+    
+    def descarga_normal():
+        http = HttpFD(fd.ydl, fd.params)
+        # HttpFD ya registra su propio report_progress; copiar el nuestro duplicaría la salida
+        for hook in fd._progress_hooks:
+            if hook != fd.report_progress:
+                http.add_progress_hook(hook)
+        return http.real_download(nombre, info)
+    
+    # Petición de prueba: confirma que hay rangos y obtiene el tamaño exacto
+    try:
+        respuesta = abrir_rango(0, 0)
+        rango = respuesta.headers.get('Content-Range') or ''
+        respuesta.close()
+    except Exception:
+        return descarga_normal()
+    coincidencia = re.match(r'bytes 0-0/(\d+)', rango)
+    if respuesta.status != 206 or not coincidencia:
+        return descarga_normal()
+    total = int(coincidencia.group(1))
+    if total < DESCARGA_SEGMENTADA['umbral']:
+        return descarga_normal()
+    
+    temporal = fd.temp_name(nombre)
+    ruta_estado = temporal + '.segmentos'
+    segmentos = None
+    if os.path.exists(temporal) and os.path.getsize(temporal) == total:
+        segmentos = _leer_estado_segmentos(ruta_estado, total)
+    
+    if segmentos is None:
+        numero = DESCARGA_SEGMENTADA['segmentos']
+        tamano_segmento = -(-total // numero)
+        segmentos = [[inicio, min(inicio + tamano_segmento, total) - 1, 0]
+                     for inicio in range(0, total, tamano_segmento)]
+        with open(temporal, 'wb') as f:
+            preasignar_archivo(f, total)
+        _guardar_estado_segmentos(ruta_estado, total, segmentos)
+    
+    # YouTube limita las peticiones de rango grandes: se respeta su tamaño de trozo
+    opciones_descarga = info.get('downloader_options') or {}
+    trozo = opciones_descarga.get('http_chunk_size') or fd.params.get('http_chunk_size') or total
+    reintentos = fd.params.get('retries', 10)
+    if reintentos == float('inf'):
+        reintentos = 10 ** 6
+    bloque = DESCARGA_SEGMENTADA['bloque']
+    
+    lock = threading.Lock()
+    errores = []
+    descargado_al_inicio = sum(s[2] for s in segmentos)
+    
+    def descargar_segmento(segmento):
+        fallos = 0
+        with open(temporal, 'r+b', buffering=0) as f:
+            # Las lecturas se acumulan y se escriben en bloques grandes; el estado
+            # solo cuenta lo que ya está escrito, para poder reanudar sin huecos
+            pendiente = bytearray()
+            
+            def escribir():
+                f.write(pendiente)
+                with lock:
+                    segmento[2] += len(pendiente)
+                del pendiente[:]
+            
+            while segmento[0] + segmento[2] <= segmento[1] and not errores:
+                posicion = segmento[0] + segmento[2]
+                fin = min(segmento[1], posicion + trozo - 1)
+                try:
+                    respuesta = abrir_rango(posicion, fin)
+                    try:
+                        if respuesta.status != 206:
+                            raise IOError(f"El servidor respondió {respuesta.status} a una petición de rango")
+                        f.seek(posicion)
+                        while posicion <= fin and not errores:
+                            datos = respuesta.read(min(bloque, fin - posicion + 1))
+                            if not datos:
+                                break
+                            pendiente += datos
+                            posicion += len(datos)
+                            if len(pendiente) >= PUBLICACION['buffer']:
+                                escribir()
+                    finally:
+                        if pendiente:
+                            escribir()
+                        respuesta.close()
+                    if errores:
+                        return
+                    if posicion <= fin:
+                        raise IOError("Conexión cerrada antes de terminar el rango")
+                    fallos = 0
+                except Exception as e:
+                    fallos += 1
+                    if fallos > reintentos:
+                        errores.append(e)
+                        return
+                    espera = time.monotonic() + min(30, 2 ** fallos) * 0.25
+                    while time.monotonic() < espera and not errores:
+                        time.sleep(0.1)
+    
+    inicio = time.monotonic()
+    hilos = [threading.Thread(target=descargar_segmento, args=(s,), daemon=True)
+             for s in segmentos if s[0] + s[2] <= s[1]]
+    for hilo in hilos:
+        hilo.start()
+    
+    ultimo_guardado = inicio
+    try:
+        while True:
+            vivos = [hilo for hilo in hilos if hilo.is_alive()]
+            if not vivos:
+                break
+            vivos[0].join(0.5)
+            
+            ahora = time.monotonic()
+            with lock:
+                descargado = sum(s[2] for s in segmentos)
+                if ahora - ultimo_guardado >= 2:
+                    _guardar_estado_segmentos(ruta_estado, total, segmentos)
+                    ultimo_guardado = ahora
+            
+            transcurrido = ahora - inicio
+            velocidad = (descargado - descargado_al_inicio) / transcurrido if transcurrido > 0 else None
+            fd._hook_progress({
+                'status': 'downloading',
+                'downloaded_bytes': descargado,
+                'total_bytes': total,
+                'tmpfilename': temporal,
+                'filename': nombre,
+                'elapsed': transcurrido,
+                'speed': velocidad,
+                'eta': (total - descargado) / velocidad if velocidad else None,
+            }, info)
+    except BaseException as e:
+        # Una cancelación desde el hook de progreso (o Ctrl+C) también detiene los
+        # hilos de segmento: ven el error, cierran su rango y se guarda el estado
+        errores.append(e)
+        raise
+    finally:
+        for hilo in hilos:
+            hilo.join()
+        with lock:
+            _guardar_estado_segmentos(ruta_estado, total, segmentos)
+    
+    if errores:
+        fd.report_error(f"Descarga segmentada incompleta: {errores[0]}")
+        return False
+    
+    fd.try_rename(temporal, nombre)
     try:
+        os.remove(ruta_estado)
+    except OSError:
+        pass
+    
+    fd._hook_progress({
+        'status': 'finished',
+        'downloaded_bytes': total,
+        'total_bytes': total,
+        'filename': nombre,
+        'elapsed': time.monotonic() - inicio,
+    }, info)
+    return True
+
+_clase_youtube_dl = None
+_importacion_lock = threading.Lock()
+
+def importar_yt_dlp():
+    """Importa yt-dlp una sola vez aunque lo pidan varios hilos a la vez
+    
+    Sus módulos se importan entre sí en ciclo, y dos hilos importándolos a la
+    vez pueden encontrarse un módulo a medio inicializar (ImportError).
+    """
+    with _importacion_lock:
         import yt_dlp
+    return yt_dlp
+
+def clase_youtube_dl():
+    """Devuelve la subclase de YoutubeDL que usa el pool (se crea al importar yt-dlp)
+    
+    La subclase desvía los formatos HTTP progresivos grandes al descargador
+    segmentado; el resto sigue por los descargadores de yt-dlp. Cuando un formato
+    combina pistas separadas (bestvideo+bestaudio) las descarga a la vez en lugar
+    de una detrás de otra (ver descargar_pistas_en_paralelo). También pasa los
+    hooks de progreso, postproceso y los avisos de reintento a las métricas de la
+    descarga en curso (atributo _metricas, ver PoolYoutubeDL.prestar).
+    """
+    global _clase_youtube_dl
+    if _clase_youtube_dl is not None:
+        return _clase_youtube_dl
+    
+    yt_dlp = importar_yt_dlp()
+    from yt_dlp.downloader.common import FileDownloader
+    
+    class DescargadorSegmentado(FileDownloader):
+        def real_download(self, filename, info_dict):
+            return descargar_por_segmentos(self, filename, info_dict)
+    
+    class YoutubeDLSegmentado(yt_dlp.YoutubeDL):
+        def __init__(self, params=None, auto_init=True):
+            self._metricas = None
+            self._pistas = None
+            super().__init__(params, auto_init)
+            self.add_progress_hook(self._hook_progreso_metricas)
+            self.add_postprocessor_hook(self._hook_postproceso_metricas)
         
-        ydl_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            'extract_flat': False,
-            'ignoreerrors': True
-        }
+        def _hook_progreso_metricas(self, d):
+            if self._metricas is not None:
+                self._metricas.hook_progreso(d)
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
+        def _hook_postproceso_metricas(self, d):
+            if self._metricas is not None:
+                self._metricas.hook_postproceso(d)
+        
+        def urlopen(self, req):
+            respuesta = super().urlopen(req)
+            asignacion = getattr(self._metricas, 'asignacion', None)
+            if asignacion is not None:
+                limitar_respuesta(respuesta, asignacion)
+            return respuesta
+        
+        def to_screen(self, message, *args, **kwargs):
+            if self._metricas is not None:
+                reintento = PATRON_REINTENTO.search(message or '')
+                if reintento:
+                    self._metricas.anotar_reintento(bool(reintento.group(1)))
+            return super().to_screen(message, *args, **kwargs)
+        
+        def process_info(self, info_dict):
+            # La selección de formato ya está hecha: la lista de formatos, que
+            # comparte con la información extraída y es con diferencia lo que más
+            # ocupa, ya no hace falta para descargar ni para postprocesar. Con
+            # tramos se llama una vez por tramo, pero con los formatos ya elegidos
+            formatos = info_dict.get('formats')
+            if formatos:
+                del formatos[:]
             
-            # Manejar duración de forma robusta
-            duracion = info.get('duration')
-            duracion_str = "N/A"
+            if not DESCARGA_PISTAS['paralelo'] or len(info_dict.get('requested_formats') or []) < 2:
+                return super().process_info(info_dict)
             
-            if duracion is not None:
-                try:
-                    duracion_int = int(float(duracion)) if duracion else 0
-                    if duracion_int > 0:
-                        minutos = duracion_int // 60
-                        segundos = duracion_int % 60
-                        duracion_str = f"{minutos}:{segundos:02d}"
-                except (ValueError, TypeError):
-                    duracion_str = "N/A"
-            
-            # Obtener información de YouTube
-            titulo = info.get('title') or info.get('fulltitle') or 'Video de YouTube'
-            
-            # Formatear vistas
-            vistas = info.get('view_count')
-            vistas_str = f"{vistas:,}" if vistas else "N/A"
-            
-            # Formatear likes
-            likes = info.get('like_count')
-            likes_str = f"{likes:,}" if likes else "N/A"
-            
-            descripcion = info.get('description') or 'Sin descripción'
-            if len(descripcion) > 100:
-                descripcion = descripcion[:100] + '...'
-            
-            return {
-                'titulo': titulo,
-                'autor': info.get('uploader') or info.get('channel') or 'Canal de YouTube',
-                'duracion': duracion_str,
-                'vistas': vistas_str,
-                'likes': likes_str,
-                'descripcion': descripcion,
-                'plataforma': 'YouTube'
-            }
+            self._pistas = {'pendientes': len(info_dict['requested_formats']), 'hilos': []}
+            try:
+                return super().process_info(info_dict)
+            finally:
+                self._pistas = None
+        
+        def dl(self, name, info, subtitle=False, test=False):
+            # yt-dlp llama a dl una vez por pista; las llamadas con requested_formats
+            # son de descargadores que unen las pistas por sí mismos (ffmpeg)
+            if self._pistas is not None and not (subtitle or test or info.get('requested_formats')):
+                return descargar_pistas_en_paralelo(self, self._pistas, name, info)
+            return self._descargar(name, info, subtitle, test)
+        
+        def _descargar(self, name, info, subtitle=False, test=False):
+            if subtitle or test or not admite_descarga_segmentada(info, name):
+                return super().dl(name, info, subtitle, test)
             
+            fd = DescargadorSegmentado(self, self.params)
+            for hook in self._progress_hooks:
+                fd.add_progress_hook(hook)
+            nueva_info = self._copy_infodict(info)
+            if nueva_info.get('http_headers') is None:
+                nueva_info['http_headers'] = self._calc_headers(nueva_info)
+            return fd.download(name, nueva_info, subtitle)
+    
+    _clase_youtube_dl = YoutubeDLSegmentado
+    return _clase_youtube_dl
+
+def descargar_pistas_en_paralelo(ydl, pistas, nombre, info):
+    """Descarga una pista de un formato combinado sin esperar a las demás
+    
+    yt-dlp descarga las pistas en un bucle y después las une. Cada pista salvo la
+    última se lanza en un hilo y se da por buena en el acto; la última se descarga
+    en el hilo del bucle y espera a las otras antes de volver, así que al salir
+    del bucle todas están en disco. Si alguna falló se lanza su error.
+    """
+    pistas['pendientes'] -= 1
+    if pistas['pendientes'] > 0:
+        resultado = {}
+        
+        def descargar():
+            try:
+                resultado['valor'] = ydl._descargar(nombre, info)
+            except BaseException as e:
+                resultado['error'] = e
+        
+        hilo = threading.Thread(target=descargar, daemon=True)
+        hilo.start()
+        pistas['hilos'].append((hilo, resultado))
+        return True, True
+    
+    exito, real = ydl._descargar(nombre, info)
+    for hilo, resultado in pistas['hilos']:
+        hilo.join()
+        if 'error' in resultado:
+            raise resultado['error']
+        exito_pista, real_pista = resultado['valor']
+        exito = exito and exito_pista
+        real = real or real_pista
+    return exito, real
+
+# ===================== AUDIO: FLUJO Y TRANSCODIFICACIÓN =====================
+
+# Con el modo activo, el audio de los perfiles MP3/WAV se envía a ffmpeg a medida
+# que se descarga, sin archivo intermedio (--audio-en-flujo)
+AUDIO_EN_FLUJO = {'activo': False}
+
+# Argumentos de ffmpeg equivalentes a FFmpegExtractAudio para cada perfil
+CODEC_AUDIO_PERFIL = {
+    'youtube-mp3': ('mp3', ['-c:a', 'libmp3lame', '-b:a', '320k'], 'mp3'),
+    'youtube-wav': ('wav', ['-c:a', 'pcm_s16le'], 'wav'),
+}
+
+def admite_audio_en_flujo(info):
+    """Indica si el formato elegido es un único archivo HTTP que se puede canalizar"""
+    return (info.get('protocol', 'https') in ('http', 'https')
+            and not info.get('requested_formats')
+            and not info.get('fragments')
+            and not info.get('is_live')
+            and bool(info.get('url')))
+
+def comando_ffmpeg(entrada, salida, argumentos, formato_salida, info):
+    """Construye un comando de ffmpeg con los argumentos dados y los metadatos del video"""
+    comando = [sondear_capacidades()['ffmpeg']['ruta'] or 'ffmpeg',
+               '-hide_banner', '-loglevel', 'error', '-y', '-i', entrada, *argumentos]
+    for clave, campo in (('title', 'title'), ('artist', 'uploader'), ('comment', 'webpage_url')):
+        if info.get(campo):
+            comando += ['-metadata', f"{clave}={info[campo]}"]
+    return comando + ['-f', formato_salida, salida]
+
+def comando_ffmpeg_audio(perfil, entrada, salida, info):
+    """Construye el comando de ffmpeg que convierte una entrada al audio de un perfil"""
+    _, argumentos_codec, formato_salida = CODEC_AUDIO_PERFIL[perfil]
+    return comando_ffmpeg(entrada, salida, ['-vn', *argumentos_codec], formato_salida, info)
+
+def ejecutar_ffmpeg(comando, temporal, destino):
+    """Ejecuta un comando de ffmpeg que escribe en temporal y al terminar lo renombra a destino"""
+    import subprocess
+    
+    resultado = subprocess.run(comando, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if resultado.returncode != 0:
+        try:
+            os.remove(temporal)
+        except OSError:
+            pass
+        raise RuntimeError(f"ffmpeg terminó con código {resultado.returncode}: "
+                           f"{resultado.stderr.decode('utf-8', 'replace').strip()}")
+    os.replace(temporal, destino)
+
+def transcodificar_audio(origen, destino, perfil, info):
+    """Convierte un archivo de audio descargado al formato del perfil y borra el original"""
+    temporal = destino + '.part'
+    ejecutar_ffmpeg(comando_ffmpeg_audio(perfil, origen, temporal, info), temporal, destino)
+    if os.path.abspath(origen) != os.path.abspath(destino):
+        os.remove(origen)
+
+def completar_transcodificacion(pendiente):
+    """Ejecuta la transcodificación diferida de una descarga y la registra en el archivo"""
+    metricas = pendiente.get('metricas')
+    inicio = time.monotonic()
+    try:
+        transcodificar_audio(pendiente['origen'], pendiente['destino'], pendiente['perfil'], pendiente['info'])
+        ruta = publicar_archivo(pendiente['destino'], pendiente['carpeta_destino'])
     except Exception as e:
-        print(f"Error al obtener información de YouTube: {e}")
-        return {
-            'titulo': 'Video de YouTube',
-            'autor': 'Canal de YouTube',
-            'duracion': 'N/A',
-            'vistas': 'N/A',
-            'likes': 'N/A',
-            'descripcion': 'Información no disponible',
-            'plataforma': 'YouTube'
-        }
+        if metricas is not None:
+            metricas.terminar(error=e)
+        raise
+    
+    descartar_preparacion(pendiente['preparacion'])
+    tamano = os.path.getsize(ruta)
+    if archivo_descargas is not None and pendiente['id_video']:
+        archivo_descargas.registrar(pendiente['plataforma'], pendiente['id_video'],
+                                    pendiente['clave_perfil'], pendiente['url'],
+                                    pendiente['info'].get('title'), os.path.abspath(ruta), tamano)
+    
+    resultado = {'ruta': ruta, 'tamano': tamano}
+    if metricas is not None:
+        metricas.agregar_postproceso(time.monotonic() - inicio)
+        metricas.terminar('ok', ruta)
+        resultado['metricas'] = metricas.como_dict()
+    return resultado
 
-def mostrar_opciones_tipo_descarga():
-    """Muestra opciones de tipo de descarga para YouTube"""
-    print("\n   🎯 Tipo de descarga:")
-    opciones = {
-        1: {
-            'tipo': 'video',
-            'descripcion': 'Video completo (con audio)'
-        },
-        2: {
-            'tipo': 'audio_mp3',
-            'descripcion': 'Solo audio en formato MP3'
-        },
-        3: {
-            'tipo': 'audio_wav',
-            'descripcion': 'Solo audio en formato WAV'
-        }
-    }
+def transmitir_audio_a_ffmpeg(ydl, info, destino, perfil, silencioso=False):
+    """Descarga el audio por trozos y lo pasa por la entrada estándar de ffmpeg
     
-    for num, info in opciones.items():
-        print(f"   {num}. {info['descripcion']}")
+    ffmpeg codifica mientras llegan los bytes, así que el tiempo total es el
+    mayor entre descarga y codificación en lugar de su suma. Devuelve False si
+    algo falla para que se use la descarga normal.
+    """
+    import subprocess
+    
+    if not sondear_capacidades()['ffmpeg']['ruta']:
+        return False
+    
+    temporal = destino + '.part'
+    comando = comando_ffmpeg_audio(perfil, 'pipe:0', temporal, info)
+    
+    url = info['url']
+    cabeceras = dict(info.get('http_headers') or {})
+    total = info.get('filesize') or info.get('filesize_approx')
+    opciones_descarga = info.get('downloader_options') or {}
+    trozo = opciones_descarga.get('http_chunk_size') or 10 * 1024 * 1024
+    bloque = DESCARGA_SEGMENTADA['bloque']
+    
+    # destino está en la carpeta de preparación, que yt-dlp aún no ha creado
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+    proceso = subprocess.Popen(comando, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.PIPE)
+    errores_ffmpeg = []
+    lector = threading.Thread(target=lambda: errores_ffmpeg.append(proceso.stderr.read()), daemon=True)
+    lector.start()
+    
+    inicio = time.monotonic()
+    descargado = 0
+    try:
+        while total is None or descargado < total:
+            respuesta = abrir_rango_http(ydl, url, cabeceras, descargado, descargado + trozo - 1)
+            try:
+                if respuesta.status not in (200, 206):
+                    raise IOError(f"El servidor respondió {respuesta.status}")
+                rango = respuesta.headers.get('Content-Range') or ''
+                coincidencia = re.search(r'/(\d+)$', rango)
+                if coincidencia:
+                    total = int(coincidencia.group(1))
+                
+                leido = 0
+                while True:
+                    datos = respuesta.read(bloque)
+                    if not datos:
+                        break
+                    proceso.stdin.write(datos)
+                    leido += len(datos)
+                    descargado += len(datos)
+                    notificar_progreso(ydl, {
+                        'status': 'downloading',
+                        'downloaded_bytes': descargado,
+                        'total_bytes': total,
+                        'filename': destino,
+                        'elapsed': time.monotonic() - inicio,
+                    }, info)
+            finally:
+                respuesta.close()
+            
+            # Sin Content-Range el servidor envió el archivo completo de una vez
+            if respuesta.status == 200 or leido == 0:
+                break
+        
+        proceso.stdin.close()
+        codigo = proceso.wait()
+        lector.join()
+        if codigo != 0:
+            raise IOError(f"ffmpeg terminó con código {codigo}: "
+                          f"{(errores_ffmpeg[0] or b'').decode('utf-8', 'replace').strip()}")
+    except Exception as e:
+        proceso.kill()
+        proceso.wait()
+        try:
+            os.remove(temporal)
+        except OSError:
+            pass
+        if not silencioso:
+            print(f"   ⚠️  Audio en flujo no disponible ({e}); se usa la descarga normal")
+        return False
     
-    return opciones
+    os.replace(temporal, destino)
+    notificar_progreso(ydl, {
+        'status': 'finished',
+        'downloaded_bytes': descargado,
+        'total_bytes': descargado,
+        'filename': destino,
+        'elapsed': time.monotonic() - inicio,
+    }, info)
+    if not silencioso:
+        print(f"   🎵 Audio descargado y convertido en flujo ({descargado / 1048576:.1f} MB "
+              f"en {time.monotonic() - inicio:.1f} s)")
+    return True
 
-def mostrar_opciones_calidad_youtube():
-    """Muestra opciones predefinidas de calidad para video de YouTube"""
-    print("\n   📺 Opciones de calidad de video:")
-    opciones = {
-        1: {
-            'formato': 'best[height<=1080]/best',
-            'descripcion': '1080p (Full HD) - Mejor calidad'
-        },
-        2: {
-            'formato': 'best[height<=720]/best',
-            'descripcion': '720p (HD) - Buena calidad'
-        },
-        3: {
-            'formato': 'best[height<=480]/best',
-            'descripcion': '480p (SD) - Calidad media'
-        },
-        4: {
-            'formato': 'best[height<=360]/best',
-            'descripcion': '360p - Calidad básica'
-        },
-        5: {
-            'formato': 'best',
-            'descripcion': 'Mejor calidad disponible (automático)'
-        },
-        6: {
-            'formato': 'worst',
-            'descripcion': 'Menor calidad (descarga más rápida)'
-        }
-    }
+# ===================== VARIAS SALIDAS =====================
+
+# Tipos de descarga con varias salidas ('mp4+mp3@192k+wav'): el original se
+# descarga una sola vez y cada salida se hace con su propio proceso de ffmpeg.
+# Por salida: argumentos de ffmpeg ({tasa} es la tasa de bits), formato del
+# contenedor y tasa por defecto (None si no admite tasa)
+FORMATOS_SALIDA = {
+    'mp4': (['-map', '0:v:0?', '-map', '0:a:0?', '-c', 'copy', '-movflags', '+faststart'], 'mp4', None),
+    'mp3': (['-vn', '-c:a', 'libmp3lame', '-b:a', '{tasa}'], 'mp3', '320k'),
+    'wav': (['-vn', '-c:a', 'pcm_s16le'], 'wav', None),
+}
+
+def parsear_salidas(especificacion):
+    """Convierte 'mp4+mp3@192k+wav' en [('mp4', None), ('mp3', '192k'), ('wav', None)]
     
-    for num, info in opciones.items():
-        print(f"   {num}. {info['descripcion']}")
+    Lanza ValueError si alguna salida no es válida. Las repetidas se quitan.
+    """
+    salidas = []
+    for parte in str(especificacion).lower().split('+'):
+        formato, _, tasa = parte.strip().partition('@')
+        if formato not in FORMATOS_SALIDA:
+            raise ValueError(f"Salida no válida: {parte.strip()} (usa {', '.join(FORMATOS_SALIDA)})")
+        defecto = FORMATOS_SALIDA[formato][2]
+        if tasa and (defecto is None or not re.fullmatch(r'\d+k?', tasa)):
+            raise ValueError(f"Tasa de bits no válida para {formato}: {tasa}")
+        if tasa.isdigit():
+            tasa += 'k'     # mp3@192 es 192 kbps
+        salida = (formato, tasa or defecto)
+        if salida not in salidas:
+            salidas.append(salida)
+    return salidas
+
+def normalizar_salidas(especificacion):
+    """Devuelve la especificación de salidas en su forma canónica ('mp3@320k+wav')"""
+    return '+'.join(f"{formato}@{tasa}" if tasa else formato
+                    for formato, tasa in parsear_salidas(especificacion))
+
+def describir_salidas(especificacion):
+    return ", ".join(f"{formato.upper()} {tasa}" if tasa else formato.upper()
+                     for formato, tasa in parsear_salidas(especificacion))
+
+def rutas_salidas(raiz, salidas):
+    """Nombre de cada salida: raiz.ext, o 'raiz [tasa].ext' si hay varias con la misma extensión"""
+    extensiones = [formato for formato, _ in salidas]
+    return [f"{raiz} [{tasa}].{formato}" if extensiones.count(formato) > 1 else f"{raiz}.{formato}"
+            for formato, tasa in salidas]
+
+def codificar_salidas(origen, especificacion, info):
+    """Hace todas las salidas de un archivo descargado a la vez y borra el original
+    
+    Cada salida es un proceso de ffmpeg distinto (ffmpeg libera el GIL, así que
+    bastan hilos para lanzarlos), hasta uno por núcleo. Si el original ya es un
+    MP4, la salida MP4 es el propio archivo y no se vuelve a escribir. Devuelve
+    las rutas de las salidas en el orden pedido.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    
+    salidas = parsear_salidas(especificacion)
+    raiz, extension = os.path.splitext(origen)
+    destinos = rutas_salidas(raiz, salidas)
+    
+    # El original se aparta para que ninguna salida lo sobrescriba mientras otras lo leen
+    fuente = f"{raiz}.fuente{extension}"
+    os.replace(origen, fuente)
     
-    return opciones
+    def codificar(salida, destino):
+        formato, tasa = salida
+        if formato == 'mp4' and extension.lower() == '.mp4':
+            try:
+                os.link(fuente, destino)
+            except OSError:
+                import shutil
+                shutil.copyfile(fuente, destino)
+            return
+        argumentos, formato_salida, _ = FORMATOS_SALIDA[formato]
+        argumentos = [a.replace('{tasa}', tasa or '') for a in argumentos]
+        temporal = destino + '.part'
+        ejecutar_ffmpeg(comando_ffmpeg(fuente, temporal, argumentos, formato_salida, info), temporal, destino)
+    
+    with ThreadPoolExecutor(max_workers=min(len(salidas), os.cpu_count() or 1)) as pool:
+        for futuro in [pool.submit(codificar, salida, destino) for salida, destino in zip(salidas, destinos)]:
+            futuro.result()
+    
+    os.remove(fuente)
+    return destinos
 
-def mostrar_opciones_calidad_audio():
-    """Muestra opciones de calidad para audio"""
-    print("\n   🎵 Opciones de calidad de audio:")
-    opciones = {
-        1: {
-            'formato': 'bestaudio',
-            'descripcion': 'Mejor calidad de audio disponible'
-        },
-        2: {
-            'formato': 'bestaudio[abr<=320]',
-            'descripcion': 'Hasta 320 kbps (excelente calidad)'
-        },
-        3: {
-            'formato': 'bestaudio[abr<=192]',
-            'descripcion': 'Hasta 192 kbps (buena calidad)'
-        },
-        4: {
-            'formato': 'bestaudio[abr<=128]',
-            'descripcion': 'Hasta 128 kbps (calidad estándar)'
-        }
-    }
+# ===================== TRAMOS DE TIEMPO =====================
+
+# Con tramos ('1:30-2:00', varios separados por ';') solo se descarga esa parte
+# del video: yt-dlp pasa la descarga a ffmpeg, que salta con peticiones de rango
+# (o eligiendo fragmentos) al fotograma clave anterior al inicio y copia los
+# flujos sin recodificar. Con preciso, el principio de cada tramo se recodifica
+# en local para que empiece justo en el instante pedido; si solo se puede
+# recodificar el tramo entero, eso se hace con los de hasta max_recodificar_s
+# segundos (ver ajustar_inicio_tramo)
+RECORTES = {
+    'preciso': True,
+    'max_recodificar_s': 300,
+}
+
+# Códec de video -> argumentos de ffmpeg para recodificar un tramo. Los códecs
+# que no están aquí se quedan con el corte en el fotograma clave.
+CODIFICADOR_RECORTE = {
+    'h264': ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '16'],
+}
+
+# profile_idc de H.264 -> perfil de libx264 con el que se recodifica el
+# principio de un tramo
+PERFILES_H264 = {66: 'baseline', 77: 'main', 100: 'high', 110: 'high10', 122: 'high422', 244: 'high444'}
+
+# Retardo de reordenación (fotogramas) -> B-frames de libx264 con ese retardo
+B_FRAMES_H264 = {0: 'bframes=0', 1: 'bframes=1:b-pyramid=none', 2: 'bframes=3:b-pyramid=normal'}
+
+# Contenedores con lista de edición, en los que el tramo copiado empieza en el
+# instante pedido aunque arrastre video desde el fotograma clave anterior
+CONTENEDOR_RECORTE = {'.mp4': 'mp4', '.m4v': 'mp4', '.mov': 'mov'}
+
+def parsear_tiempo(texto):
+    """Convierte '90', '1:30' o '1:02:03.5' en segundos (ValueError si no es válido)"""
+    partes = texto.strip().split(':')
+    if len(partes) > 3 or not all(re.fullmatch(r'\d+(\.\d+)?', parte) for parte in partes):
+        raise ValueError(f"Tiempo no válido: {texto.strip()} (usa segundos, m:ss o h:mm:ss)")
+    segundos = 0.0
+    for parte in partes:
+        segundos = segundos * 60 + float(parte)
+    return segundos
+
+def parsear_tramos(especificacion):
+    """Convierte '1:30-2:00;5:00-' en [(90.0, 120.0), (300.0, None)]
     
-    for num, info in opciones.items():
-        print(f"   {num}. {info['descripcion']}")
+    Admite una cadena o una lista de cadenas. Sin inicio se empieza en 0 y sin
+    fin se llega al final del video. Lanza ValueError si algún tramo no es
+    válido. Los tramos se ordenan y los repetidos se quitan.
+    """
+    if isinstance(especificacion, (list, tuple)):
+        especificacion = ';'.join(str(parte) for parte in especificacion)
+    tramos = set()
+    for parte in str(especificacion or '').split(';'):
+        if not parte.strip():
+            continue
+        inicio, separador, fin = parte.partition('-')
+        if not separador:
+            raise ValueError(f"Tramo no válido: {parte.strip()} (usa inicio-fin, p. ej. 1:30-2:00)")
+        inicio = parsear_tiempo(inicio) if inicio.strip() else 0.0
+        fin = parsear_tiempo(fin) if fin.strip() else None
+        if fin is not None and fin <= inicio:
+            raise ValueError(f"Tramo no válido: {parte.strip()} (el fin debe ser posterior al inicio)")
+        tramos.add((inicio, fin))
+    return sorted(tramos, key=lambda tramo: (tramo[0], tramo[1] is None, tramo[1] or 0))
+
+def formatear_segundos(segundos):
+    return f"{segundos:.3f}".rstrip('0').rstrip('.')
+
+def normalizar_tramos(especificacion):
+    """Devuelve los tramos en su forma canónica ('90-120;300-'), o None si no hay ninguno"""
+    return ';'.join(f"{formatear_segundos(inicio)}-{'' if fin is None else formatear_segundos(fin)}"
+                    for inicio, fin in parsear_tramos(especificacion)) or None
+
+def describir_tramos(tramos):
+    return ", ".join(etiqueta_tramo(inicio, fin) for inicio, fin in parsear_tramos(tramos))
+
+def etiqueta_tramo(inicio, fin):
+    """Etiqueta de un tramo para el nombre del archivo ('1m30s-2m00s')"""
+    def texto(segundos):
+        horas, resto = divmod(segundos, 3600)
+        minutos, segundos = divmod(resto, 60)
+        segundos = ('0' if segundos < 10 else '') + formatear_segundos(segundos)
+        return f"{int(horas)}h{int(minutos):02d}m{segundos}s" if horas else f"{int(minutos)}m{segundos}s"
+    return f"{texto(inicio)}-{'fin' if fin is None else texto(fin)}"
+
+def rangos_descarga(tramos):
+    """Devuelve la función download_ranges de yt-dlp para unos tramos normalizados"""
+    secciones = [{'start_time': inicio, 'end_time': float('inf') if fin is None else fin,
+                  'title': etiqueta_tramo(inicio, fin), 'index': numero}
+                 for numero, (inicio, fin) in enumerate(parsear_tramos(tramos), 1)]
+    
+    def rangos(info, ydl):
+        duracion = info.get('duration')
+        validas = [s for s in secciones if duracion is None or s['start_time'] < duracion]
+        if not validas:
+            raise ErrorPermanente(f"Los tramos pedidos empiezan después del final del video "
+                                  f"({formatear_duracion(int(duracion))})", 'tramo')
+        return validas
     
-    return opciones
+    return rangos
 
-def descargar_youtube(url, carpeta_destino, nuevo_nombre):
-    """Descarga video o audio de YouTube usando yt-dlp con opciones de formato"""
-    tipo_seleccionado = 'video'  # Valor por defecto
+def plantilla_tramos(plantilla, tramos):
+    """Añade la etiqueta del tramo al nombre cuando se piden varios tramos"""
+    if not tramos or ';' not in tramos:
+        return plantilla
+    raiz, extension = plantilla.rsplit('.%(ext)s', 1) if '.%(ext)s' in plantilla else (plantilla, '')
+    return f"{raiz} [%(section_title)s].%(ext)s{extension}"
+
+def primer_fotograma_clave(ruta):
+    """Devuelve (códec de video, instante del primer fotograma clave, duración) de un archivo local
     
+    Solo se decodifican fotogramas clave y se para en el primero. Los que quedan
+    antes del inicio de la lista de edición no cuentan, así que en un tramo más
+    corto que la distancia entre fotogramas clave el instante es None. El
+    códec es None si el archivo no tiene video o no se pudo ejecutar ffmpeg.
+    """
+    import subprocess
+    
+    comando = [sondear_capacidades()['ffmpeg']['ruta'] or 'ffmpeg', '-hide_banner', '-nostdin',
+               '-skip_frame', 'nokey', '-i', ruta, '-map', '0:v:0', '-frames:v', '1',
+               '-vf', 'showinfo', '-f', 'null', '-']
     try:
-        import yt_dlp
+        salida = subprocess.run(comando, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.PIPE).stderr.decode('utf-8', 'replace')
+    except OSError:
+        return None, None, None
+    codec = re.search(r'Stream #\S+: Video: (\w+)', salida)
+    instante = re.search(r'pts_time:\s*(-?[\d.]+)', salida)
+    duracion = re.search(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)', salida)
+    if duracion:
+        duracion = int(duracion.group(1)) * 3600 + int(duracion.group(2)) * 60 + float(duracion.group(3))
+    return codec and codec.group(1), instante and float(instante.group(1)), duracion
+
+def decodificar_video(ruta):
+    """Decodifica el video de un archivo y devuelve (fotogramas, errores de ffmpeg)"""
+    import subprocess
+    
+    comando = [sondear_capacidades()['ffmpeg']['ruta'] or 'ffmpeg', '-hide_banner', '-nostdin',
+               '-v', 'error', '-stats', '-i', ruta, '-map', '0:v:0', '-f', 'null', '-']
+    resultado = subprocess.run(comando, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    salida = resultado.stderr.decode('utf-8', 'replace')
+    fotogramas = re.findall(r'frame=\s*(\d+)', salida)
+    errores = [linea for linea in salida.splitlines() if linea.strip() and 'frame=' not in linea]
+    if resultado.returncode != 0 and not errores:
+        errores.append(f"ffmpeg terminó con código {resultado.returncode}")
+    return (int(fotogramas[-1]) if fotogramas else None), errores
+
+def configuracion_h264(ruta):
+    """Lee la configuración H.264 del video de un archivo local
+    
+    Devuelve los campos de las cabeceras SPS y PPS del primer fotograma
+    (profile_idc, level_idc, seq_parameter_set_id, entropy_coding_mode_flag,
+    max_num_reorder_frames, color...) junto con el formato de píxel
+    ('formato') y la base de tiempo de la pista ('escala'), o None si ffmpeg
+    no pudo leerlas.
+    """
+    import subprocess
+    
+    comando = [sondear_capacidades()['ffmpeg']['ruta'] or 'ffmpeg', '-hide_banner', '-nostdin',
+               '-i', ruta, '-map', '0:v:0', '-c', 'copy', '-bsf:v', 'trace_headers',
+               '-frames:v', '1', '-f', 'null', '-']
+    try:
+        salida = subprocess.run(comando, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.PIPE).stderr.decode('utf-8', 'replace')
+    except OSError:
+        return None
+    configuracion = {}
+    # El SPS va antes que el PPS: su seq_parameter_set_id es el que se queda
+    for campo, valor in re.findall(r'\]\s+\d+\s+(\w+)\s+[01]+ = (-?\d+)', salida):
+        configuracion.setdefault(campo, int(valor))
+    if 'profile_idc' not in configuracion or 'level_idc' not in configuracion:
+        return None
+    formato = re.search(r'Video: h264[^,\n]*, (\w+)', salida)
+    escala = re.search(r'(\d+) tbn', salida)
+    configuracion['formato'] = formato and formato.group(1)
+    configuracion['escala'] = escala and int(escala.group(1))
+    return configuracion
+
+def argumentos_inicio_h264(configuracion):
+    """Argumentos de libx264 para recodificar el principio de un tramo con la configuración del original
+    
+    Mismo perfil, nivel, formato de píxel, codificación de entropía, color y
+    retardo de reordenación (B-frames) que el resto del video, para que el
+    principio recodificado y el resto copiado formen una sola pista que se
+    decodifica de seguido. El principio lleva sus cabeceras SPS/PPS en cada
+    fotograma clave con otro identificador, así que no pisa las del original.
+    Devuelve None si el perfil no lo puede generar libx264.
+    """
+    perfil = PERFILES_H264.get(configuracion['profile_idc'])
+    if perfil is None:
+        return None
+    reordenacion = configuracion.get('max_num_reorder_frames', 0 if perfil == 'baseline' else 2)
+    parametros = ['repeat-headers=1', f"sps-id={(configuracion.get('seq_parameter_set_id', 0) + 1) % 32}",
+                  f"level={configuracion['level_idc']}", B_FRAMES_H264[min(reordenacion, 2)]]
+    if not configuracion.get('entropy_coding_mode_flag'):
+        parametros.append('cabac=0')
+    argumentos = [*CODIFICADOR_RECORTE['h264'], '-profile:v', perfil, '-x264-params', ':'.join(parametros)]
+    if configuracion.get('formato'):
+        argumentos += ['-pix_fmt', configuracion['formato']]
+    if configuracion.get('colour_description_present_flag'):
+        argumentos += ['-color_primaries', str(configuracion['colour_primaries']),
+                       '-color_trc', str(configuracion['transfer_characteristics']),
+                       '-colorspace', str(configuracion['matrix_coefficients'])]
+    if 'video_full_range_flag' in configuracion:
+        argumentos += ['-color_range', 'pc' if configuracion['video_full_range_flag'] else 'tv']
+    if configuracion.get('escala'):
+        argumentos += ['-video_track_timescale', str(configuracion['escala'])]
+    return argumentos
+
+def sustituir_tramo(ruta, temporal, tolerancia=0):
+    """Sustituye un tramo por su versión ajustada si esta decodifica bien
+    
+    La versión ajustada debe decodificarse sin errores, tener los mismos
+    fotogramas que el original (± tolerancia) y empezar con un fotograma clave.
+    """
+    originales, _ = decodificar_video(ruta)
+    fotogramas, errores = decodificar_video(temporal)
+    if errores or fotogramas is None or originales is None or abs(fotogramas - originales) > tolerancia:
+        return False
+    _, corte, _ = primer_fotograma_clave(temporal)
+    if corte is None or corte > 0.001:
+        return False
+    os.replace(temporal, ruta)
+    return True
+
+def empalmar_inicio_h264(ruta, corte, formato_salida):
+    """Recodifica solo el principio de un tramo H.264 y copia el resto
+    
+    El video hasta el primer fotograma clave (corte) se recodifica con la
+    configuración del original (ver argumentos_inicio_h264); desde ahí se
+    copia sin tocar, con sus cabeceras dentro del flujo, y las dos partes se
+    unen con el demultiplexor concat junto con el audio original. Si al unir
+    los instantes de decodificación no crecen, el resultado se descarta.
+    Devuelve True si el tramo se sustituyó.
+    """
+    import subprocess
+    
+    configuracion = configuracion_h264(ruta)
+    argumentos = configuracion and argumentos_inicio_h264(configuracion)
+    if not argumentos:
+        return False
+    ffmpeg = sondear_capacidades()['ffmpeg']['ruta'] or 'ffmpeg'
+    raiz = os.path.splitext(ruta)[0]
+    inicio, resto, lista, temporal = (f"{raiz}.inicio.part", f"{raiz}.resto.part",
+                                      f"{raiz}.empalme.part", f"{raiz}.preciso.part")
+    try:
+        pasos = [
+            [ffmpeg, '-hide_banner', '-nostdin', '-loglevel', 'error', '-y', '-i', ruta, '-map', '0:v:0',
+             '-t', f"{corte:.6f}", *argumentos, '-fps_mode', 'passthrough', '-f', 'mp4', inicio],
+            [ffmpeg, '-hide_banner', '-nostdin', '-loglevel', 'error', '-y', '-ss', f"{corte:.6f}", '-i', ruta,
+             '-map', '0:v:0', '-c', 'copy', '-bsf:v', 'h264_mp4toannexb', '-f', 'mp4', resto],
+        ]
+        for comando in pasos:
+            if subprocess.run(comando, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode != 0:
+                return False
+        with open(lista, 'w', encoding='utf-8') as f:
+            for parte in (inicio, resto):
+                f.write("file '" + os.path.abspath(parte).replace("'", "'\\''") + "'\n")
+        comando = [ffmpeg, '-hide_banner', '-nostdin', '-loglevel', 'warning', '-y',
+                   '-f', 'concat', '-safe', '0', '-i', lista, '-i', ruta, '-map', '0:v', '-map', '1:a?',
+                   '-c', 'copy', '-map_metadata', '1', '-movflags', '+faststart', '-f', formato_salida, temporal]
+        resultado = subprocess.run(comando, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if resultado.returncode != 0 or b'Non-monotonic' in resultado.stderr:
+            return False
+        return sustituir_tramo(ruta, temporal)
+    except (OSError, subprocess.SubprocessError):
+        return False
+    finally:
+        for parte in (inicio, resto, lista, temporal):
+            try:
+                os.remove(parte)
+            except OSError:
+                pass
+
+def recodificar_tramo(ruta, codec, formato_salida):
+    """Recodifica entero el video de un tramo (el audio se copia); devuelve True si se sustituyó"""
+    import subprocess
+    
+    temporal = f"{os.path.splitext(ruta)[0]}.preciso.part"
+    try:
+        argumentos = ['-map', '0:v:0', '-map', '0:a?', *CODIFICADOR_RECORTE[codec], '-fps_mode', 'passthrough',
+                      '-c:a', 'copy', '-map_metadata', '0', '-movflags', '+faststart']
+        resultado = subprocess.run(comando_ffmpeg(ruta, temporal, argumentos, formato_salida, {}),
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        # ±1 fotograma por el redondeo del final
+        return resultado.returncode == 0 and sustituir_tramo(ruta, temporal, tolerancia=1)
+    except (OSError, subprocess.SubprocessError):
+        return False
+    finally:
+        try:
+            os.remove(temporal)
+        except OSError:
+            pass
+
+def ajustar_inicio_tramo(ruta):
+    """Hace que un tramo descargado empiece con un fotograma clave en el instante pedido
+    
+    Al copiar sin recodificar, ffmpeg empieza el tramo en el fotograma clave
+    anterior al inicio y lo oculta con la lista de edición del MP4, que no todos
+    los reproductores y editores respetan. En H.264 solo se recodifica el
+    video hasta el primer fotograma clave del tramo y el resto se copia (ver
+    empalmar_inicio_h264). Si eso no es posible (otro códec, un perfil que
+    libx264 no genera o un empalme que no decodifica limpio), se recodifica el
+    video entero, pero solo en tramos de hasta RECORTES['max_recodificar_s'].
+    Cada resultado se decodifica entero antes de sustituir al original.
+    
+    Devuelve None si el tramo empieza en el instante pedido (porque se ajustó o
+    porque ya empezaba en un fotograma clave) y, si no, el motivo por el que se
+    queda con el corte en el fotograma clave.
+    """
+    extension = os.path.splitext(ruta)[1].lower()
+    formato_salida = CONTENEDOR_RECORTE.get(extension)
+    if formato_salida is None:
+        return f"el contenedor {extension or 'sin extensión'} no admite el ajuste"
+    codec, corte, duracion = primer_fotograma_clave(ruta)
+    if codec is None:
+        return "ffmpeg no pudo leer el video"
+    if corte is not None and corte <= 0:
+        return None
+    if codec == 'h264' and corte is not None and empalmar_inicio_h264(ruta, corte, formato_salida):
+        return None
+    if codec not in CODIFICADOR_RECORTE:
+        return f"no se recodifica video {codec}"
+    if duracion is None or duracion > RECORTES['max_recodificar_s']:
+        return f"dura más de {RECORTES['max_recodificar_s']} s y no se pudo recodificar solo el principio"
+    if recodificar_tramo(ruta, codec, formato_salida):
+        return None
+    return "no se pudo recodificar"
+
+# ===================== MÉTRICAS =====================
+PATRON_REINTENTO = re.compile(r'Retrying( fragment)?\b')
+
+_contexto_descarga = threading.local()
+
+@contextmanager
+def observar_descargas(observador):
+    """Hace que las descargas iniciadas en este hilo avisen al observador
+    
+    El observador recibe (métricas, estado) en cada aviso de progreso; si lanza
+    una excepción la descarga se interrumpe (así se cancelan en el modo servicio).
+    """
+    anterior = getattr(_contexto_descarga, 'observador', None)
+    _contexto_descarga.observador = observador
+    try:
+        yield
+    finally:
+        _contexto_descarga.observador = anterior
+
+@contextmanager
+def retener_metricas(retenidas):
+    """Hace que las descargas iniciadas en este hilo guarden sus métricas en
+    retenidas en vez de enviarlas al registro (p. ej. hasta que se confirmen)"""
+    anterior = getattr(_contexto_descarga, 'retenidas', None)
+    _contexto_descarga.retenidas = retenidas
+    try:
+        yield
+    finally:
+        _contexto_descarga.retenidas = anterior
+
+class MetricasDescarga:
+    """Métricas de una descarga: latencias, velocidad, reintentos y postproceso
+    
+    Las alimentan los hooks de progreso y de postproceso de la instancia de
+    YoutubeDL que tiene prestada la descarga (ver PoolYoutubeDL.prestar). Los
+    hooks pueden llegar desde varios hilos (fragmentos o segmentos simultáneos).
+    Si el hilo que crea las métricas tiene un observador (observar_descargas),
+    se le avisa en cada aviso de progreso.
+    """
+    
+    def __init__(self, url, plataforma, perfil):
+        self.url = url
+        self.plataforma = plataforma
+        self.perfil = perfil
+        self.id_video = None
+        self.inicio = time.time()
+        self.extraccion_s = None
+        self.primer_byte_s = None
+        self.postproceso_s = 0.0
+        self.reintentos = 0
+        self.reintentos_fragmento = 0
+        self.tamano_final = None
+        self.resultado = None
+        self.error = None
+        self.motivo_error = None
+        self.asignacion = None
+        self._inicio_descarga = None
+        self._fin_descarga = None
+        self._bytes_archivo = {}
+        self._total_archivo = {}
+        self._postprocesos = {}
+        self._lock = threading.Lock()
+        self.observador = getattr(_contexto_descarga, 'observador', None)
+        self.retenidas = getattr(_contexto_descarga, 'retenidas', None)
+    
+    def iniciar_descarga(self):
+        self._inicio_descarga = time.monotonic()
+    
+    def descarga_iniciada(self):
+        """Indica si ya terminó la extracción y se están descargando los archivos"""
+        return self._inicio_descarga is not None
+    
+    def hook_progreso(self, d):
+        ahora = time.monotonic()
+        descargado = d.get('downloaded_bytes') or 0
+        with self._lock:
+            if self._inicio_descarga is None:
+                self._inicio_descarga = ahora
+            if self.primer_byte_s is None and descargado > 0:
+                self.primer_byte_s = ahora - self._inicio_descarga
+            if d.get('status') == 'finished':
+                descargado = d.get('total_bytes') or descargado
+                self._fin_descarga = ahora
+            archivo = d.get('filename')
+            self._bytes_archivo[archivo] = max(self._bytes_archivo.get(archivo, 0), descargado)
+            total = d.get('total_bytes') or d.get('total_bytes_estimate')
+            if total:
+                self._total_archivo[archivo] = total
+        
+        if self.observador is not None:
+            self.observador(self, d)
+    
+    def hook_postproceso(self, d):
+        nombre = d.get('postprocessor')
+        with self._lock:
+            if d.get('status') == 'started':
+                self._postprocesos[nombre] = time.monotonic()
+            elif d.get('status') == 'finished' and nombre in self._postprocesos:
+                self.postproceso_s += time.monotonic() - self._postprocesos.pop(nombre)
+    
+    def anotar_reintento(self, fragmento=False):
+        with self._lock:
+            if fragmento:
+                self.reintentos_fragmento += 1
+            else:
+                self.reintentos += 1
+    
+    def agregar_postproceso(self, segundos):
+        with self._lock:
+            self.postproceso_s += segundos
+    
+    def terminar(self, resultado='ok', ruta=None, error=None):
+        """Cierra las métricas de la descarga y las envía al registro"""
+        if error is not None:
+            resultado = 'error'
+            self.error = str(error)
+            self.motivo_error = getattr(error, 'motivo', None)
+        self.resultado = resultado
+        if ruta and os.path.exists(ruta):
+            self.tamano_final = os.path.getsize(ruta)
+        if self.retenidas is not None:
+            self.retenidas.append(self)
+        else:
+            registro_metricas.registrar(self)
+    
+    @property
+    def bytes(self):
+        with self._lock:
+            return sum(self._bytes_archivo.values())
+    
+    @property
+    def total_estimado(self):
+        """Bytes totales de los archivos en curso según el servidor (o None)"""
+        with self._lock:
+            return sum(self._total_archivo.values()) or None
+    
+    @property
+    def descarga_s(self):
+        if self._inicio_descarga is None or self._fin_descarga is None:
+            return None
+        return self._fin_descarga - self._inicio_descarga
+    
+    def como_dict(self):
+        descargado = self.bytes
+        duracion = self.descarga_s
+        redondear = lambda valor: None if valor is None else round(valor, 3)
+        return {
+            'inicio': round(self.inicio, 3),
+            'url': self.url,
+            'plataforma': self.plataforma,
+            'perfil': self.perfil,
+            'id_video': self.id_video,
+            'resultado': self.resultado,
+            'extraccion_s': redondear(self.extraccion_s),
+            'primer_byte_s': redondear(self.primer_byte_s),
+            'descarga_s': redondear(duracion),
+            'bytes': descargado,
+            'bytes_por_s': round(descargado / duracion) if duracion else None,
+            'reintentos': self.reintentos,
+            'reintentos_fragmento': self.reintentos_fragmento,
+            'postproceso_s': round(self.postproceso_s, 3),
+            'tamano_final': self.tamano_final,
+            'error': self.error,
+            'motivo_error': self.motivo_error,
+        }
+
+class RegistroMetricas:
+    """Acumula las métricas por plataforma y las exporta
+    
+    Cada descarga terminada se añade como una línea JSON y, si hay ruta de
+    Prometheus, se reescribe el archivo de texto para el textfile collector de
+    node_exporter. La escritura es atómica (temporal en la misma carpeta y
+    os.replace) para que el recolector nunca lea un archivo a medias.
+    """
+    
+    PREFIJO = 'avdownloader'
+    
+    def __init__(self, ruta_jsonl=None, ruta_prometheus=None):
+        self.ruta_jsonl = ruta_jsonl
+        self.ruta_prometheus = ruta_prometheus
+        self._por_plataforma = {}
+        self._velocidad = {}
+        self._lock = threading.Lock()
+    
+    def velocidad_reciente(self, plataforma):
+        """Media móvil de los bytes por segundo de las últimas descargas (o None)"""
+        with self._lock:
+            return self._velocidad.get(plataforma)
+    
+    def registrar(self, metricas):
+        registro = metricas.como_dict()
+        with self._lock:
+            acumulado = self._por_plataforma.setdefault(metricas.plataforma, {
+                'descargas': {'ok': 0, 'omitido': 0, 'error': 0},
+                'bytes': 0, 'descarga_s': 0.0, 'reintentos': 0, 'reintentos_fragmento': 0,
+                'extraccion': [0.0, 0], 'primer_byte': [0.0, 0], 'postproceso': [0.0, 0],
+                'ultima': 0.0,
+            })
+            acumulado['descargas'][registro['resultado']] += 1
+            acumulado['bytes'] += registro['bytes']
+            acumulado['descarga_s'] += registro['descarga_s'] or 0.0
+            acumulado['reintentos'] += registro['reintentos']
+            acumulado['reintentos_fragmento'] += registro['reintentos_fragmento']
+            for clave in ('extraccion', 'primer_byte', 'postproceso'):
+                valor = registro[f'{clave}_s']
+                if valor is not None and (clave != 'postproceso' or valor > 0):
+                    acumulado[clave][0] += valor
+                    acumulado[clave][1] += 1
+            acumulado['ultima'] = time.time()
+            if registro['bytes_por_s']:
+                anterior = self._velocidad.get(metricas.plataforma)
+                self._velocidad[metricas.plataforma] = (registro['bytes_por_s'] if anterior is None
+                                                        else 0.7 * anterior + 0.3 * registro['bytes_por_s'])
+            
+            try:
+                if self.ruta_jsonl:
+                    with open(self.ruta_jsonl, 'a', encoding='utf-8') as archivo:
+                        archivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+                if self.ruta_prometheus:
+                    self._escribir_prometheus()
+            except OSError as e:
+                print(f"   ⚠️  No se pudieron guardar las métricas: {e}")
+    
+    def _escribir_prometheus(self):
+        p = self.PREFIJO
+        lineas = []
         
-        print(f"\n   🔗 Conectando con YouTube...")
+        def metrica(nombre, tipo, ayuda, valores):
+            lineas.append(f"# HELP {p}_{nombre} {ayuda}")
+            lineas.append(f"# TYPE {p}_{nombre} {tipo}")
+            for sufijo, etiquetas, valor in valores:
+                texto = ','.join(f'{clave}="{dato}"' for clave, dato in etiquetas)
+                lineas.append(f"{p}_{nombre}{sufijo}{{{texto}}} {valor}")
         
-        # Paso 1: Seleccionar tipo de descarga
-        opciones_tipo = mostrar_opciones_tipo_descarga()
+        plataformas = sorted(self._por_plataforma.items())
+        metrica('descargas_total', 'counter', "Descargas terminadas por plataforma y resultado.",
+                [('', (('plataforma', nombre), ('resultado', resultado)), total)
+                 for nombre, a in plataformas for resultado, total in a['descargas'].items()])
+        metrica('bytes_total', 'counter', "Bytes descargados.",
+                [('', (('plataforma', nombre),), a['bytes']) for nombre, a in plataformas])
+        metrica('descarga_segundos_total', 'counter',
+                "Tiempo de transferencia; bytes_total / descarga_segundos_total es la velocidad media.",
+                [('', (('plataforma', nombre),), round(a['descarga_s'], 3)) for nombre, a in plataformas])
+        metrica('reintentos_total', 'counter', "Reintentos de peticiones HTTP.",
+                [('', (('plataforma', nombre),), a['reintentos']) for nombre, a in plataformas])
+        metrica('reintentos_fragmento_total', 'counter', "Reintentos de fragmentos (HLS/DASH).",
+                [('', (('plataforma', nombre),), a['reintentos_fragmento']) for nombre, a in plataformas])
+        for clave, ayuda in (('extraccion', "Latencia de extracción de la información."),
+                             ('primer_byte', "Tiempo hasta el primer byte descargado."),
+                             ('postproceso', "Tiempo de postproceso (ffmpeg).")):
+            valores = []
+            for nombre, a in plataformas:
+                suma, cuenta = a[clave]
+                valores.append(('_sum', (('plataforma', nombre),), round(suma, 3)))
+                valores.append(('_count', (('plataforma', nombre),), cuenta))
+            metrica(f'{clave}_segundos', 'summary', ayuda, valores)
+        metrica('ultima_descarga_timestamp_segundos', 'gauge', "Momento de la última descarga terminada.",
+                [('', (('plataforma', nombre),), round(a['ultima'], 3)) for nombre, a in plataformas])
         
-        print()
-        while True:
-            try:
-                opcion_tipo = input(f"   Selecciona el tipo de descarga (1-{len(opciones_tipo)}): ").strip()
-                opcion_tipo_num = int(opcion_tipo)
-                
-                if 1 <= opcion_tipo_num <= len(opciones_tipo):
-                    tipo_seleccionado = opciones_tipo[opcion_tipo_num]['tipo']
-                    descripcion_tipo = opciones_tipo[opcion_tipo_num]['descripcion']
-                    break
-                else:
-                    print(f"   ❌ Opción inválida. Selecciona entre 1 y {len(opciones_tipo)}")
-            except ValueError:
-                print("   ❌ Por favor ingresa un número válido.")
-        
-        # Paso 2: Seleccionar calidad según el tipo
-        if tipo_seleccionado == 'video':
-            # Mostrar opciones de calidad de video
-            opciones_calidad = mostrar_opciones_calidad_youtube()
-            print()
-            while True:
-                try:
-                    opcion_calidad = input(f"   Selecciona la calidad (1-{len(opciones_calidad)}): ").strip()
-                    opcion_calidad_num = int(opcion_calidad)
-                    
-                    if 1 <= opcion_calidad_num <= len(opciones_calidad):
-                        formato_seleccionado = opciones_calidad[opcion_calidad_num]['formato']
-                        descripcion_calidad = opciones_calidad[opcion_calidad_num]['descripcion']
-                        break
-                    else:
-                        print(f"   ❌ Opción inválida. Selecciona entre 1 y {len(opciones_calidad)}")
-                except ValueError:
-                    print("   ❌ Por favor ingresa un número válido.")
+        carpeta = os.path.dirname(os.path.abspath(self.ruta_prometheus))
+        temporal = os.path.join(carpeta, f".{os.path.basename(self.ruta_prometheus)}.{os.getpid()}.tmp")
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            archivo.write('\n'.join(lineas) + '\n')
+        os.replace(temporal, self.ruta_prometheus)
+
+registro_metricas = RegistroMetricas()
+
+# ===================== POOL DE YOUTUBEDL =====================
+
+def construir_opciones_sondeo():
+    """Construye las opciones de yt-dlp para obtener información sin descargar"""
+    return {
+        'quiet': True,
+        'no_warnings': True,
+        'noplaylist': True,
+        'extract_flat': False,
+        'ignoreerrors': True,
+        'http_headers': {
+            'User-Agent': USER_AGENT
+        }
+    }
+
+def opciones_perfil(perfil):
+    """Devuelve las opciones base de yt-dlp de un perfil del pool
+    
+    La plantilla de salida y el formato se ajustan en cada préstamo, así que
+    aquí solo está lo que obliga a tener instancias distintas (postprocesadores,
+    cabeceras y modo de sondeo).
+    """
+    if perfil == 'metadata-probe':
+        return construir_opciones_sondeo()
+    elif perfil == 'youtube-video':
+        return construir_opciones_youtube('video')
+    elif perfil == 'youtube-mp3':
+        return construir_opciones_youtube('audio_mp3')
+    elif perfil == 'youtube-wav':
+        return construir_opciones_youtube('audio_wav')
+    elif perfil == 'youtube-audio':
+        # Audio original sin convertir: la conversión la hace la etapa de transcodificación
+        return construir_opciones_youtube('audio')
+    elif perfil == 'playlist-flat':
+        return construir_opciones_lista()
+    elif perfil == 'facebook':
+        return construir_opciones_facebook()
+    elif perfil == 'instagram':
+        return construir_opciones_instagram()
+    else:
+        raise ValueError(f"Perfil de yt-dlp desconocido: {perfil}")
+
+class PoolYoutubeDL:
+    """Pool de instancias de YoutubeDL reutilizables, agrupadas por perfil de opciones
+    
+    Cada instancia se presta en exclusiva a un hilo; si no hay ninguna libre para
+    el perfil se crea otra, de modo que el número de instancias sigue a la
+    concurrencia máxima real y la configuración de extractores, cookies y
+    conexiones se paga una sola vez por instancia.
+    """
+    
+    def __init__(self):
+        self._libres = {}
+        self._todas = []
+        self._lock = threading.Lock()
+    
+    def _crear(self, perfil):
+        ydl = clase_youtube_dl()(opciones_perfil(perfil))
+        ydl._perfil_pool = perfil
+        with self._lock:
+            self._todas.append(ydl)
+        return ydl
+    
+    def _tomar(self, perfil):
+        with self._lock:
+            libres = self._libres.get(perfil)
+            if libres:
+                return libres.pop()
+        return self._crear(perfil)
+    
+    def _devolver(self, ydl):
+        with self._lock:
+            self._libres.setdefault(ydl._perfil_pool, []).append(ydl)
+    
+    @contextmanager
+    def prestar(self, perfil, outtmpl=None, formato=None, silencioso=None, metricas=None, tramos=None):
+        """Presta una instancia del perfil ajustando plantilla, formato y verbosidad
+        
+        Con tramos ('90-120;300-') solo se descargan esas partes de cada video
+        (ver rangos_descarga). Si se pasan métricas, los hooks de la instancia las alimentan mientras
+        dure el préstamo. Los ajustes se deshacen al devolver la instancia al pool.
+        """
+        ydl = self._tomar(perfil)
+        params = ydl.params
+        originales = {clave: params.get(clave) for clave in ('quiet', 'noprogress', 'no_warnings')}
+        outtmpl_original = params['outtmpl'].get('default')
+        formato_original = params.get('format')
+        selector_original = ydl.format_selector
+        
+        try:
+            if outtmpl is not None:
+                params['outtmpl']['default'] = outtmpl
+            if formato is not None and formato != formato_original:
+                params['format'] = formato
+                ydl.format_selector = ydl.build_format_selector(formato)
+            if silencioso is not None and perfil != 'metadata-probe':
+                params['quiet'] = silencioso
+                params['noprogress'] = silencioso
+                params['no_warnings'] = silencioso
+            if tramos:
+                params['download_ranges'] = rangos_descarga(tramos)
+            ydl._metricas = metricas
+            
+            yield ydl
+        finally:
+            ydl._metricas = None
+            params.pop('download_ranges', None)
+            params.update(originales)
+            params['outtmpl']['default'] = outtmpl_original
+            params['format'] = formato_original
+            ydl.format_selector = selector_original
+            self._devolver(ydl)
+    
+    def cerrar(self):
+        """Cierra todas las instancias (guarda cookies y libera conexiones)"""
+        with self._lock:
+            todas, self._todas, self._libres = self._todas, [], {}
+        for ydl in todas:
+            try:
+                ydl.close()
+            except Exception:
+                pass
+
+pool_ydl = PoolYoutubeDL()
+atexit.register(pool_ydl.cerrar)
+
+# ===================== ERRORES Y REINTENTOS =====================
+class ErrorDescarga(Exception):
+    """Error de descarga clasificado
+    
+    motivo identifica la causa ('privado', 'region', 'red'...) para elegir los
+    consejos que se muestran y transitorio indica si merece la pena reintentar;
+    intentos limita los reintentos de ese error por debajo de REINTENTOS.
+    """
+    transitorio = False
+    
+    def __init__(self, mensaje, motivo='desconocido', estado_http=None, intentos=None):
+        super().__init__(mensaje)
+        self.motivo = motivo
+        self.estado_http = estado_http
+        self.intentos = intentos
+
+class ErrorPermanente(ErrorDescarga):
+    """El video no se va a poder descargar por mucho que se reintente"""
+
+class ErrorTransitorio(ErrorDescarga):
+    """Fallo pasajero (red, 5xx, tiempo agotado) que puede salir bien al reintentar"""
+    transitorio = True
+
+class ErrorLimiteTasa(ErrorTransitorio):
+    """La plataforma está limitando las peticiones (429 o aviso equivalente)"""
+
+class ErrorDesconocido(ErrorDescarga):
+    """Error sin motivo identificado: se reintenta una vez, pero como puede ser
+    local (un fallo del programa, de ffmpeg, del disco) no cuenta como fallo de
+    la plataforma en el cortacircuitos"""
+    transitorio = True
+    
+    def __init__(self, mensaje, motivo='desconocido', estado_http=None, intentos=1):
+        super().__init__(mensaje, motivo, estado_http, intentos)
+
+# Motivos que yt-dlp solo da en el texto del error, en orden de prioridad
+MOTIVOS_ERROR = [
+    ('limite', ErrorLimiteTasa, re.compile(
+        r'\b429\b|too many requests|rate[- ]limit|please wait a few minutes', re.I)),
+    ('ffmpeg', ErrorPermanente, re.compile(r'ffmpeg|ffprobe', re.I)),
+    ('region', ErrorPermanente, re.compile(r'available (?:in|from) your (?:country|location)|geo|region|blocked', re.I)),
+    ('edad', ErrorPermanente, re.compile(r'age[- ]restrict|confirm your age|inappropriate', re.I)),
+    ('privado', ErrorPermanente, re.compile(r'private', re.I)),
+    ('sesion', ErrorPermanente, re.compile(r'sign in|log ?in|cookies', re.I)),
+    ('premium', ErrorPermanente, re.compile(r'premium|members[- ]only|join this channel', re.I)),
+    ('copyright', ErrorPermanente, re.compile(r'copyright', re.I)),
+    ('directo', ErrorPermanente, re.compile(r'live event|is live|premiere', re.I)),
+    ('no_disponible', ErrorPermanente, re.compile(r'unavailable|not available|removed|deleted|does not exist', re.I)),
+    ('red', ErrorTransitorio, re.compile(
+        r'timed? ?out|connection (?:reset|refused|aborted)|temporary failure|incomplete ?read|'
+        r'remote end closed|network is unreachable|did not get any data blocks|incomplete data received|'
+        r'\b50[0234]\b', re.I)),
+]
+
+CONSEJOS_ERROR = {
+    'limite': ["💡 La plataforma está limitando las descargas. Espera un momento."],
+    'ffmpeg': ["💡 Error de ffmpeg: Se requiere ffmpeg para conversión de audio.",
+               "📥 Instala ffmpeg desde: https://ffmpeg.org/"],
+    'privado': ["💡 El video puede ser privado o no estar disponible."],
+    'no_disponible': ["💡 El video no está disponible o fue eliminado."],
+    'edad': ["💡 El video puede tener restricciones de edad.",
+             "📝 Intenta con otro video o verifica la configuración de tu cuenta."],
+    'region': ["💡 El video puede estar bloqueado en tu región."],
+    'copyright': ["💡 El video puede tener restricciones de copyright."],
+    'directo': ["💡 No se pueden descargar transmisiones en vivo."],
+    'premium': ["💡 El video puede requerir YouTube Premium."],
+    'sesion': ["💡 El video puede requerir iniciar sesión."],
+    'cancelado': ["💡 La descarga se canceló antes de terminar."],
+    'tramo': ["💡 Revisa los tramos pedidos: deben caer dentro de la duración del video."],
+    'no_soportado': ["💡 La URL no corresponde a un video de una plataforma soportada."],
+    'red': ["💡 Fallo de red o del servidor. Se reintentó sin éxito; prueba más tarde."],
+    'acceso': ["💡 El servidor rechazó la descarga incluso con la información del video renovada.",
+               "📝 Prueba más tarde o actualiza yt-dlp: pip install --upgrade yt-dlp"],
+    'desconocido': ["💡 Error desconocido. Verifica la URL y la conexión.",
+                    "📋 Soluciones:",
+                    "   - Verifica que el video sea público",
+                    "   - Copia la URL directamente desde la plataforma",
+                    "   - Intenta con otro video",
+                    "   - Actualiza yt-dlp: pip install --upgrade yt-dlp"],
+    ('youtube', 'ffmpeg'): ["💡 Error de ffmpeg: Se requiere ffmpeg para conversión de audio.",
+                            "📥 Instala ffmpeg desde: https://ffmpeg.org/",
+                            "💡 O intenta descargar solo el video."],
+    ('facebook', 'privado'): ["💡 El video puede ser privado o requerir autenticación."],
+    ('facebook', 'sesion'): ["💡 El video puede ser privado o requerir autenticación."],
+    ('facebook', 'desconocido'): ["💡 Verifica que el video sea público y la URL sea correcta."],
+    ('instagram', 'privado'): ["💡 La cuenta o el post puede ser privado."],
+    ('instagram', 'sesion'): ["💡 La cuenta o el post puede ser privado."],
+    ('instagram', 'no_disponible'): ["💡 El post no está disponible o fue eliminado."],
+    ('instagram', 'limite'): ["💡 Instagram está limitando las descargas. Espera un momento."],
+    ('instagram', 'desconocido'): ["💡 Verifica que el post sea público y la URL sea correcta."],
+}
+
+def causas_error(error):
+    """Recorre la cadena de causas de un error (exc_info de yt-dlp, cause, __cause__)"""
+    vistos = set()
+    while error is not None and id(error) not in vistos:
+        vistos.add(id(error))
+        yield error
+        exc_info = getattr(error, 'exc_info', None)
+        siguiente = exc_info[1] if isinstance(exc_info, tuple) and len(exc_info) > 1 else None
+        error = (siguiente or (getattr(error, 'cause', None) if isinstance(getattr(error, 'cause', None), BaseException)
+                               else None) or error.__cause__ or error.__context__)
+
+def clasificar_error(error, fase=None):
+    """Convierte cualquier excepción de una descarga en un ErrorDescarga
+    
+    Primero se mira el tipo de las excepciones de la cadena (errores HTTP y de
+    transporte, restricciones geográficas, errores de postproceso); si no basta,
+    el mensaje de yt-dlp decide el motivo con MOTIVOS_ERROR.
+    
+    Solo son permanentes los motivos identificados: un 403 con fase='descarga'
+    suele ser una URL de formato caducada y un error sin motivo conocido puede
+    ser pasajero, así que ambos se reintentan una vez (con información nueva).
+    """
+    import socket
+    
+    if isinstance(error, ErrorDescarga):
+        return error
+    mensaje = str(error)
+    
+    try:
+        importar_yt_dlp()
+        from yt_dlp.networking.exceptions import HTTPError, TransportError
+        from yt_dlp.utils import GeoRestrictedError, PostProcessingError, UnsupportedError
+    except ImportError:
+        HTTPError = TransportError = GeoRestrictedError = PostProcessingError = UnsupportedError = ()
+    
+    for causa in causas_error(error):
+        if isinstance(causa, ErrorDescarga):
+            return causa
+        estado = getattr(getattr(causa, 'response', None), 'status', None) or getattr(causa, 'status', None)
+        if isinstance(causa, HTTPError) or isinstance(estado, int):
+            if estado == 429:
+                return ErrorLimiteTasa(mensaje, 'limite', estado)
+            if estado in (408, 425) or (isinstance(estado, int) and estado >= 500):
+                return ErrorTransitorio(mensaje, 'red', estado)
+            if estado == 403 and fase == 'descarga':
+                return ErrorTransitorio(mensaje, 'acceso', estado, intentos=1)
+            if estado in (401, 403):
+                return ErrorPermanente(mensaje, 'sesion' if estado == 401 else 'privado', estado)
+            if estado in (404, 410):
+                return ErrorPermanente(mensaje, 'no_disponible', estado)
+        if isinstance(causa, GeoRestrictedError):
+            return ErrorPermanente(mensaje, 'region')
+        if isinstance(causa, UnsupportedError):
+            return ErrorPermanente(mensaje, 'no_soportado')
+        if isinstance(causa, PostProcessingError):
+            return ErrorPermanente(mensaje, 'ffmpeg')
+        if isinstance(causa, (TransportError, socket.timeout, ConnectionError, TimeoutError)):
+            # Un 429 puede venir como error de transporte con el texto del servidor
+            if MOTIVOS_ERROR[0][2].search(mensaje):
+                return ErrorLimiteTasa(mensaje, 'limite')
+            return ErrorTransitorio(mensaje, 'red')
+    
+    for motivo, clase, patron in MOTIVOS_ERROR:
+        if patron.search(mensaje):
+            return clase(mensaje, motivo)
+    return ErrorDesconocido(mensaje)
+
+def es_error_limite_tasa(error):
+    """Indica si una excepción se debe a que la plataforma está limitando"""
+    return isinstance(clasificar_error(error), ErrorLimiteTasa)
+
+def consejos_error(error, plataforma=None):
+    """Devuelve los consejos para el usuario según el motivo del error"""
+    return (CONSEJOS_ERROR.get((plataforma, error.motivo)) or CONSEJOS_ERROR.get(error.motivo)
+            or CONSEJOS_ERROR.get((plataforma, 'desconocido')) or CONSEJOS_ERROR['desconocido'])
+
+def mostrar_error_descarga(error, plataforma, nombre_plataforma):
+    """Imprime un error de descarga clasificado y sus consejos"""
+    print(f"❌ Error durante la descarga de {nombre_plataforma}: {error}")
+    for consejo in consejos_error(error, plataforma):
+        print(f"   {consejo}")
+
+# Reintentos de errores transitorios: espera aleatoria entre 0 y base * 2^intento
+# (jitter completo) sin pasar de maximo_s, para no sincronizar a los trabajadores
+REINTENTOS = {
+    'intentos': 3,
+    'base_s': 2.0,
+    'maximo_s': 60.0,
+}
+
+def espera_reintento(intento):
+    """Segundos a esperar antes del reintento número intento (empezando en 0)"""
+    import random
+    
+    return random.uniform(0, min(REINTENTOS['maximo_s'], REINTENTOS['base_s'] * 2 ** intento))
+
+# ===================== LIMITACIÓN POR PLATAFORMA =====================
+
+# tasa: peticiones por segundo al arrancar (el controlador la ajusta entre
+# tasa_min y tasa_max); rafaga: peticiones seguidas permitidas;
+# concurrencia: descargas simultáneas máximas contra la plataforma.
+LIMITES_PLATAFORMA = {
+    'youtube': {'tasa': 2.0, 'tasa_min': 0.1, 'tasa_max': 8.0, 'rafaga': 4, 'concurrencia': 8},
+    'facebook': {'tasa': 1.0, 'tasa_min': 0.05, 'tasa_max': 4.0, 'rafaga': 2, 'concurrencia': 4},
+    'instagram': {'tasa': 0.5, 'tasa_min': 0.02, 'tasa_max': 2.0, 'rafaga': 1, 'concurrencia': 2},
+}
+
+# Cortacircuitos: si en los últimos ventana_s segundos hay al menos minimo
+# resultados y la proporción de fallos transitorios llega a umbral, la
+# plataforma deja de recibir peticiones durante pausa_s (que se duplica, hasta
+# pausa_max_s, cada vez que la petición de prueba vuelve a fallar).
+CIRCUITO = {
+    'ventana_s': 60.0,
+    'minimo': 5,
+    'umbral': 0.5,
+    'pausa_s': 30.0,
+    'pausa_max_s': 300.0,
+}
+
+class ControladorPlataforma:
+    """Cubeta de tokens con concurrencia adaptativa (AIMD) para una plataforma
+    
+    Cada acceso a la red consume un token y ocupa un hueco de concurrencia. Cuando
+    la plataforma responde con 429 o un error de límite de tasa, la tasa y la
+    concurrencia se reducen a la mitad; cada respuesta correcta las vuelve a
+    subir poco a poco.
+    
+    Además lleva un cortacircuitos (cerrado, abierto, medio_abierto): con el
+    circuito abierto adquirir espera a que pase la pausa y después solo deja
+    pasar una petición de prueba, que lo cierra si sale bien o lo vuelve a
+    abrir si falla. Los errores permanentes (video privado, eliminado...) y
+    los de motivo desconocido no cuentan como fallo de la plataforma.
+    """
+    
+    def __init__(self, plataforma, tasa, tasa_min, tasa_max, rafaga, concurrencia):
+        self.plataforma = plataforma
+        self.tasa = tasa
+        self.tasa_min = tasa_min
+        self.tasa_max = tasa_max
+        self.rafaga = rafaga
+        self.concurrencia_max = concurrencia
+        self.concurrencia = concurrencia
+        self.activos = 0
+        self.limitaciones = 0
+        self._aciertos = 0
+        self.circuito = 'cerrado'
+        self.aperturas = 0
+        self._resultados = []
+        self._pausa = CIRCUITO['pausa_s']
+        self._reapertura = 0.0
+        self._prueba_en_curso = False
+        self._tokens = float(rafaga)
+        self._ultimo = time.monotonic()
+        self._cond = threading.Condition()
+    
+    def _reponer(self):
+        ahora = time.monotonic()
+        self._tokens = min(self.rafaga, self._tokens + (ahora - self._ultimo) * self.tasa)
+        self._ultimo = ahora
+    
+    def adquirir(self):
+        """Espera a que el circuito lo permita, haya hueco de concurrencia y un token"""
+        with self._cond:
+            while True:
+                if self.circuito == 'abierto':
+                    restante = self._reapertura - time.monotonic()
+                    if restante > 0:
+                        self._cond.wait(restante)
+                        continue
+                    self.circuito = 'medio_abierto'
+                
+                if self.circuito == 'medio_abierto' and self._prueba_en_curso:
+                    self._cond.wait()
+                    continue
+                
+                self._reponer()
+                if self.activos < self.concurrencia and self._tokens >= 1:
+                    self._tokens -= 1
+                    self.activos += 1
+                    if self.circuito == 'medio_abierto':
+                        self._prueba_en_curso = True
+                    return
+                
+                if self.activos >= self.concurrencia:
+                    self._cond.wait()
+                else:
+                    self._cond.wait((1 - self._tokens) / self.tasa)
+    
+    def _anotar_circuito(self, fallo):
+        """Actualiza el cortacircuitos con el resultado de una petición"""
+        ahora = time.monotonic()
+        if self.circuito == 'medio_abierto' and self._prueba_en_curso:
+            self._prueba_en_curso = False
+            if fallo:
+                self._pausa = min(CIRCUITO['pausa_max_s'], self._pausa * 2)
+                self._abrir_circuito(ahora)
+            else:
+                self.circuito = 'cerrado'
+                self._pausa = CIRCUITO['pausa_s']
+                self._resultados = []
+            return
+        
+        self._resultados.append((ahora, fallo))
+        limite = ahora - CIRCUITO['ventana_s']
+        self._resultados = [r for r in self._resultados if r[0] >= limite]
+        fallos = sum(1 for _, f in self._resultados if f)
+        if (self.circuito == 'cerrado' and len(self._resultados) >= CIRCUITO['minimo']
+                and fallos >= CIRCUITO['umbral'] * len(self._resultados)):
+            self._abrir_circuito(ahora)
+    
+    def _abrir_circuito(self, ahora):
+        self.circuito = 'abierto'
+        self.aperturas += 1
+        self._reapertura = ahora + self._pausa
+        self._resultados = []
+    
+    def liberar(self, resultado='ok'):
+        """Libera el hueco y ajusta tasa, concurrencia y circuito según el resultado
+        
+        resultado es 'ok', 'limitado' (429 o equivalente), 'fallo' (error
+        transitorio de la plataforma), 'permanente' (error del propio video) o
+        'desconocido' (sin motivo identificado, que no se achaca a la plataforma).
+        """
+        with self._cond:
+            self.activos -= 1
+            self._anotar_circuito(resultado in ('limitado', 'fallo'))
+            if resultado == 'limitado':
+                # Disminución multiplicativa
+                self.limitaciones += 1
+                self.tasa = max(self.tasa_min, self.tasa / 2)
+                self.concurrencia = max(1, self.concurrencia // 2)
+                self._aciertos = 0
+                self._tokens = min(self._tokens, 0.0)
+            elif resultado == 'ok':
+                # Aumento aditivo: +0.1 peticiones/s y +1 de concurrencia por cada
+                # ventana completa de respuestas correctas (tantas como el límite actual)
+                self.tasa = min(self.tasa_max, self.tasa + 0.1)
+                if self.concurrencia < self.concurrencia_max:
+                    self._aciertos += 1
+                    if self._aciertos >= self.concurrencia:
+                        self.concurrencia += 1
+                        self._aciertos = 0
+            self._cond.notify_all()
+    
+    @contextmanager
+    def permiso(self):
+        """Contexto que adquiere un permiso y lo libera informando del resultado"""
+        self.adquirir()
+        resultado = 'ok'
+        try:
+            yield
+        except BaseException as e:
+            error = clasificar_error(e) if isinstance(e, Exception) else None
+            if error is None or not error.transitorio:
+                resultado = 'permanente'
+            elif isinstance(error, ErrorDesconocido):
+                resultado = 'desconocido'
+            else:
+                resultado = 'limitado' if isinstance(error, ErrorLimiteTasa) else 'fallo'
+            raise
+        finally:
+            self.liberar(resultado)
+
+_controladores = {}
+_controladores_lock = threading.Lock()
+
+def controlador_plataforma(plataforma):
+    """Devuelve el controlador compartido de una plataforma (se crea al primer uso)"""
+    with _controladores_lock:
+        controlador = _controladores.get(plataforma)
+        if controlador is None:
+            limites = LIMITES_PLATAFORMA.get(plataforma, LIMITES_PLATAFORMA['youtube'])
+            controlador = _controladores[plataforma] = ControladorPlataforma(plataforma, **limites)
+        return controlador
+
+def configurar_limite_plataforma(especificacion):
+    """Aplica un límite con el formato plataforma=tasa[:concurrencia]"""
+    plataforma, _, valores = especificacion.partition('=')
+    plataforma = plataforma.strip().lower()
+    if plataforma not in LIMITES_PLATAFORMA or not valores:
+        raise ValueError(f"Límite no válido: {especificacion} (usa plataforma=tasa[:concurrencia])")
+    
+    tasa, _, concurrencia = valores.partition(':')
+    limites = LIMITES_PLATAFORMA[plataforma]
+    limites['tasa'] = float(tasa)
+    limites['tasa_max'] = max(limites['tasa_max'], limites['tasa'])
+    if concurrencia:
+        limites['concurrencia'] = int(concurrencia)
+
+# ===================== ANCHO DE BANDA =====================
+
+# franjas: lista de (minuto_inicio, minuto_fin, bytes_por_s) en hora local; fuera
+# de todas ellas no hay límite. pesos: reparto relativo entre plataformas.
+ANCHO_BANDA = {
+    'franjas': [],
+    'pesos': {'youtube': 1.0, 'facebook': 1.0, 'instagram': 1.0},
+    'minimo': 16 * 1024,
+    'lectura': 64 * 1024,        # bytes máximos por lectura, para repartir sin ráfagas
+}
+
+def convertir_tasa(texto):
+    """Convierte '500K', '2.5M' o '1G' (bytes por segundo) en un número"""
+    coincidencia = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([kmg]?)i?b?\s*', texto, re.I)
+    if not coincidencia:
+        raise ValueError(f"Tasa no válida: {texto} (usa p. ej. 500K, 2M)")
+    numero, unidad = coincidencia.groups()
+    return float(numero) * 1024 ** ' kmg'.index(unidad.lower() or ' ')
+
+def configurar_ancho_banda(especificacion):
+    """Añade una franja con el formato TASA[@HH:MM-HH:MM] (sin horas, todo el día)"""
+    tasa, _, horario = especificacion.partition('@')
+    inicio, fin = 0, 24 * 60
+    if horario:
+        coincidencia = re.fullmatch(r'\s*(\d{1,2})(?::(\d\d))?\s*-\s*(\d{1,2})(?::(\d\d))?\s*', horario)
+        if not coincidencia:
+            raise ValueError(f"Horario no válido: {horario} (usa HH:MM-HH:MM)")
+        h1, m1, h2, m2 = coincidencia.groups()
+        inicio, fin = int(h1) * 60 + int(m1 or 0), int(h2) * 60 + int(m2 or 0)
+        if inicio >= 24 * 60 or fin > 24 * 60:
+            raise ValueError(f"Horario no válido: {horario}")
+    ANCHO_BANDA['franjas'].append((inicio, fin, convertir_tasa(tasa)))
+
+def presupuesto_ancho_banda(momento=None):
+    """Bytes por segundo permitidos en este momento según las franjas (None = sin límite)"""
+    local = time.localtime(momento)
+    minuto = local.tm_hour * 60 + local.tm_min
+    for inicio, fin, tasa in ANCHO_BANDA['franjas']:
+        # Las franjas que cruzan la medianoche (22:00-06:00) tienen fin < inicio
+        if inicio <= minuto < fin if inicio < fin else (minuto >= inicio or minuto < fin):
+            return tasa
+    return None
+
+class AsignacionAncho:
+    """Parte del ancho de banda global asignada a una descarga
+    
+    Es una cubeta de tokens con la cuota que le da el reparto. Los hilos de la
+    descarga (fragmentos, pistas, segmentos) llaman a consumir después de cada
+    lectura y esperan mientras la cubeta esté en deuda; si la cuota cambia se
+    despiertan y recalculan la espera con la nueva. Si en el último segundo
+    ningún hilo ha tenido que esperar, la cuota no es lo que frena la descarga
+    (el servidor, el disco...) y el reparto le da solo algo más de lo que usa.
+    """
+    
+    def __init__(self, reparto, peso):
+        self.reparto = reparto
+        self.peso = peso
+        self.cuota = None
+        self.tasa = None
+        self.saturada = True
+        self._espero = False
+        self._esperando = 0
+        self._tokens = 0.0
+        self._ultimo = time.monotonic()
+        self._muestra = (self._ultimo, 0)
+        self._actividad = self._ultimo
+        self._cond = threading.Condition()
+    
+    def _reponer(self, ahora):
+        if self.cuota is None:
+            self._tokens = 0.0
+        else:
+            rafaga = max(ANCHO_BANDA['lectura'], self.cuota / 4)
+            self._tokens = min(rafaga, self._tokens + (ahora - self._ultimo) * self.cuota)
+        self._ultimo = ahora
+    
+    def ajustar(self, cuota):
+        with self._cond:
+            self._reponer(time.monotonic())
+            self.cuota = cuota
+            self._cond.notify_all()
+    
+    def demanda(self, ahora):
+        """Bytes por segundo que la descarga aprovecharía (inf si quiere más)"""
+        with self._cond:
+            if ahora - self._actividad > 2.0 and not self._esperando:
+                # Parada (uniendo pistas, postprocesando...): cede su parte
+                return ANCHO_BANDA['minimo']
+            if self.tasa is None or self.cuota is None or self.saturada or self._esperando:
+                return float('inf')
+            # Va más lenta que su cuota por otro motivo: se queda con un margen
+            return max(ANCHO_BANDA['minimo'], self.tasa * 1.25)
+    
+    def consumir(self, cantidad):
+        muestrear = False
+        with self._cond:
+            ahora = time.monotonic()
+            self._reponer(ahora)
+            self._tokens -= cantidad
+            
+            self._actividad = ahora
+            inicio_muestra, bytes_muestra = self._muestra
+            bytes_muestra += cantidad
+            if ahora - inicio_muestra >= 1.0:
+                tasa = bytes_muestra / (ahora - inicio_muestra)
+                self.tasa = tasa if self.tasa is None else 0.5 * self.tasa + 0.5 * tasa
+                self.saturada = self._espero or self._esperando > 0
+                self._espero = False
+                self._muestra = (ahora, 0)
+                muestrear = True
+            else:
+                self._muestra = (inicio_muestra, bytes_muestra)
+        
+        if muestrear:
+            self.reparto.repartir()
+        
+        with self._cond:
+            while self.cuota is not None and self._tokens < 0:
+                self._espero = True
+                self._esperando += 1
+                self._cond.wait(-self._tokens / self.cuota)
+                self._esperando -= 1
+                self._reponer(time.monotonic())
+
+class RepartoAnchoBanda:
+    """Reparte el presupuesto de ancho de banda entre las descargas activas
+    
+    Usa reparto justo max-min ponderado: cada descarga recibe como mucho lo que
+    aprovecha y lo que sobra se divide entre las demás según su peso. Se
+    recalcula al empezar o terminar una descarga y cada segundo con la
+    velocidad medida, así que la parte que una descarga no usa pasa enseguida
+    a las otras.
+    """
+    
+    def __init__(self):
+        self._asignaciones = []
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def asignacion(self, peso=1.0):
+        """Registra una descarga durante el contexto; sin franjas devuelve None"""
+        if not ANCHO_BANDA['franjas']:
+            yield None
+            return
+        
+        asignacion = AsignacionAncho(self, peso)
+        with self._lock:
+            self._asignaciones.append(asignacion)
+        self.repartir()
+        try:
+            yield asignacion
+        finally:
+            with self._lock:
+                self._asignaciones.remove(asignacion)
+            self.repartir()
+    
+    def repartir(self):
+        with self._lock:
+            presupuesto = presupuesto_ancho_banda()
+            if presupuesto is None:
+                for asignacion in self._asignaciones:
+                    asignacion.ajustar(None)
+                return
+            
+            ahora = time.monotonic()
+            cuotas = {}
+            pendientes = [(a, a.demanda(ahora)) for a in self._asignaciones]
+            restante = presupuesto
+            while pendientes:
+                peso_total = sum(a.peso for a, _ in pendientes)
+                saciadas = [(a, d) for a, d in pendientes if d <= restante * a.peso / peso_total]
+                if not saciadas:
+                    for asignacion, _ in pendientes:
+                        cuotas[asignacion] = restante * asignacion.peso / peso_total
+                    restante = 0
+                    break
+                for asignacion, demanda in saciadas:
+                    cuotas[asignacion] = demanda
+                    restante -= demanda
+                pendientes = [(a, d) for a, d in pendientes if a not in cuotas]
+            
+            # Si todas tienen lo que piden, lo que sobra se reparte igualmente para
+            # que una descarga que vuelva a acelerar no espere a la siguiente medida
+            peso_total = sum(a.peso for a in self._asignaciones)
+            for asignacion, cuota in cuotas.items():
+                asignacion.ajustar(cuota + restante * asignacion.peso / peso_total)
+    
+    def cuotas(self):
+        with self._lock:
+            return [(a.peso, a.cuota, a.tasa) for a in self._asignaciones]
+
+reparto_ancho_banda = RepartoAnchoBanda()
+
+@contextmanager
+def prioridad_descargas(peso):
+    """Multiplica el peso en el reparto de ancho de banda de las descargas de este hilo"""
+    anterior = getattr(_contexto_descarga, 'prioridad', 1.0)
+    _contexto_descarga.prioridad = peso
+    try:
+        yield
+    finally:
+        _contexto_descarga.prioridad = anterior
+
+def limitar_respuesta(respuesta, asignacion):
+    """Hace que las lecturas de una respuesta de yt-dlp consuman de la asignación
+    
+    Las lecturas grandes (o de la respuesta entera, como hacen los fragmentos) se
+    parten en trozos de ANCHO_BANDA['lectura'] para que la espera se reparta a lo
+    largo de la transferencia en vez de llegar de golpe al final.
+    """
+    leer = respuesta.read
+    
+    def read(amt=None):
+        if amt is None or amt < 0:
+            partes = []
+            while True:
+                datos = read(ANCHO_BANDA['lectura'])
+                if not datos:
+                    return b''.join(partes)
+                partes.append(datos)
+        
+        datos = leer(min(amt, ANCHO_BANDA['lectura']))
+        if datos:
+            asignacion.consumir(len(datos))
+        return datos
+    
+    respuesta.read = read
+    return respuesta
+
+# ===================== POLÍTICA DE FORMATOS =====================
+# Reglas para elegir el formato con calidad 'auto'. Los límites a None no se aplican.
+POLITICA_FORMATOS = {
+    'activa': False,
+    'objetivo': 'mejor',         # 'mejor' calidad dentro de los límites o 'menor' que cumpla el mínimo
+    'altura_min': None,
+    'altura_max': 1080,
+    'abr_min': None,             # kbps, solo audio
+    'abr_max': None,
+    'tasa_max_kbps': None,
+    'tamano_max_mb': None,
+    'tiempo_max_s': None,        # presupuesto según la velocidad reciente medida de la plataforma
+    'pistas_separadas': False,   # admite video sin audio + la mejor pista de audio (DASH)
+    'codecs_video': ['avc1', 'vp9', 'vp09', 'av01', 'hev1'],
+    'codecs_audio': ['mp4a', 'opus', 'vorbis'],
+}
+
+def cargar_politica_formatos(ruta):
+    """Carga la política de formatos desde un archivo JSON y la activa
+    
+    Solo se admiten las claves de POLITICA_FORMATOS; las que no aparecen en el
+    archivo conservan su valor por defecto.
+    """
+    with open(ruta, encoding='utf-8') as archivo:
+        politica = json.load(archivo)
+    if not isinstance(politica, dict):
+        raise ValueError("La política de formatos debe ser un objeto JSON")
+    
+    desconocidas = set(politica) - set(POLITICA_FORMATOS) - {'activa'}
+    if desconocidas:
+        raise ValueError(f"Claves desconocidas en la política de formatos: {', '.join(sorted(desconocidas))}")
+    if politica.get('objetivo', 'mejor') not in ('mejor', 'menor'):
+        raise ValueError("El objetivo de la política debe ser 'mejor' o 'menor'")
+    
+    POLITICA_FORMATOS.update(politica)
+    POLITICA_FORMATOS['activa'] = True
+
+def rango_codec(codec, preferidos):
+    """Posición del codec en la lista de preferencia (los desconocidos van al final)"""
+    codec = (codec or '').lower()
+    for posicion, prefijo in enumerate(preferidos):
+        if codec.startswith(prefijo):
+            return posicion
+    return len(preferidos)
+
+def medidas_formato(formato, duracion):
+    """Devuelve (tasa en kbps, tamaño en bytes) de un formato, estimando lo que falte"""
+    tasa = formato.get('tbr') or (formato.get('vbr') or 0) + (formato.get('abr') or 0) or None
+    tamano = (formato.get('filesize') or formato.get('filesize_approx')
+              or (tasa and duracion and tasa * 125 * duracion))
+    return tasa, tamano
+
+def elegir_formato(info, clase, plataforma=None, politica=None):
+    """Elige un formato de info['formats'] aplicando la política de formatos
+    
+    clase es 'video' (formatos con video y audio) o 'audio' (solo audio). Con
+    objetivo 'mejor' gana la mayor calidad que cumple los límites; con 'menor',
+    la menor que alcanza el mínimo. A igual calidad se prefiere el codec mejor
+    situado en la lista y después el archivo más pequeño. Con pistas_separadas
+    también valen las pistas de solo video, que se combinan con la pista de audio
+    elegida ('137+140'). Devuelve el selector elegido o None si ningún formato
+    cumple la política.
+    """
+    politica = politica or POLITICA_FORMATOS
+    duracion = info.get('duration')
+    formatos = {formato.get('format_id'): formato for formato in info.get('formats') or []}
+    
+    audio = tamano_audio = None
+    if clase == 'video' and politica.get('pistas_separadas'):
+        audio = elegir_formato(info, 'audio', plataforma, politica)
+        tamano_audio = audio and medidas_formato(formatos[audio], duracion)[1]
+    
+    limite_bytes = politica['tamano_max_mb'] and politica['tamano_max_mb'] * 1048576
+    velocidad = registro_metricas.velocidad_reciente(plataforma)
+    if politica['tiempo_max_s'] and velocidad:
+        presupuesto = velocidad * politica['tiempo_max_s']
+        limite_bytes = min(limite_bytes, presupuesto) if limite_bytes else presupuesto
+    
+    candidatos = []
+    for formato in info.get('formats') or []:
+        if not formato.get('url') or not formato.get('format_id') or formato.get('ext') == 'mhtml':
+            continue
+        tiene_video = formato.get('vcodec') != 'none'
+        tiene_audio = formato.get('acodec') != 'none'
+        solo_video = tiene_video and not tiene_audio
+        if clase == 'video' and not (tiene_video and (tiene_audio or (audio and solo_video))):
+            continue
+        if clase == 'audio' and (tiene_video or not tiene_audio):
+            continue
+        
+        tasa, tamano = medidas_formato(formato, duracion)
+        if solo_video and tamano and tamano_audio:
+            tamano += tamano_audio
+        if clase == 'video':
+            calidad = formato.get('height') or 0
+            minimo, maximo = politica['altura_min'], politica['altura_max']
+            codec = rango_codec(formato.get('vcodec'), politica['codecs_video'])
+        else:
+            calidad = formato.get('abr') or tasa or 0
+            minimo, maximo = politica['abr_min'], politica['abr_max']
+            codec = rango_codec(formato.get('acodec'), politica['codecs_audio'])
+        
+        if minimo and calidad < minimo:
+            continue
+        if maximo and calidad and calidad > maximo:
+            continue
+        if politica['tasa_max_kbps'] and tasa and tasa > politica['tasa_max_kbps']:
+            continue
+        if limite_bytes and tamano and tamano > limite_bytes:
+            continue
+        
+        orden_calidad = calidad if politica['objetivo'] == 'menor' else -calidad
+        candidatos.append(((orden_calidad, codec, tamano or 0), formato))
+    
+    if not candidatos:
+        return None
+    elegido = min(candidatos, key=lambda candidato: candidato[0])[1]
+    if elegido.get('acodec') == 'none' and clase == 'video':
+        return f"{elegido['format_id']}+{audio}"
+    return elegido['format_id']
+
+def describir_formato(info, format_id):
+    """Texto breve con la resolución o la tasa, el codec y el tamaño de un formato"""
+    if '+' in format_id:
+        return ' + '.join(describir_formato(info, pista) for pista in format_id.split('+'))
+    formato = next((f for f in info.get('formats') or [] if f.get('format_id') == format_id), {})
+    partes = [format_id]
+    if formato.get('height'):
+        partes.append(f"{formato['height']}p")
+    elif formato.get('abr'):
+        partes.append(f"{formato['abr']:.0f} kbps")
+    codec = formato.get('vcodec') if formato.get('vcodec') not in (None, 'none') else formato.get('acodec')
+    if codec and codec != 'none':
+        partes.append(codec.split('.')[0])
+    tamano = formato.get('filesize') or formato.get('filesize_approx')
+    if tamano:
+        partes.append(f"~{tamano / 1048576:.1f} MB")
+    return ', '.join(partes)
+
+# ===================== PUBLICACIÓN DE ARCHIVOS =====================
+
+# Las descargas se escriben en una carpeta oculta dentro del destino (mismo
+# sistema de archivos) y solo al terminar se mueven a su nombre final.
+# buffer: bytes que se acumulan antes de cada escritura en la descarga segmentada.
+PUBLICACION = {
+    'carpeta': '.avd-staging',
+    'fsync': False,
+    'preasignar': True,
+    'buffer': 4 * 1024 * 1024,
+    'caducidad_s': 7 * 24 * 3600,
+}
+
+_carpetas_revisadas = set()
+_carpetas_revisadas_lock = threading.Lock()
+
+def carpeta_preparacion(carpeta_destino, clave):
+    """Devuelve la carpeta de preparación de una descarga dentro del destino
+    
+    La carpeta depende de la clave (URL, perfil y nombre), así que al repetir una
+    descarga interrumpida se retoman sus archivos .part, y dos trabajos distintos
+    con el mismo nombre no se pisan. La primera vez en cada destino se borran
+    las preparaciones abandonadas hace más de PUBLICACION['caducidad_s'].
+    """
+    import hashlib
+    
+    base = os.path.join(carpeta_destino, PUBLICACION['carpeta'])
+    with _carpetas_revisadas_lock:
+        revisar = base not in _carpetas_revisadas
+        _carpetas_revisadas.add(base)
+    if revisar:
+        limpiar_preparaciones_caducadas(base)
+    return os.path.join(base, hashlib.sha1(clave.encode('utf-8')).hexdigest()[:16])
+
+def preparacion_descarga(url, perfil, formato, outtmpl, salidas=None, tramos=None):
+    """Separa la plantilla de salida y devuelve (carpeta_destino, plantilla, preparacion)"""
+    carpeta_destino, plantilla = os.path.split(outtmpl)
+    plantilla = plantilla_tramos(plantilla, tramos)
+    if salidas:
+        perfil = f"{perfil}>{salidas}"
+    if tramos:
+        perfil = f"{perfil}@{tramos}"
+    preparacion = carpeta_preparacion(
+        carpeta_destino, f"{clave_url(clasificar_url(url))}|{perfil}|{formato}|{plantilla}")
+    return carpeta_destino, plantilla, preparacion
+
+def limpiar_preparaciones_caducadas(base):
+    import shutil
+    
+    limite = time.time() - PUBLICACION['caducidad_s']
+    try:
+        entradas = list(os.scandir(base))
+    except OSError:
+        return
+    for entrada in entradas:
+        try:
+            if entrada.is_dir() and entrada.stat().st_mtime < limite:
+                shutil.rmtree(entrada.path, ignore_errors=True)
+        except OSError:
+            pass
+
+def descartar_preparacion(carpeta):
+    """Borra la carpeta de preparación de una descarga ya publicada
+    
+    Si era la última, también se borra la carpeta oculta del destino para no
+    dejarla vacía (rmdir falla sin hacer nada si otra descarga la está usando).
+    """
+    import shutil
+    
+    shutil.rmtree(carpeta, ignore_errors=True)
+    base = os.path.dirname(os.path.abspath(carpeta))
+    if os.path.basename(base) == PUBLICACION['carpeta']:
+        try:
+            os.rmdir(base)
+        except OSError:
+            pass
+
+def preasignar_archivo(f, tamano):
+    """Reserva el espacio de un archivo de una vez para que quede contiguo"""
+    if PUBLICACION['preasignar'] and hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(f.fileno(), 0, tamano)
+            return
+        except OSError:
+            pass
+    f.truncate(tamano)
+
+def sincronizar_ruta(ruta, carpeta=False):
+    """fsync de un archivo o de una carpeta (las carpetas solo en POSIX)"""
+    if carpeta and os.name == 'nt':
+        return
+    descriptor = os.open(ruta, os.O_RDONLY if carpeta else os.O_RDWR)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+def publicar_archivo(origen, carpeta_destino, nombre=None):
+    """Mueve un archivo terminado a la carpeta de destino sin sobrescribir nada
+    
+    El archivo aparece en el destino de forma atómica y ya completo. Si el
+    nombre está ocupado se usa 'nombre (1).ext', 'nombre (2).ext'... El enlace
+    duro falla si el destino existe, así que dos publicaciones simultáneas con
+    el mismo nombre no se pisan; donde no hay enlaces duros se usa os.replace
+    comprobando antes que el nombre esté libre. nombre cambia el nombre del
+    archivo (sin extensión). Devuelve la ruta final.
+    """
+    raiz, extension = os.path.splitext(os.path.basename(origen))
+    raiz = nombre or raiz
+    
+    # Desde otro sistema de archivos no se puede enlazar ni renombrar: primero
+    # se copia a una carpeta de preparación del destino
+    copia = None
+    if os.stat(origen).st_dev != os.stat(carpeta_destino).st_dev:
+        import shutil
+        
+        copia = carpeta_preparacion(carpeta_destino, os.path.abspath(origen))
+        os.makedirs(copia, exist_ok=True)
+        ruta_copia = os.path.join(copia, os.path.basename(origen))
+        shutil.copyfile(origen, ruta_copia)
+        os.remove(origen)
+        origen = ruta_copia
+    
+    if PUBLICACION['fsync']:
+        sincronizar_ruta(origen)
+    
+    numero = 0
+    while True:
+        nombre = f"{raiz} ({numero}){extension}" if numero else f"{raiz}{extension}"
+        destino = os.path.join(carpeta_destino, nombre)
+        try:
+            os.link(origen, destino)
+            os.remove(origen)
+            break
+        except FileExistsError:
+            numero += 1
+            continue
+        except (OSError, AttributeError):
+            if os.path.lexists(destino):
+                numero += 1
+                continue
+            os.replace(origen, destino)
+            break
+    
+    if copia:
+        descartar_preparacion(copia)
+    if PUBLICACION['fsync']:
+        sincronizar_ruta(carpeta_destino, carpeta=True)
+    return destino
+
+def completar_publicacion(pendiente, carpeta_destino, nombre):
+    """Publica con su destino y nombre definitivos una descarga hecha sin publicar
+    
+    Es la segunda mitad de descargar_con_info(..., publicar=False): mueve los
+    archivos, borra la carpeta de preparación y registra la descarga en el
+    archivo. Cada archivo conserva lo que su nombre añade al del original
+    (p. ej. ' [192k]' en varias salidas).
+    """
+    rutas = []
+    for ruta in pendiente['rutas']:
+        if os.path.exists(ruta):
+            sufijo = os.path.splitext(os.path.basename(ruta))[0][len(pendiente['raiz']):]
+            ruta = publicar_archivo(ruta, carpeta_destino, nombre + sufijo)
+        rutas.append(ruta)
+    if rutas:
+        descartar_preparacion(pendiente['preparacion'])
+    
+    ruta = rutas[0] if rutas else None
+    tamano = sum(os.path.getsize(r) for r in rutas if os.path.exists(r)) or None
+    if archivo_descargas is not None and pendiente['id_video']:
+        archivo_descargas.registrar(pendiente['plataforma'], pendiente['id_video'],
+                                    pendiente['clave_perfil'], pendiente['url'], pendiente['titulo'],
+                                    ruta and os.path.abspath(ruta), tamano)
+    resultado = {'ruta': ruta, 'tamano': tamano}
+    if len(rutas) > 1:
+        resultado['rutas'] = rutas
+    return resultado
+
+# ===================== CACHÉ DE INFORMACIÓN =====================
+
+# Las URLs de los formatos caducan (en YouTube a las ~6 h), así que la información
+# extraída solo se reutiliza durante un tiempo prudencial.
+CACHE_INFO_TTL = 30 * 60
+CACHE_INFO_MAX = 128
+
+_cache_info = OrderedDict()
+_cache_info_lock = threading.Lock()
+
+def clave_cache_info(url):
+    """Devuelve la clave con la que se guarda la información de una URL"""
+    return url.strip()
+
+# Campos de la información extraída que ningún perfil usa (no se descargan
+# subtítulos ni miniaturas) y que en YouTube ocupan más que los propios formatos
+CAMPOS_INFO_SOBRANTES = ('automatic_captions', 'subtitles', 'thumbnails', 'heatmap')
+
+def aligerar_info(info):
+    """Quita de la información extraída los campos voluminosos que no se usan"""
+    if info:
+        for campo in CAMPOS_INFO_SOBRANTES:
+            info.pop(campo, None)
+    return info
+
+def guardar_info_cache(url, info, duracion_extraccion=None):
+    """Guarda en caché la información extraída de una URL y lo que tardó la extracción"""
+    if not info or info.get('_type') == 'playlist':
+        return
+    
+    aligerar_info(info)
+    clave = clave_cache_info(url)
+    with _cache_info_lock:
+        _cache_info[clave] = (time.monotonic(), info, duracion_extraccion)
+        _cache_info.move_to_end(clave)
+        while len(_cache_info) > CACHE_INFO_MAX:
+            _cache_info.popitem(last=False)
+
+def obtener_info_cache(url, consumir=False, con_duracion=False):
+    """Devuelve la información en caché de una URL (o None si no existe o caducó)
+    
+    Con consumir=True la entrada se elimina de la caché al devolverla. Con
+    con_duracion=True devuelve la tupla (info, segundos que tardó la extracción).
+    """
+    clave = clave_cache_info(url)
+    with _cache_info_lock:
+        entrada = _cache_info.get(clave)
+        if entrada is not None and time.monotonic() - entrada[0] > CACHE_INFO_TTL:
+            del _cache_info[clave]
+            entrada = None
+        
+        if entrada is None:
+            return (None, None) if con_duracion else None
+        
+        momento, info, duracion = entrada
+        if consumir:
+            del _cache_info[clave]
+        else:
+            _cache_info.move_to_end(clave)
+        return (info, duracion) if con_duracion else info
+
+def extraer_info(url):
+    """Extrae la información de una URL sin descargar, reutilizando la caché"""
+    info = obtener_info_cache(url)
+    if info is not None:
+        return info
+    
+    with controlador_plataforma(detectar_plataforma(url)).permiso():
+        with pool_ydl.prestar('metadata-probe') as ydl:
+            inicio = time.monotonic()
+            info = ydl.extract_info(url, download=False)
+    
+    guardar_info_cache(url, info, time.monotonic() - inicio)
+    return info
+
+def descargar_con_info(url, perfil, outtmpl, formato=None, silencioso=False,
+                       diferir_transcodificacion=False, publicar=True, salidas=None, tramos=None):
+    """Descarga una URL reutilizando la información ya extraída si está en caché
+    
+    La información en caché se vuelve a procesar con las opciones del perfil
+    (selección de formato, plantilla de salida, postprocesadores) sin repetir la
+    extracción, igual que hace yt-dlp con --load-info-json. Si el video ya está en
+    el archivo de descargas con el mismo perfil no se descarga de nuevo.
+    
+    Con diferir_transcodificacion los perfiles MP3/WAV solo descargan el audio
+    original y el resultado incluye la transcodificación pendiente, para que la
+    haga otro pool (ver completar_transcodificacion). Con publicar=False el
+    archivo se queda en la carpeta de preparación y el resultado incluye la
+    publicación pendiente (ver completar_publicacion).
+    
+    Con salidas ('mp4+mp3@192k+wav') el original del perfil se descarga una
+    vez y se convierte en todas las salidas a la vez (ver codificar_salidas);
+    el resultado incluye entonces también la lista de rutas.
+    
+    Con tramos ('90-120;300-', ver normalizar_tramos) solo se descargan esas
+    partes del video, un archivo por tramo, y con RECORTES['preciso'] cada uno
+    empieza justo en el instante pedido (ver ajustar_inicio_tramo).
+    
+    Devuelve un diccionario con la ruta y el tamaño del archivo, si se omitió y
+    las métricas de la descarga, que además se envían al registro de métricas
+    (en las diferidas, cuando termina la transcodificación).
+    
+    Los errores transitorios (red, 5xx, límite de tasa) se reintentan según
+    REINTENTOS; los demás, o el último fallo, se lanzan ya clasificados como
+    ErrorDescarga. Cada reintento vuelve a extraer la información del video,
+    así que un 403 al descargar se reintenta con URLs de formato nuevas.
+    """
+    metricas = MetricasDescarga(url, detectar_plataforma(url), perfil)
+    intento = 0
+    while True:
+        try:
+            resultado = _descargar_con_info(url, perfil, outtmpl, formato, silencioso,
+                                            diferir_transcodificacion, publicar, salidas, tramos, metricas)
+            break
+        except Exception as e:
+            error = clasificar_error(e, 'descarga' if metricas.descarga_iniciada() else 'extraccion')
+            limite = REINTENTOS['intentos']
+            if error.intentos is not None:
+                limite = min(limite, error.intentos)
+            if not error.transitorio or intento >= limite:
+                metricas.terminar(error=error)
+                if error is e:
+                    raise
+                raise error from e
+            
+            espera = espera_reintento(intento)
+            intento += 1
+            metricas.anotar_reintento()
+            if not silencioso:
+                print(f"   🔁 Error transitorio ({error.motivo}), reintento {intento}/{REINTENTOS['intentos']} "
+                      f"en {espera:.1f} s")
+            time.sleep(espera)
+    
+    if 'transcodificacion' in resultado:
+        resultado['transcodificacion']['metricas'] = metricas
+    else:
+        metricas.terminar('omitido' if resultado['omitido'] else 'ok', resultado['ruta'])
+    resultado['metricas'] = metricas.como_dict()
+    return resultado
+
+def _descargar_con_info(url, perfil, outtmpl, formato, silencioso, diferir_transcodificacion, publicar,
+                        salidas, tramos, metricas):
+    yt_dlp = importar_yt_dlp()
+    
+    diferir = (diferir_transcodificacion and perfil in CODEC_AUDIO_PERFIL
+               and not AUDIO_EN_FLUJO['activo'] and not tramos)
+    perfil_descarga = 'youtube-audio' if diferir else perfil
+    
+    # Se descarga en la carpeta de preparación y al terminar se publica en el destino
+    carpeta_destino, plantilla, preparacion = preparacion_descarga(url, perfil, formato, outtmpl,
+                                                                   salidas, tramos)
+    
+    automatico = formato == 'auto'
+    with pool_ydl.prestar(perfil_descarga, outtmpl=os.path.join(preparacion, plantilla),
+                          formato=None if automatico else formato,
+                          silencioso=silencioso, metricas=metricas, tramos=tramos) as ydl:
+        clave_perfil = f"{perfil}|{formato or ydl.params.get('format')}"
+        if salidas:
+            clave_perfil += f"|{salidas}"
+        if tramos:
+            clave_perfil += f"|{tramos}"
+        
+        # Comprobación sin red a partir de la URL (o de un alias ya conocido)
+        plataforma, id_video = identificar_video(url)
+        metricas.id_video = id_video
+        previa = buscar_descarga_previa(plataforma, id_video, clave_perfil)
+        if previa:
+            return {'omitido': True, 'ruta': previa['ruta'], 'tamano': previa['tamano']}
+        
+        # La extracción y la descarga pasan por el limitador de la plataforma y
+        # reciben su parte del ancho de banda global
+        peso = ANCHO_BANDA['pesos'].get(plataforma, 1.0) * getattr(_contexto_descarga, 'prioridad', 1.0)
+        with controlador_plataforma(plataforma).permiso(), \
+                reparto_ancho_banda.asignacion(peso) as metricas.asignacion:
+            info, metricas.extraccion_s = obtener_info_cache(url, consumir=True, con_duracion=True)
+            if info is None:
+                inicio = time.monotonic()
+                info = aligerar_info(ydl.extract_info(url, download=False, process=False))
+                metricas.extraccion_s = time.monotonic() - inicio
+            else:
+                info = yt_dlp.YoutubeDL.sanitize_info(info, remove_private_keys=True)
+            metricas.id_video = info.get('id') or id_video
+            
+            # Segunda comprobación con el id real, para URLs cortas como fb.watch
+            if info.get('_type', 'video') == 'video' and info.get('id') != id_video:
+                previa = buscar_descarga_previa(plataforma, info.get('id'), clave_perfil)
+                if previa:
+                    archivo_descargas.registrar_alias(url, plataforma, info['id'])
+                    return {'omitido': True, 'ruta': previa['ruta'], 'tamano': previa['tamano']}
+            
+            if automatico and info.get('_type', 'video') == 'video':
+                clase = 'video' if perfil_descarga in ('youtube-video', 'facebook', 'instagram') else 'audio'
+                elegido = elegir_formato(info, clase, plataforma)
+                if elegido is not None:
+                    ydl.params['format'] = elegido
+                    ydl.format_selector = ydl.build_format_selector(elegido)
+                if not silencioso:
+                    if elegido is not None:
+                        print(f"   🎯 Formato elegido por la política: {describir_formato(info, elegido)}")
+                    else:
+                        print(f"   ⚠️  Ningún formato cumple la política; se usa {ydl.params.get('format')}")
+            
+            ruta = None
+            tramos_descargados = []
+            metricas.iniciar_descarga()
+            if perfil in CODEC_AUDIO_PERFIL and AUDIO_EN_FLUJO['activo'] and not tramos:
+                info = ydl.process_ie_result(info, download=False)
+                if admite_audio_en_flujo(info):
+                    destino = ydl.prepare_filename({**info, 'ext': CODEC_AUDIO_PERFIL[perfil][0]})
+                    if transmitir_audio_a_ffmpeg(ydl, info, destino, perfil, silencioso):
+                        ruta = destino
+                if ruta is None:
+                    info = yt_dlp.YoutubeDL.sanitize_info(info, remove_private_keys=True)
+            
+            if ruta is None:
+                info = ydl.process_ie_result(info, download=True)
+                descargas = info.get('requested_downloads') or [{}]
+                ruta = descargas[-1].get('filepath') or info.get('filepath') or info.get('_filename')
+                if tramos:
+                    tramos_descargados = [descarga['filepath'] for descarga in descargas
+                                          if descarga.get('filepath')]
+            
+            if diferir:
+                destino = ydl.prepare_filename({**info, 'ext': CODEC_AUDIO_PERFIL[perfil][0]})
+                return {'omitido': False, 'ruta': None, 'tamano': None, 'transcodificacion': {
+                    'origen': ruta, 'destino': destino, 'perfil': perfil,
+                    'plataforma': plataforma, 'id_video': info.get('id'),
+                    'clave_perfil': clave_perfil, 'url': url,
+                    'info': {campo: info.get(campo) for campo in ('title', 'uploader', 'webpage_url')},
+                    'carpeta_destino': carpeta_destino, 'preparacion': preparacion,
+                }}
+    
+    rutas = [r for r in tramos_descargados or [ruta] if r and os.path.exists(r)]
+    raiz = os.path.splitext(os.path.basename(ruta))[0] if ruta else None
+    # Fuera del permiso de la plataforma: el ajuste de los tramos y la conversión no ocupan la red
+    if tramos and RECORTES['preciso'] and perfil_descarga in ('youtube-video', 'facebook', 'instagram'):
+        inicio = time.monotonic()
+        for r in rutas:
+            motivo = ajustar_inicio_tramo(r)
+            if motivo and not silencioso:
+                print(f"   ⚠️  {os.path.basename(r)} empieza en el fotograma clave anterior: {motivo}")
+        metricas.agregar_postproceso(time.monotonic() - inicio)
+    if salidas and rutas:
+        inicio = time.monotonic()
+        rutas = [destino for r in rutas for destino in codificar_salidas(r, salidas, info)]
+        metricas.agregar_postproceso(time.monotonic() - inicio)
+    
+    if not publicar:
+        tamano = sum(os.path.getsize(r) for r in rutas) or None
+        return {'omitido': False, 'ruta': rutas[0] if rutas else ruta, 'tamano': tamano, 'publicacion': {
+            'rutas': rutas, 'raiz': raiz, 'preparacion': preparacion, 'plataforma': plataforma,
+            'id_video': info.get('id'), 'clave_perfil': clave_perfil, 'url': url,
+            'titulo': info.get('title'),
+        }}
+    
+    if rutas:
+        rutas = [publicar_archivo(r, carpeta_destino) for r in rutas]
+        descartar_preparacion(preparacion)
+        ruta = rutas[0]
+    tamano = sum(os.path.getsize(r) for r in rutas) or None
+    
+    if archivo_descargas is not None and info.get('id'):
+        archivo_descargas.registrar(plataforma, info['id'], clave_perfil, url,
+                                    info.get('title'), ruta and os.path.abspath(ruta), tamano)
+    
+    resultado = {'omitido': False, 'ruta': ruta, 'tamano': tamano}
+    if len(rutas) > 1:
+        resultado['rutas'] = rutas
+    return resultado
+
+# ===================== ARCHIVO DE DESCARGAS =====================
+
+def carpeta_datos():
+    """Devuelve la carpeta de datos persistentes del usuario para este programa"""
+    if os.name == 'nt':
+        base = os.environ.get('APPDATA') or os.path.join(str(Path.home()), 'AppData', 'Roaming')
+    else:
+        base = os.environ.get('XDG_DATA_HOME') or os.path.join(str(Path.home()), '.local', 'share')
+    return os.path.join(base, 'avdownloader')
+
+class ArchivoDescargas:
+    """Registro SQLite de descargas completadas para no repetirlas entre ejecuciones
+    
+    La clave es (plataforma, id canónico del video, perfil de formato), así que
+    distintas formas de la misma URL (youtu.be, shorts, fb.watch...) comparten
+    entrada. La tabla alias recuerda a qué video resolvió cada URL que no se
+    puede identificar sin red, para que la próxima vez se detecte sin extraer.
+    """
+    
+    COLUMNAS = ('plataforma', 'id_video', 'perfil', 'url', 'titulo', 'ruta', 'tamano', 'completado')
+    
+    def __init__(self, ruta):
+        import sqlite3
+        
+        Path(ruta).parent.mkdir(parents=True, exist_ok=True)
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False, timeout=30)
+        with self._lock, self._conexion:
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.execute("""
+                CREATE TABLE IF NOT EXISTS descargas (
+                    plataforma TEXT NOT NULL,
+                    id_video TEXT NOT NULL,
+                    perfil TEXT NOT NULL,
+                    url TEXT,
+                    titulo TEXT,
+                    ruta TEXT,
+                    tamano INTEGER,
+                    completado REAL NOT NULL,
+                    PRIMARY KEY (plataforma, id_video, perfil)
+                ) WITHOUT ROWID""")
+            self._conexion.execute(
+                "CREATE INDEX IF NOT EXISTS idx_descargas_completado ON descargas (completado)")
+            self._conexion.execute("""
+                CREATE TABLE IF NOT EXISTS marcas_fuente (
+                    fuente TEXT NOT NULL,
+                    id_video TEXT NOT NULL,
+                    completado REAL NOT NULL,
+                    PRIMARY KEY (fuente, id_video)
+                ) WITHOUT ROWID""")
+            self._conexion.execute("""
+                CREATE TABLE IF NOT EXISTS alias (
+                    url TEXT PRIMARY KEY,
+                    plataforma TEXT NOT NULL,
+                    id_video TEXT NOT NULL
+                ) WITHOUT ROWID""")
+    
+    def resolver_alias(self, url):
+        """Devuelve (plataforma, id_video) de una URL ya vista, o None"""
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT plataforma, id_video FROM alias WHERE url IN (?, ?)",
+                (clasificar_url(url).url_canonica, url)).fetchone()
+        return tuple(fila) if fila else None
+    
+    def buscar(self, plataforma, id_video, perfil):
+        """Devuelve el registro de una descarga completada (o None)"""
+        with self._lock:
+            fila = self._conexion.execute(
+                f"SELECT {', '.join(self.COLUMNAS)} FROM descargas "
+                "WHERE plataforma = ? AND id_video = ? AND perfil = ?",
+                (plataforma, id_video, perfil)).fetchone()
+        return dict(zip(self.COLUMNAS, fila)) if fila else None
+    
+    def registrar_alias(self, url, plataforma, id_video):
+        """Recuerda a qué video corresponde una URL"""
+        with self._lock, self._conexion:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO alias VALUES (?, ?, ?)",
+                (clasificar_url(url).url_canonica, plataforma, id_video))
+    
+    def registrar(self, plataforma, id_video, perfil, url, titulo, ruta, tamano):
+        """Registra una descarga completada y el alias de la URL usada"""
+        with self._lock, self._conexion:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO descargas VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (plataforma, id_video, perfil, url, titulo, ruta, tamano, time.time()))
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO alias VALUES (?, ?, ?)",
+                (clasificar_url(url).url_canonica, plataforma, id_video))
+    
+    def ids_sincronizados(self, fuente):
+        """Devuelve los ids de una lista o canal que ya se descargaron desde esa fuente"""
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT id_video FROM marcas_fuente WHERE fuente = ?", (fuente,)).fetchall()
+        return {fila[0] for fila in filas}
+    
+    def registrar_sincronizado(self, fuente, id_video):
+        """Añade una entrada a la marca de sincronización de una fuente"""
+        with self._lock, self._conexion:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO marcas_fuente VALUES (?, ?, ?)", (fuente, id_video, time.time()))
+    
+    def consultar(self, texto=None, limite=None):
+        """Devuelve los registros (más recientes primero), filtrando opcionalmente por texto"""
+        consulta = f"SELECT {', '.join(self.COLUMNAS)} FROM descargas"
+        parametros = []
+        if texto:
+            consulta += " WHERE id_video = ? OR titulo LIKE ? OR url LIKE ? OR ruta LIKE ?"
+            patron = f"%{texto}%"
+            parametros = [texto, patron, patron, patron]
+        consulta += " ORDER BY completado DESC"
+        if limite:
+            consulta += " LIMIT ?"
+            parametros.append(int(limite))
+        
+        with self._lock:
+            filas = self._conexion.execute(consulta, parametros).fetchall()
+        return [dict(zip(self.COLUMNAS, fila)) for fila in filas]
+    
+    def exportar(self, ruta_salida):
+        """Exporta el archivo completo a CSV o JSON (según la extensión) y devuelve el total"""
+        registros = self.consultar()
+        
+        if ruta_salida.lower().endswith('.json'):
+            with open(ruta_salida, 'w', encoding='utf-8') as f:
+                json.dump(registros, f, ensure_ascii=False, indent=2)
+        else:
+            import csv
+            with open(ruta_salida, 'w', encoding='utf-8', newline='') as f:
+                escritor = csv.DictWriter(f, fieldnames=self.COLUMNAS)
+                escritor.writeheader()
+                escritor.writerows(registros)
+        
+        return len(registros)
+    
+    def cerrar(self):
+        with self._lock:
+            self._conexion.close()
+
+# Archivo activo (None si está desactivado). Lo abre main().
+archivo_descargas = None
+
+def abrir_archivo_descargas(ruta=None):
+    """Abre el archivo de descargas y lo deja como archivo activo"""
+    global archivo_descargas
+    archivo_descargas = ArchivoDescargas(ruta or os.path.join(carpeta_datos(), 'archivo.sqlite3'))
+    atexit.register(archivo_descargas.cerrar)
+    return archivo_descargas
+
+def buscar_descarga_previa(plataforma, id_video, perfil):
+    """Devuelve el registro de una descarga previa cuyo archivo todavía existe, o None"""
+    if archivo_descargas is None or not id_video:
+        return None
+    
+    registro = archivo_descargas.buscar(plataforma, id_video, perfil)
+    if registro and registro['ruta'] and os.path.exists(registro['ruta']):
+        return registro
+    return None
+
+def anotar_resultado(informe, resultado, silencioso=False):
+    """Copia ruta, tamaño y omisión de una descarga al informe y avisa si se omitió"""
+    if informe is not None:
+        informe.update(resultado)
+    if resultado['omitido'] and not silencioso:
+        print(f"⏭️  Ya descargado anteriormente: {resultado['ruta']}")
+
+def mostrar_registros_archivo(registros):
+    """Muestra en consola los registros del archivo de descargas"""
+    if not registros:
+        print("📭 No hay descargas registradas.")
+        return
+    
+    for registro in registros:
+        fecha = time.strftime('%Y-%m-%d %H:%M', time.localtime(registro['completado']))
+        tamano = f"{registro['tamano'] / 1048576:.1f} MB" if registro['tamano'] else "N/A"
+        print(f"{fecha}  {registro['plataforma']:<9} {registro['id_video']:<20} "
+              f"{registro['perfil']:<40} {tamano:>10}  {registro['ruta']}")
+
+# ===================== METADATOS =====================
+
+# Valores por defecto de cada plataforma: título, autor y nombre para mostrar
+DEFECTOS_METADATOS = {
+    'youtube': ('Video de YouTube', 'Canal de YouTube', 'YouTube'),
+    'facebook': ('Video de Facebook', 'Usuario de Facebook', 'Facebook'),
+    'instagram': ('Post de Instagram', 'Usuario de Instagram', 'Instagram'),
+}
+
+LONGITUD_DESCRIPCION = 100
+
+def formatear_duracion(segundos):
+    """Convierte segundos en 'm:ss' (o 'N/A')"""
+    if not segundos:
+        return "N/A"
+    minutos, segundos = divmod(segundos, 60)
+    return f"{minutos}:{segundos:02d}"
+
+def entero_o_none(valor):
+    try:
+        return int(float(valor)) if valor is not None else None
+    except (ValueError, TypeError):
+        return None
+
+class MetadatosVideo:
+    """Datos de un video para mostrar, con el mismo formato en todas las plataformas
+    
+    Guarda solo unos pocos campos (los números como enteros) en lugar del
+    diccionario completo de yt-dlp, y los textos para mostrar se calculan al
+    pedirlos. De la descripción se guarda lo justo para mostrarla recortada.
+    """
+    
+    __slots__ = ('plataforma', 'id_video', 'titulo', 'autor', 'duracion_s', 'vistas', 'likes',
+                 '_descripcion')
+    
+    def __init__(self, plataforma, id_video=None, titulo=None, autor=None, duracion_s=None,
+                 vistas=None, likes=None, descripcion=None):
+        titulo_defecto, autor_defecto, _ = DEFECTOS_METADATOS.get(plataforma, ('Video', 'Desconocido', ''))
+        self.plataforma = plataforma
+        self.id_video = id_video
+        self.titulo = titulo or titulo_defecto
+        self.autor = autor or autor_defecto
+        self.duracion_s = duracion_s
+        self.vistas = vistas
+        self.likes = likes
+        self._descripcion = descripcion[:LONGITUD_DESCRIPCION + 1] if descripcion else None
+    
+    @classmethod
+    def desde_info(cls, info, plataforma):
+        """Crea el registro a partir de la información extraída por yt-dlp"""
+        return cls(
+            plataforma,
+            id_video=info.get('id'),
+            titulo=info.get('title') or info.get('fulltitle'),
+            autor=info.get('uploader') or info.get('channel') or info.get('uploader_id'),
+            duracion_s=entero_o_none(info.get('duration')),
+            vistas=entero_o_none(info.get('view_count')),
+            likes=entero_o_none(info.get('like_count')),
+            descripcion=info.get('description') or info.get('alt_title'),
+        )
+    
+    @property
+    def nombre_plataforma(self):
+        return DEFECTOS_METADATOS.get(self.plataforma, ('', '', self.plataforma))[2]
+    
+    @property
+    def duracion(self):
+        return formatear_duracion(self.duracion_s)
+    
+    @property
+    def vistas_texto(self):
+        return f"{self.vistas:,}" if self.vistas else None
+    
+    @property
+    def likes_texto(self):
+        return f"{self.likes:,}" if self.likes else None
+    
+    @property
+    def descripcion(self):
+        if not self._descripcion:
+            return 'Sin descripción'
+        if len(self._descripcion) > LONGITUD_DESCRIPCION:
+            return self._descripcion[:LONGITUD_DESCRIPCION] + '...'
+        return self._descripcion
+    
+    def como_dict(self):
+        return {
+            'plataforma': self.plataforma,
+            'id_video': self.id_video,
+            'titulo': self.titulo,
+            'autor': self.autor,
+            'duracion_s': self.duracion_s,
+            'vistas': self.vistas,
+            'likes': self.likes,
+            'descripcion': self.descripcion,
+        }
+
+def obtener_metadatos(url, plataforma=None):
+    """Obtiene los metadatos de un video con yt-dlp (o unos por defecto si falla)"""
+    plataforma = plataforma or detectar_plataforma(url)
+    try:
+        return MetadatosVideo.desde_info(extraer_info(url), plataforma)
+    except Exception as e:
+        print(f"Error al obtener información de {DEFECTOS_METADATOS[plataforma][2]}: {e}")
+        return MetadatosVideo(plataforma, descripcion='Información no disponible')
+
+# ===================== FUNCIONES PARA YOUTUBE =====================
+
+OPCIONES_TIPO_DESCARGA = {
+    1: {
+        'tipo': 'video',
+        'descripcion': 'Video completo (con audio)'
+    },
+    2: {
+        'tipo': 'audio_mp3',
+        'descripcion': 'Solo audio en formato MP3'
+    },
+    3: {
+        'tipo': 'audio_wav',
+        'descripcion': 'Solo audio en formato WAV'
+    },
+    4: {
+        'tipo': 'mp3+wav',
+        'descripcion': 'Audio en MP3 y en WAV (una sola descarga)'
+    },
+    5: {
+        'tipo': 'mp4+mp3+wav',
+        'descripcion': 'Video MP4 y audio en MP3 y WAV (una sola descarga)'
+    }
+}
+
+OPCIONES_CALIDAD_YOUTUBE = {
+    1: {
+        'formato': 'best[height<=1080]/best',
+        'descripcion': '1080p (Full HD) - Mejor calidad'
+    },
+    2: {
+        'formato': 'best[height<=720]/best',
+        'descripcion': '720p (HD) - Buena calidad'
+    },
+    3: {
+        'formato': 'best[height<=480]/best',
+        'descripcion': '480p (SD) - Calidad media'
+    },
+    4: {
+        'formato': 'best[height<=360]/best',
+        'descripcion': '360p - Calidad básica'
+    },
+    5: {
+        'formato': 'best',
+        'descripcion': 'Mejor calidad disponible (automático)'
+    },
+    6: {
+        'formato': 'worst',
+        'descripcion': 'Menor calidad (descarga más rápida)'
+    },
+    7: {
+        'formato': 'auto',
+        'descripcion': 'Automática (según la política de formatos)'
+    },
+    8: {
+        'formato': 'bestvideo[height<=1080]+bestaudio/best[height<=1080]/best',
+        'descripcion': '1080p en pistas separadas (DASH, unidas sin recodificar)'
+    },
+    9: {
+        'formato': 'bestvideo+bestaudio/best',
+        'descripcion': 'Máxima calidad en pistas separadas (DASH, hasta 4K)'
+    }
+}
+
+OPCIONES_CALIDAD_AUDIO = {
+    1: {
+        'formato': 'bestaudio',
+        'descripcion': 'Mejor calidad de audio disponible'
+    },
+    2: {
+        'formato': 'bestaudio[abr<=320]',
+        'descripcion': 'Hasta 320 kbps (excelente calidad)'
+    },
+    3: {
+        'formato': 'bestaudio[abr<=192]',
+        'descripcion': 'Hasta 192 kbps (buena calidad)'
+    },
+    4: {
+        'formato': 'bestaudio[abr<=128]',
+        'descripcion': 'Hasta 128 kbps (calidad estándar)'
+    },
+    5: {
+        'formato': 'auto',
+        'descripcion': 'Automática (según la política de formatos)'
+    }
+}
+
+def mostrar_opciones_tipo_descarga():
+    """Muestra opciones de tipo de descarga para YouTube"""
+    print("\n   🎯 Tipo de descarga:")
+    for num, info in OPCIONES_TIPO_DESCARGA.items():
+        print(f"   {num}. {info['descripcion']}")
+    
+    return OPCIONES_TIPO_DESCARGA
+
+def mostrar_opciones_calidad_youtube():
+    """Muestra opciones predefinidas de calidad para video de YouTube"""
+    print("\n   📺 Opciones de calidad de video:")
+    for num, info in OPCIONES_CALIDAD_YOUTUBE.items():
+        print(f"   {num}. {info['descripcion']}")
+    
+    return OPCIONES_CALIDAD_YOUTUBE
+
+def mostrar_opciones_calidad_audio():
+    """Muestra opciones de calidad para audio"""
+    print("\n   🎵 Opciones de calidad de audio:")
+    for num, info in OPCIONES_CALIDAD_AUDIO.items():
+        print(f"   {num}. {info['descripcion']}")
+    
+    return OPCIONES_CALIDAD_AUDIO
+
+def pedir_opcion(mensaje, opciones):
+    """Pide al usuario un número de opción válido y devuelve la opción elegida"""
+    print()
+    while True:
+        try:
+            opcion = input(f"   {mensaje} (1-{len(opciones)}): ").strip()
+            opcion_num = int(opcion)
+            
+            if 1 <= opcion_num <= len(opciones):
+                return opciones[opcion_num]
+            else:
+                print(f"   ❌ Opción inválida. Selecciona entre 1 y {len(opciones)}")
+        except ValueError:
+            print("   ❌ Por favor ingresa un número válido.")
+
+def pedir_tipo_y_calidad(calidad=None):
+    """Pregunta al usuario el tipo de descarga de YouTube y, si no se indica, la calidad
+    
+    Devuelve (tipo, calidad) con la calidad como número de opción del menú, igual
+    que la aceptan descargar_youtube y el modo lote.
+    """
+    tipo = pedir_opcion("Selecciona el tipo de descarga", mostrar_opciones_tipo_descarga())['tipo']
+    if calidad is None:
+        if es_tipo_video(tipo):
+            opciones = mostrar_opciones_calidad_youtube()
+            opcion = pedir_opcion("Selecciona la calidad", opciones)
+        else:  # audio_mp3 o audio_wav
+            opciones = mostrar_opciones_calidad_audio()
+            opcion = pedir_opcion("Selecciona la calidad de audio", opciones)
+        calidad = str(next(numero for numero, o in opciones.items() if o is opcion))
+    return tipo, calidad
+
+def resolver_tipo_descarga(tipo):
+    """Devuelve (tipo, descripcion) a partir del nombre o número del tipo de descarga"""
+    if tipo is None or str(tipo).strip() == '':
+        tipo = 1
+    tipo = str(tipo).strip().lower()
+    
+    if tipo.isdigit() and int(tipo) in OPCIONES_TIPO_DESCARGA:
+        opcion = OPCIONES_TIPO_DESCARGA[int(tipo)]
+        return opcion['tipo'], opcion['descripcion']
+    
+    for opcion in OPCIONES_TIPO_DESCARGA.values():
+        if opcion['tipo'] == tipo:
+            return opcion['tipo'], opcion['descripcion']
+    
+    # Varias salidas de una sola descarga, p. ej. mp4+mp3@192k+wav
+    try:
+        return normalizar_salidas(tipo), f"Varias salidas de una sola descarga: {describir_salidas(tipo)}"
+    except ValueError:
+        raise ValueError(f"Tipo de descarga no válido: {tipo} (usa video, audio_mp3, audio_wav "
+                         f"o varias salidas como mp3+wav o mp4+mp3@192k+wav)") from None
+
+def es_tipo_video(tipo):
+    """Indica si un tipo resuelto descarga video (y usa las calidades de video)"""
+    return tipo == 'video' or (tipo not in PERFIL_POR_TIPO and 'mp4' in tipo.split('+'))
+
+def perfil_de_tipo(tipo):
+    """Devuelve (perfil, salidas) de un tipo resuelto; salidas es None si el tipo tiene una sola"""
+    if tipo in PERFIL_POR_TIPO:
+        return PERFIL_POR_TIPO[tipo], None
+    return ('youtube-video' if es_tipo_video(tipo) else 'youtube-audio'), normalizar_salidas(tipo)
+
+def resolver_calidad(tipo, calidad):
+    """Devuelve (formato, descripcion) a partir del número de menú o de un formato de yt-dlp
+    
+    Sin calidad se usa la primera opción del menú, o la automática si hay una
+    política de formatos cargada.
+    """
+    opciones = OPCIONES_CALIDAD_YOUTUBE if es_tipo_video(tipo) else OPCIONES_CALIDAD_AUDIO
+    
+    if calidad is None or str(calidad).strip() == '':
+        calidad = 'auto' if POLITICA_FORMATOS['activa'] else '1'
+    
+    calidad = str(calidad).strip()
+    if calidad == 'auto':
+        calidad = str(next(numero for numero, opcion in opciones.items() if opcion['formato'] == 'auto'))
+    if calidad.isdigit():
+        if int(calidad) not in opciones:
+            raise ValueError(f"Calidad no válida: {calidad} (opciones 1-{len(opciones)})")
+        opcion = opciones[int(calidad)]
+        return opcion['formato'], opcion['descripcion']
+    
+    # Cualquier otro valor se interpreta como selector de formato de yt-dlp
+    return calidad, f"Formato personalizado ({calidad})"
+
+PERFIL_POR_TIPO = {
+    'video': 'youtube-video',
+    'audio_mp3': 'youtube-mp3',
+    'audio_wav': 'youtube-wav',
+}
+
+def construir_opciones_youtube(tipo):
+    """Construye las opciones de yt-dlp para descargar video o audio de YouTube"""
+    opciones_calidad = OPCIONES_CALIDAD_YOUTUBE if tipo == 'video' else OPCIONES_CALIDAD_AUDIO
+    ydl_opts = {
+        'format': opciones_calidad[1]['formato'],
+        'noplaylist': True,
+        'ignoreerrors': False,
+        'no_warnings': False,
+        'extract_flat': False,
+        'embed_metadata': True,
+        'http_headers': {
+            'User-Agent': USER_AGENT
+        }
+    }
+    
+    if tipo == 'video':
+        # Solo se usan con los formatos de pistas separadas (bestvideo+bestaudio)
+        ydl_opts['merge_output_format'] = 'mp4/mkv'
+        ydl_opts['concurrent_fragment_downloads'] = DESCARGA_PISTAS['fragmentos']
+    elif tipo == 'audio_mp3':
+        ydl_opts['postprocessors'] = [{
+            'key': 'FFmpegExtractAudio',
+            'preferredcodec': 'mp3',
+            'preferredquality': '320',  # Calidad máxima para MP3
+        }]
+    elif tipo == 'audio_wav':
+        ydl_opts['postprocessors'] = [{
+            'key': 'FFmpegExtractAudio',
+            'preferredcodec': 'wav',
+        }]
+    
+    return ydl_opts
+
+def descargar_youtube(url, carpeta_destino, nuevo_nombre, tipo=None, calidad=None,
+                      silencioso=False, informe=None, diferir_transcodificacion=False, tramos=None):
+    """Descarga video o audio de YouTube usando yt-dlp con opciones de formato
+    
+    Si no se indican tipo o calidad se le pregunta al usuario (modo interactivo).
+    Con tramos ('1:30-2:00;5:00-5:30') solo se descargan esas partes del video.
+    Si se pasa un diccionario informe, se completa con el error en caso de fallo.
+    """
+    tipo_seleccionado = 'video'  # Valor por defecto
+    
+    try:
+        if not silencioso:
+            print(f"\n   🔗 Conectando con YouTube...")
+        
+        # Pasos 1 y 2: tipo de descarga y calidad según el tipo
+        if tipo is None:
+            tipo, calidad = pedir_tipo_y_calidad(calidad)
+        tipo_seleccionado, descripcion_tipo = resolver_tipo_descarga(tipo)
+        formato_seleccionado, descripcion_calidad = resolver_calidad(tipo_seleccionado, calidad)
+        tramos = normalizar_tramos(tramos)
+        
+        if not silencioso:
+            print(f"\n   📥 Iniciando descarga desde YouTube...")
+            print(f"   🎯 Tipo: {descripcion_tipo}")
+            print(f"   📊 Calidad: {descripcion_calidad}")
+            if tramos:
+                print(f"   ✂️  Tramos: {describir_tramos(tramos)}")
+            
+            # Mostrar nota sobre ffmpeg si se descarga audio
+            if tipo_seleccionado != 'video':
+                print("   ℹ️  Nota: Se requiere ffmpeg para conversión de audio")
+            
+            print("-" * 50)
+        
+        # Paso 3: Descargar con la instancia de yt-dlp del perfil correspondiente
+        perfil, salidas = perfil_de_tipo(tipo_seleccionado)
+        resultado = descargar_con_info(url, perfil,
+                                       os.path.join(carpeta_destino, f'{nuevo_nombre}.%(ext)s'),
+                                       formato_seleccionado, silencioso, diferir_transcodificacion,
+                                       salidas=salidas, tramos=tramos)
+        anotar_resultado(informe, resultado, silencioso)
+        
+        if not silencioso:
+            print("-" * 50)
+            
+            # Mensaje de éxito específico según el tipo
+            if not resultado['omitido']:
+                if tipo_seleccionado == 'video':
+                    print("✅ ¡Descarga de video de YouTube completada!")
+                elif tipo_seleccionado == 'audio_mp3':
+                    print("✅ ¡Descarga de audio MP3 de YouTube completada!")
+                elif tipo_seleccionado == 'audio_wav':
+                    print("✅ ¡Descarga de audio WAV de YouTube completada!")
+                else:
+                    print("✅ ¡Descarga de YouTube completada!")
+                rutas = resultado.get('rutas')
+                if rutas is None and tipo_seleccionado not in PERFIL_POR_TIPO:
+                    rutas = [resultado['ruta']]
+                for ruta in rutas or []:
+                    print(f"   📄 {os.path.basename(ruta or '')}")
+        
+        return True
+        
+    except Exception as e:
+        error = clasificar_error(e)
+        if informe is not None:
+            informe['error'] = str(error)
+            informe['motivo_error'] = error.motivo
+        if silencioso:
+            return False
+        
+        mostrar_error_descarga(error, 'youtube', 'YouTube')
+        
+        return False
+
+# ===================== FUNCIONES PARA FACEBOOK =====================
+
+def construir_opciones_facebook():
+    """Construye las opciones de yt-dlp para descargar video de Facebook"""
+    return {
+        'format': 'best[height<=720]/best',
+        'noplaylist': True,
+        'ignoreerrors': False,
+        'no_warnings': False,
+        'extract_flat': False,
+    }
+
+def descargar_facebook(url, carpeta_destino, nuevo_nombre, silencioso=False, informe=None, tramos=None):
+    """Descarga video de Facebook usando yt-dlp (solo los tramos indicados, si los hay)"""
+    try:
+        tramos = normalizar_tramos(tramos)
+        if not silencioso:
+            print(f"\n   📥 Iniciando descarga desde Facebook...")
+            print("   ℹ️  Nota: Solo funciona con videos públicos")
+            if tramos:
+                print(f"   ✂️  Tramos: {describir_tramos(tramos)}")
+            print("-" * 50)
+        
+        resultado = descargar_con_info(url, 'facebook',
+                                       os.path.join(carpeta_destino, f'{nuevo_nombre}.%(ext)s'),
+                                       'auto' if POLITICA_FORMATOS['activa'] else None,
+                                       silencioso=silencioso, tramos=tramos)
+        anotar_resultado(informe, resultado, silencioso)
+        
+        if not silencioso:
+            print("-" * 50)
+            if not resultado['omitido']:
+                print("✅ ¡Descarga de Facebook completada!")
+                for ruta in resultado.get('rutas') or []:
+                    print(f"   📄 {os.path.basename(ruta)}")
+        
+        return True
+        
+    except Exception as e:
+        error = clasificar_error(e)
+        if informe is not None:
+            informe['error'] = str(error)
+            informe['motivo_error'] = error.motivo
+        if silencioso:
+            return False
+        
+        mostrar_error_descarga(error, 'facebook', 'Facebook')
+        
+        return False
+
+# ===================== FUNCIONES PARA INSTAGRAM =====================
+
+def construir_opciones_instagram():
+    """Construye las opciones de yt-dlp para descargar video de Instagram"""
+    return {
+        'format': 'best[height<=1080]/best',
+        'noplaylist': True,
+        'ignoreerrors': False,
+        'no_warnings': False,
+        'extract_flat': False,
+        'http_headers': {
+            'User-Agent': USER_AGENT,
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'en-us,en;q=0.5',
+            'Accept-Encoding': 'gzip,deflate',
+            'Accept-Charset': 'ISO-8859-1,utf-8;q=0.7,*;q=0.7',
+            'Keep-Alive': '115',
+            'Connection': 'keep-alive',
+        }
+    }
+
+def descargar_instagram(url, carpeta_destino, nuevo_nombre, silencioso=False, informe=None, tramos=None):
+    """Descarga video de Instagram usando yt-dlp (solo los tramos indicados, si los hay)"""
+    try:
+        tramos = normalizar_tramos(tramos)
+        if not silencioso:
+            print(f"\n   📥 Iniciando descarga desde Instagram...")
+            print("   ℹ️  Nota: Solo funciona con posts públicos")
+            if tramos:
+                print(f"   ✂️  Tramos: {describir_tramos(tramos)}")
+            print("-" * 50)
+        
+        resultado = descargar_con_info(url, 'instagram',
+                                       os.path.join(carpeta_destino, f'{nuevo_nombre}.%(ext)s'),
+                                       'auto' if POLITICA_FORMATOS['activa'] else None,
+                                       silencioso=silencioso, tramos=tramos)
+        anotar_resultado(informe, resultado, silencioso)
+        
+        if not silencioso:
+            print("-" * 50)
+            if not resultado['omitido']:
+                print("✅ ¡Descarga de Instagram completada!")
+                for ruta in resultado.get('rutas') or []:
+                    print(f"   📄 {os.path.basename(ruta)}")
+        
+        return True
+        
+    except Exception as e:
+        error = clasificar_error(e)
+        if informe is not None:
+            informe['error'] = str(error)
+            informe['motivo_error'] = error.motivo
+        if silencioso:
+            return False
+        
+        mostrar_error_descarga(error, 'instagram', 'Instagram')
+        
+        return False
+
+# ===================== FUNCIONES UNIVERSALES =====================
+
+def descargar_video_universal(url, carpeta_destino, nuevo_nombre, tipo=None, calidad=None,
+                              silencioso=False, informe=None, diferir_transcodificacion=False, tramos=None):
+    """Función universal que detecta la plataforma y usa el método apropiado
+    
+    tipo y calidad solo aplican a YouTube; si se omiten se preguntan al usuario.
+    tramos ('1:30-2:00;5:00-5:30') limita la descarga a esas partes del video.
+    Con diferir_transcodificacion el audio MP3/WAV queda pendiente de convertir
+    en informe['transcodificacion'].
+    """
+    plataforma = detectar_plataforma(url)
+    
+    if plataforma == 'youtube':
+        return descargar_youtube(url, carpeta_destino, nuevo_nombre, tipo, calidad,
+                                 silencioso=silencioso, informe=informe,
+                                 diferir_transcodificacion=diferir_transcodificacion, tramos=tramos)
+    elif plataforma == 'facebook':
+        return descargar_facebook(url, carpeta_destino, nuevo_nombre,
+                                  silencioso=silencioso, informe=informe, tramos=tramos)
+    elif plataforma == 'instagram':
+        return descargar_instagram(url, carpeta_destino, nuevo_nombre,
+                                   silencioso=silencioso, informe=informe, tramos=tramos)
+    else:
+        if informe is not None:
+            informe['error'] = 'Plataforma no soportada'
+        if not silencioso:
+            print(f"❌ Plataforma no soportada. Solo YouTube, Facebook e Instagram son compatibles.")
+        return False
+
+def obtener_info_universal(url):
+    """Función universal para obtener los metadatos del video (None si no es compatible)"""
+    plataforma = detectar_plataforma(url)
+    if plataforma not in DEFECTOS_METADATOS:
+        return None
+    return obtener_metadatos(url, plataforma)
+
+# ===================== LISTAS Y CANALES =====================
+
+# Los canales (y sus pestañas) listan primero lo más reciente: al sincronizar se
+# deja de enumerar tras encontrar esta cantidad seguida de entradas ya descargadas
+MARCA_CONSECUTIVOS = 20
+
+def construir_opciones_lista():
+    """Construye las opciones de yt-dlp para enumerar listas y canales sin resolver cada video"""
+    return {
+        'quiet': True,
+        'no_warnings': True,
+        'noplaylist': False,
+        'extract_flat': 'in_playlist',
+        'lazy_playlist': True,
+        'ignoreerrors': True,
+        'http_headers': {
+            'User-Agent': USER_AGENT
+        }
+    }
+
+def es_entrada_lista(entrada):
+    """Indica si una entrada plana es a su vez una lista (p. ej. una pestaña del canal)"""
+    return (entrada.get('_type') == 'playlist'
+            or entrada.get('ie_key') in ('YoutubeTab', 'YoutubePlaylist'))
+
+def enumerar_entradas(ydl, info, profundidad=0):
+    """Recorre de forma perezosa las entradas de una lista, entrando en sublistas"""
+    for entrada in info.get('entries') or []:
+        if not entrada:
+            continue
+        
+        if es_entrada_lista(entrada) and profundidad < 2:
+            if entrada.get('_type') != 'playlist':
+                entrada = ydl.extract_info(entrada['url'], download=False, process=False,
+                                           ie_key=entrada.get('ie_key'))
+            if entrada:
+                yield from enumerar_entradas(ydl, entrada, profundidad + 1)
+        else:
+            yield entrada
+
+def url_de_entrada(entrada):
+    """Devuelve la URL descargable de una entrada plana"""
+    url = entrada.get('url') or entrada.get('webpage_url') or ''
+    if url.startswith(('http://', 'https://')):
+        return url
+    if entrada.get('ie_key') == 'Youtube' and entrada.get('id'):
+        return f"https://www.youtube.com/watch?v={entrada['id']}"
+    return url or None
+
+def trabajos_de_fuente(url, tipo=None, calidad=None, tramos=None):
+    """Genera trabajos de lote a medida que se enumeran las entradas de una lista o canal
+    
+    Usa extracción plana: cada página de la lista se pide solo cuando hace falta
+    y ningún video se resuelve hasta que llega su turno de descarga. Las
+    entradas que ya se sincronizaron desde esta fuente se saltan, y en los
+    canales la enumeración se detiene al encontrar la marca de la última
+    sincronización.
+    """
+    fuente = url.strip()
+    plataforma = detectar_plataforma(fuente)
+    
+    with pool_ydl.prestar('playlist-flat') as ydl:
+        with controlador_plataforma(plataforma).permiso():
+            info = ydl.extract_info(fuente, download=False, process=False)
+        if not info:
+            print(f"❌ No se pudo enumerar: {fuente}")
+            return
+        
+        if info.get('_type', 'video') == 'video':
+            yield {'url': fuente, 'tipo': tipo, 'calidad': calidad, 'nombre': None, 'tramos': tramos}
+            return
+        
+        sincronizados = archivo_descargas.ids_sincronizados(fuente) if archivo_descargas else set()
+        reciente_primero = clasificar_url(fuente).tipo == 'canal'
+        print(f"📃 Enumerando {info.get('title') or fuente} "
+              f"({len(sincronizados)} entradas sincronizadas antes)")
+        
+        conocidos_seguidos = 0
+        for entrada in enumerar_entradas(ydl, info):
+            id_video = entrada.get('id')
+            if id_video in sincronizados:
+                conocidos_seguidos += 1
+                if reciente_primero and conocidos_seguidos >= MARCA_CONSECUTIVOS:
+                    print(f"🔖 Marca de sincronización alcanzada en {fuente}")
+                    return
+                continue
+            conocidos_seguidos = 0
+            
+            url_entrada = url_de_entrada(entrada)
+            if not url_entrada:
+                continue
+            
+            titulo = entrada.get('title')
+            nombre = f"{titulo[:150]} [{id_video}]" if titulo and id_video else None
+            yield {
+                'url': url_entrada,
+                'tipo': tipo,
+                'calidad': calidad,
+                'nombre': nombre,
+                'tramos': tramos,
+                'fuente': fuente,
+                'id_fuente': id_video,
+            }
+
+def registrar_sincronizacion(resultado):
+    """Guarda en la marca de su fuente una entrada de lista descargada correctamente"""
+    if archivo_descargas is None or not resultado.get('exito'):
+        return
+    if resultado.get('fuente') and resultado.get('id_fuente'):
+        archivo_descargas.registrar_sincronizado(resultado['fuente'], resultado['id_fuente'])
+
+# ===================== MODO POR LOTES =====================
+
+def leer_trabajos_lote(origen):
+    """Lee trabajos de un archivo (o stdin con '-') en formato url[,tipo[,calidad[,nombre[,tramos]]]]
+    
+    Se ignoran las líneas vacías y las que empiezan con '#'. Se admite coma o tabulador
+    como separador. Los tramos van separados por ';' (1:30-2:00;5:00-5:30).
+    """
+    if origen == '-':
+        lineas = sys.stdin.read().splitlines()
+    else:
+        with open(origen, encoding='utf-8-sig') as f:
+            lineas = f.read().splitlines()
+    
+    import csv
+    
+    trabajos = []
+    for numero_linea, linea in enumerate(lineas, 1):
+        linea = linea.strip()
+        if not linea or linea.startswith('#'):
+            continue
+        
+        separador = '\t' if '\t' in linea else ','
+        campos = [c.strip() for c in next(csv.reader([linea], delimiter=separador))]
+        campos += [''] * (5 - len(campos))
+        
+        trabajos.append({
+            'linea': numero_linea,
+            'url': campos[0],
+            'tipo': campos[1] or None,
+            'calidad': campos[2] or None,
+            'nombre': campos[3] or None,
+            'tramos': campos[4] or None,
+        })
+    
+    return trabajos
+
+def quitar_trabajos_duplicados(trabajos):
+    """Quita los trabajos que piden el mismo contenido con el mismo tipo y calidad
+    
+    Las distintas formas de una URL (youtu.be, shorts, m.youtube, instagr.am,
+    reel...) se reconocen sin acceder a la red. Devuelve (trabajos, duplicados).
+    """
+    unicos = []
+    vistos = set()
+    duplicados = 0
+    clasificadas = clasificar_urls([trabajo['url'] for trabajo in trabajos])
+    for trabajo, clasificada in zip(trabajos, clasificadas):
+        clave = (clave_url(clasificada), trabajo['tipo'], trabajo['calidad'], trabajo.get('tramos'))
+        if clave in vistos:
+            duplicados += 1
+            continue
+        vistos.add(clave)
+        unicos.append(trabajo)
+    return unicos, duplicados
+
+def ejecutar_trabajo_lote(indice, trabajo, carpeta_destino, diferir_transcodificacion=False):
+    """Descarga un trabajo del lote y devuelve su resultado para el informe"""
+    plataforma = detectar_plataforma(trabajo['url'])
+    nombre = trabajo['nombre'] or f"video_{plataforma}_{indice:05d}"
+    nombre = limpiar_nombre_archivo(nombre)
+    
+    resultado = {
+        'indice': indice,
+        'linea': trabajo.get('linea'),
+        'url': trabajo['url'],
+        'plataforma': plataforma,
+        'tipo': trabajo['tipo'],
+        'calidad': trabajo['calidad'],
+        'nombre': nombre,
+        'exito': False,
+        'omitido': False,
+        'ruta': None,
+        'tamano': None,
+        'error': None,
+    }
+    
+    for clave in ('tramos', 'fuente', 'id_fuente'):
+        if trabajo.get(clave):
+            resultado[clave] = trabajo[clave]
+    
+    inicio = time.monotonic()
+    try:
+        resultado['exito'] = descargar_video_universal(
+            trabajo['url'], carpeta_destino, nombre,
+            tipo=trabajo['tipo'] or 'video', calidad=trabajo['calidad'],
+            silencioso=True, informe=resultado,
+            diferir_transcodificacion=diferir_transcodificacion, tramos=trabajo.get('tramos'))
+    except Exception as e:
+        resultado['error'] = str(e)
+    resultado['duracion_s'] = round(time.monotonic() - inicio, 3)
+    
+    return resultado
+
+def transcodificar_trabajo_lote(resultado):
+    """Completa la transcodificación pendiente de un trabajo del lote"""
+    pendiente = resultado.pop('transcodificacion')
+    inicio = time.monotonic()
+    try:
+        resultado.update(completar_transcodificacion(pendiente))
+    except Exception as e:
+        resultado['exito'] = False
+        resultado['error'] = str(e)
+    resultado['transcodificacion_s'] = round(time.monotonic() - inicio, 3)
+    resultado['duracion_s'] = round(resultado['duracion_s'] + resultado['transcodificacion_s'], 3)
+    return resultado
+
+def ejecutar_lote(trabajos, carpeta_destino, trabajadores=4, ruta_informe=None, transcodificadores=None,
+                  al_terminar=None):
+    """Ejecuta los trabajos del lote en un pool de hilos acotado y devuelve los resultados
+    
+    Las descargas están limitadas por red y por ffmpeg (que libera el GIL), así que
+    un pool de hilos basta para aprovechar el ancho de banda y los núcleos. Con
+    transcodificadores > 0 la conversión MP3/WAV sale del pool de descargas: las
+    descargas dejan el audio original en una cola acotada y un pool aparte de ese
+    tamaño lo convierte, de modo que red y CPU trabajan a la vez. La cola acotada
+    frena las descargas si la conversión se queda atrás.
+    
+    trabajos puede ser cualquier iterable (p. ej. las entradas de una lista que se
+    van enumerando): se consume a medida que quedan huecos libres en el pool.
+    al_terminar(resultado) se llama cada vez que un trabajo termina.
+    """
+    import queue
+    from concurrent.futures import ThreadPoolExecutor
+    
+    if not crear_carpeta_si_no_existe(carpeta_destino):
+        return []
+    
+    if transcodificadores is None:
+        transcodificadores = os.cpu_count() or 1
+    
+    total = len(trabajos) if hasattr(trabajos, '__len__') else None
+    trabajadores = max(1, min(trabajadores, total or trabajadores))
+    if total is None:
+        print(f"📦 Lote en flujo con {trabajadores} descargas en paralelo")
+    else:
+        print(f"📦 Lote de {total} trabajos con {trabajadores} descargas en paralelo")
+    if transcodificadores > 0:
+        print(f"🎛️  Conversión de audio en un pool aparte de {transcodificadores} procesos de ffmpeg")
+    print(f"📁 Destino: {os.path.abspath(carpeta_destino)}")
+    print("-" * 50)
+    
+    resultados = []
+    terminados = queue.Queue()
+    cola_transcodificacion = queue.Queue(maxsize=max(1, transcodificadores) * 2)
+    en_vuelo = threading.BoundedSemaphore(trabajadores * 2)
+    enviados = [0]
+    archivo_informe = open(ruta_informe, 'w', encoding='utf-8') if ruta_informe else None
+    inicio = time.monotonic()
+    
+    def etapa_descarga(indice, trabajo):
+        resultado = {'indice': indice, 'url': trabajo['url'], 'exito': False, 'omitido': False,
+                     'error': 'Error interno', 'duracion_s': 0.0}
+        try:
+            resultado = ejecutar_trabajo_lote(indice, trabajo, carpeta_destino,
+                                              diferir_transcodificacion=transcodificadores > 0)
+        finally:
+            en_vuelo.release()
+            if resultado.get('transcodificacion') and resultado['exito']:
+                cola_transcodificacion.put(resultado)
+            else:
+                resultado.pop('transcodificacion', None)
+                terminados.put(resultado)
+    
+    def etapa_transcodificacion():
+        while True:
+            resultado = cola_transcodificacion.get()
+            if resultado is None:
+                return
+            terminados.put(transcodificar_trabajo_lote(resultado))
+    
+    def productor(pool):
+        try:
+            for indice, trabajo in enumerate(trabajos, 1):
+                en_vuelo.acquire()
+                pool.submit(etapa_descarga, indice, trabajo)
+                enviados[0] = indice
+        except Exception as e:
+            print(f"❌ Error al leer los trabajos del lote: {e}")
+        finally:
+            terminados.put(None)
+    
+    hilos_transcodificacion = [threading.Thread(target=etapa_transcodificacion, daemon=True)
+                               for _ in range(transcodificadores)]
+    for hilo in hilos_transcodificacion:
+        hilo.start()
+    
+    try:
+        with ThreadPoolExecutor(max_workers=trabajadores) as pool:
+            threading.Thread(target=productor, args=(pool,), daemon=True).start()
+            
+            completados = 0
+            productor_terminado = False
+            while not (productor_terminado and completados == enviados[0]):
+                resultado = terminados.get()
+                if resultado is None:
+                    productor_terminado = True
+                    continue
+                
+                completados += 1
+                resultados.append(resultado)
+                if al_terminar:
+                    al_terminar(resultado)
+                
+                estado = "⏭️ " if resultado['omitido'] else "✅" if resultado['exito'] else "❌"
+                detalle = "" if resultado['exito'] else f" - {resultado['error']}"
+                print(f"[{completados}/{total or '?'}] {estado} {resultado['url']} "
+                      f"({resultado['duracion_s']:.1f} s){detalle}")
+                
+                if archivo_informe:
+                    archivo_informe.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+                    archivo_informe.flush()
+    finally:
+        for _ in hilos_transcodificacion:
+            cola_transcodificacion.put(None)
+        if archivo_informe:
+            archivo_informe.close()
+    
+    exitos = sum(1 for r in resultados if r['exito'])
+    omitidas = sum(1 for r in resultados if r['omitido'])
+    print("-" * 50)
+    print(f"✅ Completadas: {exitos - omitidas}   ⏭️  Ya descargadas: {omitidas}   "
+          f"❌ Fallidas: {len(resultados) - exitos}   "
+          f"⏱️  Tiempo total: {time.monotonic() - inicio:.1f} s")
+    for controlador in list(_controladores.values()):
+        if controlador.limitaciones:
+            print(f"🐢 {controlador.plataforma}: {controlador.limitaciones} respuestas de límite de tasa "
+                  f"(tasa final {controlador.tasa:.2f}/s, concurrencia {controlador.concurrencia})")
+        if controlador.aperturas:
+            print(f"⛔ {controlador.plataforma}: el circuito se abrió {controlador.aperturas} veces "
+                  f"por fallos seguidos")
+    if ruta_informe:
+        print(f"📋 Informe guardado en: {os.path.abspath(ruta_informe)}")
+    
+    resultados.sort(key=lambda r: r['indice'])
+    return resultados
+
+# ===================== MODO SERVICIO =====================
+ESTADOS_FINALES = ('completado', 'omitido', 'fallido', 'cancelado')
+
+class DescargaCancelada(ErrorPermanente):
+    """Se lanza desde el aviso de progreso para interrumpir una descarga cancelada"""
+    
+    def __init__(self, mensaje="Trabajo cancelado"):
+        super().__init__(mensaje, 'cancelado')
+
+class ServicioDescargas:
+    """Cola de trabajos con trabajadores persistentes para el modo servicio
+    
+    Los trabajadores reutilizan el pool de YoutubeDL, la caché de información y
+    el archivo de descargas durante toda la vida del proceso, así que cada trabajo
+    se ahorra el arranque del intérprete, la importación de yt-dlp y la creación
+    de los extractores. De los trabajos terminados se conservan los más recientes.
+    """
+    
+    def __init__(self, carpeta_destino, trabajadores=4, conservar=1000):
+        import queue
         
-        else:  # audio_mp3 o audio_wav
-            # Mostrar opciones de calidad de audio
-            opciones_calidad = mostrar_opciones_calidad_audio()
-            print()
-            while True:
-                try:
-                    opcion_calidad = input(f"   Selecciona la calidad de audio (1-{len(opciones_calidad)}): ").strip()
-                    opcion_calidad_num = int(opcion_calidad)
-                    
-                    if 1 <= opcion_calidad_num <= len(opciones_calidad):
-                        formato_seleccionado = opciones_calidad[opcion_calidad_num]['formato']
-                        descripcion_calidad = opciones_calidad[opcion_calidad_num]['descripcion']
-                        break
-                    else:
-                        print(f"   ❌ Opción inválida. Selecciona entre 1 y {len(opciones_calidad)}")
-                except ValueError:
-                    print("   ❌ Por favor ingresa un número válido.")
-        
-        # Paso 3: Configurar opciones de yt-dlp según el tipo de descarga
-        if tipo_seleccionado == 'video':
-            # Configuración para video
-            ydl_opts = {
-                'outtmpl': os.path.join(carpeta_destino, f'{nuevo_nombre}.%(ext)s'),
-                'format': formato_seleccionado,
-                'noplaylist': True,
-                'ignoreerrors': False,
-                'no_warnings': False,
-                'extract_flat': False,
-                'embed_metadata': True,
-                'http_headers': {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                }
+        self.carpeta_destino = carpeta_destino
+        self.conservar = conservar
+        self._trabajos = OrderedDict()
+        self._cola = queue.Queue()
+        self._lock = threading.Lock()
+        self._siguiente = 0
+        self._hilos = [threading.Thread(target=self._trabajador, daemon=True) for _ in range(max(1, trabajadores))]
+        for hilo in self._hilos:
+            hilo.start()
+    
+    def enviar(self, datos):
+        """Añade un trabajo a la cola y devuelve su estado (ValueError si no es válido)"""
+        url = str(datos.get('url') or '').strip()
+        if not url:
+            raise ValueError("Falta la URL")
+        if detectar_plataforma(url) == 'desconocida':
+            raise ValueError("Plataforma no soportada. Solo YouTube, Facebook e Instagram son compatibles.")
+        
+        tipo = datos.get('tipo') or 'video'
+        tipo_resuelto = resolver_tipo_descarga(tipo)[0]
+        resolver_calidad(tipo_resuelto, datos.get('calidad'))
+        tramos = normalizar_tramos(datos.get('tramos'))
+        try:
+            prioridad = float(datos.get('prioridad', 1))
+        except (TypeError, ValueError):
+            prioridad = 0
+        if not prioridad > 0:
+            raise ValueError("La prioridad debe ser un número mayor que 0")
+        
+        with self._lock:
+            self._siguiente += 1
+            trabajo = {
+                'id': f"{self._siguiente:06d}",
+                'url': url,
+                'tipo': tipo_resuelto,
+                'calidad': datos.get('calidad'),
+                'tramos': tramos,
+                'prioridad': prioridad,
+                'destino': datos.get('destino') or self.carpeta_destino,
+                'nombre': datos.get('nombre') or f"video_{detectar_plataforma(url)}_"
+                                                  f"{time.strftime('%Y%m%d_%H%M%S')}_{self._siguiente:06d}",
+                'estado': 'en_cola',
+                'creado': time.time(),
+                'inicio': None,
+                'fin': None,
+                'progreso': {'bytes': 0, 'total': None, 'porcentaje': None, 'velocidad': None},
+                'resultado': None,
+                'error': None,
+                'cancelar': False,
             }
-            
-        elif tipo_seleccionado == 'audio_mp3':
-            # Configuración para audio MP3
-            ydl_opts = {
-                'outtmpl': os.path.join(carpeta_destino, f'{nuevo_nombre}.%(ext)s'),
-                'format': formato_seleccionado,
-                'noplaylist': True,
-                'ignoreerrors': False,
-                'no_warnings': False,
-                'extract_flat': False,
-                'embed_metadata': True,
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '320',  # Calidad máxima para MP3
-                }],
-                'http_headers': {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                }
+            self._trabajos[trabajo['id']] = trabajo
+            self._podar()
+            respuesta = self._copiar(trabajo)
+        self._cola.put(trabajo)
+        return respuesta
+    
+    def consultar(self, id_trabajo):
+        with self._lock:
+            trabajo = self._trabajos.get(id_trabajo)
+            return self._copiar(trabajo) if trabajo else None
+    
+    def listar(self, estado=None):
+        with self._lock:
+            return [self._copiar(t) for t in self._trabajos.values() if estado in (None, t['estado'])]
+    
+    def cancelar(self, id_trabajo):
+        """Cancela un trabajo en cola o en curso; devuelve su estado o None si no existe"""
+        with self._lock:
+            trabajo = self._trabajos.get(id_trabajo)
+            if trabajo is None:
+                return None
+            if trabajo['estado'] == 'en_cola':
+                trabajo['estado'] = 'cancelado'
+                trabajo['fin'] = time.time()
+            elif trabajo['estado'] == 'en_curso':
+                trabajo['cancelar'] = True
+            return self._copiar(trabajo)
+    
+    def resumen(self):
+        with self._lock:
+            estados = {}
+            for trabajo in self._trabajos.values():
+                estados[trabajo['estado']] = estados.get(trabajo['estado'], 0) + 1
+        return {'trabajadores': len(self._hilos), 'trabajos': estados}
+    
+    def cerrar(self):
+        for _ in self._hilos:
+            self._cola.put(None)
+    
+    def _copiar(self, trabajo):
+        copia = {clave: valor for clave, valor in trabajo.items() if clave != 'cancelar'}
+        copia['progreso'] = dict(trabajo['progreso'])
+        return copia
+    
+    def _podar(self):
+        terminados = [id_trabajo for id_trabajo, t in self._trabajos.items() if t['estado'] in ESTADOS_FINALES]
+        for id_trabajo in terminados[:max(0, len(terminados) - self.conservar)]:
+            del self._trabajos[id_trabajo]
+    
+    def _progreso(self, trabajo, metricas, d):
+        if trabajo['cancelar']:
+            raise DescargaCancelada("Trabajo cancelado")
+        
+        descargado, total = metricas.bytes, metricas.total_estimado
+        with self._lock:
+            trabajo['progreso'] = {
+                'bytes': descargado,
+                'total': total,
+                'porcentaje': round(100 * descargado / total, 1) if total else None,
+                'velocidad': d.get('speed') and round(d['speed']),
             }
+    
+    def _trabajador(self):
+        while True:
+            trabajo = self._cola.get()
+            if trabajo is None:
+                return
             
-        elif tipo_seleccionado == 'audio_wav':
-            # Configuración para audio WAV
-            ydl_opts = {
-                'outtmpl': os.path.join(carpeta_destino, f'{nuevo_nombre}.%(ext)s'),
-                'format': formato_seleccionado,
-                'noplaylist': True,
-                'ignoreerrors': False,
-                'no_warnings': False,
-                'extract_flat': False,
-                'embed_metadata': True,
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'wav',
-                }],
-                'http_headers': {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                }
-            }
-        
-        print(f"\n   📥 Iniciando descarga desde YouTube...")
-        print(f"   🎯 Tipo: {descripcion_tipo}")
-        print(f"   📊 Calidad: {descripcion_calidad}")
-        
-        # Mostrar nota sobre ffmpeg si se descarga audio
-        if tipo_seleccionado in ['audio_mp3', 'audio_wav']:
-            print("   ℹ️  Nota: Se requiere ffmpeg para conversión de audio")
+            with self._lock:
+                if trabajo['estado'] != 'en_cola':
+                    continue
+                trabajo['estado'] = 'en_curso'
+                trabajo['inicio'] = time.time()
+            
+            try:
+                with observar_descargas(lambda metricas, d: self._progreso(trabajo, metricas, d)), \
+                        prioridad_descargas(trabajo['prioridad']):
+                    resultado = ejecutar_trabajo_lote(int(trabajo['id']), trabajo, trabajo['destino'])
+            except Exception as e:
+                resultado = {'exito': False, 'omitido': False, 'error': str(e)}
+            
+            with self._lock:
+                if trabajo['cancelar']:
+                    trabajo['estado'] = 'cancelado'
+                elif resultado['exito']:
+                    trabajo['estado'] = 'omitido' if resultado['omitido'] else 'completado'
+                else:
+                    trabajo['estado'] = 'fallido'
+                trabajo['error'] = None if trabajo['estado'] == 'cancelado' else resultado.get('error')
+                trabajo['resultado'] = {clave: resultado.get(clave) for clave in
+                                        ('ruta', 'rutas', 'tamano', 'duracion_s', 'metricas')
+                                        if resultado.get(clave) is not None}
+                trabajo['fin'] = time.time()
+
+def crear_servidor_servicio(servicio, direccion):
+    """Crea el servidor HTTP/JSON del modo servicio
+    
+    Rutas:
+      POST   /trabajos                 {"url", "tipo", "calidad", "destino", "nombre"}
+      GET    /trabajos[?estado=...]    lista de trabajos
+      GET    /trabajos/<id>            estado y progreso de un trabajo
+      DELETE /trabajos/<id>            cancela un trabajo (también POST /trabajos/<id>/cancelar)
+      GET    /estado                   trabajadores y número de trabajos por estado
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import urlsplit, parse_qs
+    
+    host, _, puerto = direccion.rpartition(':')
+    
+    class ManejadorServicio(BaseHTTPRequestHandler):
+        server_version = 'AVDownloader'
         
-        print("-" * 50)
+        def log_message(self, formato, *args):
+            pass
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
+        def responder(self, codigo, datos):
+            cuerpo = json.dumps(datos, ensure_ascii=False).encode('utf-8')
+            self.send_response(codigo)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
         
-        print("-" * 50)
+        def ruta(self):
+            partes = urlsplit(self.path)
+            return [p for p in partes.path.split('/') if p], parse_qs(partes.query)
         
-        # Mensaje de éxito específico según el tipo
-        if tipo_seleccionado == 'video':
-            print("✅ ¡Descarga de video de YouTube completada!")
-        elif tipo_seleccionado == 'audio_mp3':
-            print("✅ ¡Descarga de audio MP3 de YouTube completada!")
-        elif tipo_seleccionado == 'audio_wav':
-            print("✅ ¡Descarga de audio WAV de YouTube completada!")
+        def responder_trabajo(self, trabajo):
+            if trabajo is None:
+                self.responder(404, {'error': 'Trabajo no encontrado'})
+            else:
+                self.responder(200, trabajo)
         
-        return True
+        def do_GET(self):
+            partes, consulta = self.ruta()
+            if partes == ['estado']:
+                self.responder(200, servicio.resumen())
+            elif partes == ['trabajos']:
+                self.responder(200, servicio.listar((consulta.get('estado') or [None])[0]))
+            elif len(partes) == 2 and partes[0] == 'trabajos':
+                self.responder_trabajo(servicio.consultar(partes[1]))
+            else:
+                self.responder(404, {'error': 'Ruta no encontrada'})
         
-    except Exception as e:
-        print(f"❌ Error durante la descarga de YouTube: {e}")
-        
-        error_msg = str(e).lower()
-        if "ffmpeg" in error_msg and tipo_seleccionado in ['audio_mp3', 'audio_wav']:
-            print("   💡 Error de ffmpeg: Se requiere ffmpeg para conversión de audio.")
-            print("   📥 Instala ffmpeg desde: https://ffmpeg.org/")
-            print("   💡 O intenta descargar solo el video.")
-        elif "private" in error_msg or "unavailable" in error_msg:
-            print("   💡 El video puede ser privado o no estar disponible.")
-        elif "age" in error_msg or "restricted" in error_msg:
-            print("   💡 El video puede tener restricciones de edad.")
-            print("   📝 Intenta con otro video o verifica la configuración de tu cuenta.")
-        elif "region" in error_msg or "blocked" in error_msg:
-            print("   💡 El video puede estar bloqueado en tu región.")
-        elif "copyright" in error_msg:
-            print("   💡 El video puede tener restricciones de copyright.")
-        elif "live" in error_msg:
-            print("   💡 No se pueden descargar transmisiones en vivo.")
-        elif "premium" in error_msg:
-            print("   💡 El video puede requerir YouTube Premium.")
-        elif "sign in" in error_msg or "login" in error_msg:
-            print("   💡 El video puede requerir iniciar sesión.")
-        else:
-            print("   💡 Error desconocido. Verifica la URL y la conexión.")
-            print("   📋 Soluciones:")
-            print("      - Verifica que el video sea público")
-            print("      - Copia la URL directamente desde YouTube")
-            print("      - Intenta con otro video")
-            print("      - Actualiza yt-dlp: pip install --upgrade yt-dlp")
+        def do_POST(self):
+            partes, _ = self.ruta()
+            if partes == ['trabajos']:
+                try:
+                    longitud = int(self.headers.get('Content-Length') or 0)
+                    datos = json.loads(self.rfile.read(longitud) or b'{}')
+                    if not isinstance(datos, dict):
+                        raise ValueError("El cuerpo debe ser un objeto JSON")
+                    self.responder(201, servicio.enviar(datos))
+                except ValueError as e:
+                    self.responder(400, {'error': str(e)})
+            elif len(partes) == 3 and partes[0] == 'trabajos' and partes[2] == 'cancelar':
+                self.responder_trabajo(servicio.cancelar(partes[1]))
+            else:
+                self.responder(404, {'error': 'Ruta no encontrada'})
         
-        return False
-
-# ===================== FUNCIONES PARA FACEBOOK =====================
+        def do_DELETE(self):
+            partes, _ = self.ruta()
+            if len(partes) == 2 and partes[0] == 'trabajos':
+                self.responder_trabajo(servicio.cancelar(partes[1]))
+            else:
+                self.responder(404, {'error': 'Ruta no encontrada'})
+    
+    servidor = ThreadingHTTPServer((host or '127.0.0.1', int(puerto)), ManejadorServicio)
+    servidor.daemon_threads = True
+    return servidor
 
-def obtener_info_facebook(url):
-    """Obtiene información del video de Facebook usando yt-dlp"""
+def ejecutar_servicio(direccion, carpeta_destino, trabajadores=4):
+    """Atiende peticiones HTTP hasta que se interrumpe con Ctrl+C"""
+    servicio = ServicioDescargas(carpeta_destino, trabajadores)
     try:
-        import yt_dlp
-        
-        ydl_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            'extract_flat': False,
-            'ignoreerrors': True
-        }
-        
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-            
-            # Manejar duración de forma robusta
-            duracion = info.get('duration')
-            duracion_str = "N/A"
-            
-            if duracion is not None:
-                try:
-                    duracion_int = int(float(duracion)) if duracion else 0
-                    if duracion_int > 0:
-                        minutos = duracion_int // 60
-                        segundos = duracion_int % 60
-                        duracion_str = f"{minutos}:{segundos:02d}"
-                except (ValueError, TypeError):
-                    duracion_str = "N/A"
-            
-            titulo = info.get('title') or info.get('fulltitle') or 'Video de Facebook'
-            
-            descripcion = info.get('description') or info.get('alt_title') or 'Sin descripción'
-            if len(descripcion) > 100:
-                descripcion = descripcion[:100] + '...'
-            
-            return {
-                'titulo': titulo,
-                'autor': info.get('uploader') or info.get('uploader_id') or 'Usuario de Facebook',
-                'duracion': duracion_str,
-                'descripcion': descripcion,
-                'plataforma': 'Facebook'
-            }
-            
-    except Exception as e:
-        print(f"Error al obtener información de Facebook: {e}")
-        return {
-            'titulo': 'Video de Facebook',
-            'autor': 'Usuario de Facebook',
-            'duracion': 'N/A',
-            'descripcion': 'Información no disponible',
-            'plataforma': 'Facebook'
-        }
-
-def descargar_facebook(url, carpeta_destino, nuevo_nombre):
-    """Descarga video de Facebook usando yt-dlp"""
+        servidor = crear_servidor_servicio(servicio, direccion)
+    except (OSError, ValueError) as e:
+        print(f"❌ No se pudo iniciar el servicio en {direccion}: {e}")
+        return False
+    
+    host, puerto = servidor.server_address[:2]
+    print(f"🛰️  Servicio de descargas en http://{host}:{puerto} ({trabajadores} trabajadores)")
+    print(f"📁 Destino por defecto: {os.path.abspath(carpeta_destino)}")
+    print("   Ctrl+C para detenerlo")
     try:
-        import yt_dlp
-        
-        ydl_opts = {
-            'outtmpl': os.path.join(carpeta_destino, f'{nuevo_nombre}.%(ext)s'),
-            'format': 'best[height<=720]/best',
-            'noplaylist': True,
-            'ignoreerrors': False,
-            'no_warnings': False,
-            'extract_flat': False,
-        }
-        
-        print(f"\n   📥 Iniciando descarga desde Facebook...")
-        print("   ℹ️  Nota: Solo funciona con videos públicos")
-        print("-" * 50)
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Deteniendo el servicio...")
+    finally:
+        servidor.server_close()
+        servicio.cerrar()
+    return True
+
+# ===================== COLA EN CARPETA =====================
+# Cola de trabajos compartida por varios procesos, en una o varias máquinas que
+# monten la misma carpeta, sin ningún servidor de colas de por medio
+COLA_CARPETA = {
+    'latido_s': 10.0,       # cada cuánto renueva un trabajador los trabajos que tiene
+    'caducidad_s': 60.0,    # sin latido durante este tiempo el trabajo se da por abandonado
+    'espera_s': 2.0,        # pausa entre sondeos cuando la cola está vacía
+    'recuperaciones': 3,    # veces que se recupera un trabajo abandonado antes de darlo por fallido
+}
+
+class ColaCarpeta:
+    """Cola de trabajos en una carpeta compartida
+    
+    Cada trabajo es un archivo JSON y cada cambio de estado un rename, que es
+    atómico dentro de un mismo sistema de archivos:
+    
+      pendientes/   trabajos en espera; el nombre empieza por la hora de llegada
+      en_curso/     trabajos reclamados, como <id>@<trabajador>.json
+      terminados/   resultado de los trabajos completados u omitidos
+      fallidos/     resultado de los trabajos fallidos
+      tmp/          archivos a medio escribir o a medio recuperar
+    
+    Un trabajador reclama un trabajo renombrándolo de pendientes/ a en_curso/;
+    si varios lo intentan a la vez solo uno lo consigue y los demás pasan al
+    siguiente. Mientras lo descarga actualiza su fecha de modificación (latido).
+    Si el proceso o la máquina se caen, el latido se detiene y pasado
+    COLA_CARPETA['caducidad_s'] cualquier otro trabajador lo devuelve a
+    pendientes/. Las máquinas deben tener el reloj sincronizado (NTP).
+    """
+    
+    SUBCARPETAS = ('pendientes', 'en_curso', 'terminados', 'fallidos', 'tmp')
+    
+    def __init__(self, carpeta):
+        self.carpeta = carpeta
+        for subcarpeta in self.SUBCARPETAS:
+            os.makedirs(os.path.join(carpeta, subcarpeta), exist_ok=True)
+    
+    def _ruta(self, subcarpeta, nombre):
+        return os.path.join(self.carpeta, subcarpeta, nombre)
+    
+    def _escribir(self, subcarpeta, nombre, datos):
+        """Escribe un JSON en tmp/ y lo mueve a su sitio, para que nunca se lea a medias"""
+        import uuid
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
+        temporal = self._ruta('tmp', f"{uuid.uuid4().hex}.escribiendo")
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, ensure_ascii=False)
+        os.replace(temporal, self._ruta(subcarpeta, nombre))
+    
+    def _leer(self, ruta):
+        with open(ruta, encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _marca_tiempo(self, ruta):
+        # El rename cambia ctime pero no mtime, y el latido cambia los dos
+        estado = os.stat(ruta)
+        return max(estado.st_mtime, estado.st_ctime)
+    
+    def encolar(self, trabajo):
+        """Añade un trabajo a pendientes/ y devuelve su id"""
+        import uuid
         
-        print("-" * 50)
-        print("✅ ¡Descarga de Facebook completada!")
+        id_trabajo = f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+        self._escribir('pendientes', f"{id_trabajo}.json",
+                       {**trabajo, 'id': id_trabajo, 'creado': time.time(), 'recuperaciones': 0})
+        return id_trabajo
+    
+    def reclamar(self, trabajador):
+        """Reclama el trabajo pendiente más antiguo: (ruta, trabajo) o None si no hay"""
+        try:
+            nombres = sorted(n for n in os.listdir(self._ruta('pendientes', '')) if n.endswith('.json'))
+        except FileNotFoundError:
+            return None
         
+        for nombre in nombres:
+            ruta = self._ruta('en_curso', f"{nombre[:-len('.json')]}@{trabajador}.json")
+            try:
+                os.rename(self._ruta('pendientes', nombre), ruta)
+            except FileNotFoundError:
+                continue        # otro trabajador se adelantó
+            os.utime(ruta)
+            try:
+                return ruta, self._leer(ruta)
+            except (OSError, ValueError) as e:
+                self._anotar_fallido(ruta, {'id': nombre[:-len('.json')]}, f"Trabajo ilegible: {e}")
+        return None
+    
+    def latido(self, ruta):
+        """Renueva un trabajo reclamado; False si ya no es nuestro (se recuperó por caducado)"""
+        try:
+            os.utime(ruta)
+            return True
+        except FileNotFoundError:
+            return False
+    
+    def terminar(self, ruta, trabajo, resultado):
+        """Guarda el resultado de un trabajo reclamado; False si ya no era nuestro"""
+        temporal = self._ruta('tmp', os.path.basename(ruta))
+        try:
+            os.rename(ruta, temporal)
+        except FileNotFoundError:
+            return False
+        subcarpeta = 'terminados' if resultado.get('exito') else 'fallidos'
+        self._escribir(subcarpeta, f"{trabajo['id']}.json",
+                       {**trabajo, 'fin': time.time(), 'resultado': resultado})
+        os.remove(temporal)
         return True
+    
+    def devolver(self, ruta, trabajo):
+        """Devuelve a pendientes/ un trabajo reclamado que no se llegó a terminar"""
+        try:
+            os.rename(ruta, self._ruta('pendientes', f"{trabajo['id']}.json"))
+            return True
+        except FileNotFoundError:
+            return False
+    
+    def _anotar_fallido(self, ruta, trabajo, error):
+        self._escribir('fallidos', f"{trabajo['id']}.json",
+                       {**trabajo, 'fin': time.time(), 'resultado': {'exito': False, 'error': error}})
+        os.remove(ruta)
+    
+    def recuperar_caducados(self):
+        """Devuelve a pendientes/ los trabajos sin latido y devuelve cuántos recuperó
         
-    except Exception as e:
-        print(f"❌ Error durante la descarga de Facebook: {e}")
+        El trabajo se aparta primero a tmp/ con un rename, de modo que si varios
+        trabajadores lo ven caducado solo uno lo recupera. Lo que quede en tmp/
+        de un trabajador que se cayó a mitad de terminar o de recuperar también
+        se recupera cuando caduca.
+        """
+        limite = time.time() - COLA_CARPETA['caducidad_s']
+        recuperados = 0
         
-        error_msg = str(e).lower()
-        if "private" in error_msg or "login" in error_msg:
-            print("   💡 El video puede ser privado o requerir autenticación.")
-        elif "not available" in error_msg or "removed" in error_msg:
-            print("   💡 El video no está disponible o fue eliminado.")
-        else:
-            print("   💡 Verifica que el video sea público y la URL sea correcta.")
+        for subcarpeta in ('en_curso', 'tmp'):
+            try:
+                nombres = os.listdir(self._ruta(subcarpeta, ''))
+            except FileNotFoundError:
+                continue
+            for nombre in nombres:
+                ruta = self._ruta(subcarpeta, nombre)
+                try:
+                    if self._marca_tiempo(ruta) >= limite:
+                        continue
+                    if not nombre.endswith('.json'):
+                        os.remove(ruta)         # escritura a medias de un proceso caído
+                        continue
+                    if subcarpeta == 'en_curso':
+                        temporal = self._ruta('tmp', nombre)
+                        os.rename(ruta, temporal)
+                        ruta = temporal
+                except FileNotFoundError:
+                    continue
+                if self._reencolar(ruta, nombre):
+                    recuperados += 1
+        return recuperados
+    
+    def _reencolar(self, ruta, nombre):
+        id_trabajo = nombre[:-len('.json')].partition('@')[0]
+        if any(os.path.exists(self._ruta(s, f"{id_trabajo}.json")) for s in ('terminados', 'fallidos')):
+            os.remove(ruta)     # ya se había guardado el resultado
+            return False
+        try:
+            trabajo = self._leer(ruta)
+        except (OSError, ValueError) as e:
+            self._anotar_fallido(ruta, {'id': id_trabajo}, f"Trabajo ilegible: {e}")
+            return False
         
-        return False
+        trabajo['recuperaciones'] = trabajo.get('recuperaciones', 0) + 1
+        if trabajo['recuperaciones'] > COLA_CARPETA['recuperaciones']:
+            self._anotar_fallido(ruta, trabajo, f"Abandonado {trabajo['recuperaciones']} veces "
+                                                f"sin terminar (¿el trabajo tumba al trabajador?)")
+            return False
+        self._escribir('pendientes', f"{id_trabajo}.json", trabajo)
+        os.remove(ruta)
+        return True
+    
+    def resumen(self):
+        """Número de trabajos en cada subcarpeta"""
+        estados = {}
+        for subcarpeta in self.SUBCARPETAS[:-1]:
+            try:
+                estados[subcarpeta] = sum(1 for n in os.listdir(self._ruta(subcarpeta, '')) if n.endswith('.json'))
+            except FileNotFoundError:
+                estados[subcarpeta] = 0
+        return estados
 
-# ===================== FUNCIONES PARA INSTAGRAM =====================
+def encolar_trabajos(carpeta_cola, trabajos, carpeta_destino=None):
+    """Añade trabajos de lote a la cola en carpeta y devuelve cuántos añadió
+    
+    Si se indica carpeta_destino, los trabajos la llevan consigo; si no, cada
+    trabajador usa su propia carpeta de destino.
+    """
+    cola = ColaCarpeta(carpeta_cola)
+    marca = time.strftime('%Y%m%d_%H%M%S')
+    total = 0
+    for total, trabajo in enumerate(trabajos, 1):
+        trabajo = dict(trabajo)
+        if not trabajo.get('nombre'):
+            trabajo['nombre'] = f"video_{detectar_plataforma(trabajo['url'])}_{marca}_{total:05d}"
+        if carpeta_destino:
+            trabajo['destino'] = os.path.abspath(carpeta_destino)
+        cola.encolar(trabajo)
+    return total
 
-def obtener_info_instagram(url):
-    """Obtiene información del video de Instagram usando yt-dlp"""
-    try:
-        import yt_dlp
+class TrabajadorCola:
+    """Proceso trabajador de una cola en carpeta
+    
+    Varios hilos reclaman trabajos y los descargan con ejecutar_trabajo_lote,
+    igual que el modo lote. Un hilo aparte mantiene el latido de los trabajos
+    reclamados y recupera los que otros trabajadores dejaron abandonados. Si el
+    latido de un trabajo falla es que otro trabajador lo dio por caducado y lo
+    recuperó: la descarga se interrumpe para no hacerla dos veces.
+    """
+    
+    def __init__(self, carpeta_cola, carpeta_destino, trabajadores=4):
+        import socket
         
-        ydl_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            'extract_flat': False,
-            'ignoreerrors': True,
-            'http_headers': {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-        }
+        self.cola = ColaCarpeta(carpeta_cola)
+        self.carpeta_destino = carpeta_destino
+        self.trabajadores = max(1, trabajadores)
+        self.nombre = limpiar_nombre_archivo(f"{socket.gethostname()}-{os.getpid()}").replace('@', '_')
+        self._activos = {}
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._contador = 0
+        self.resultados = {'completados': 0, 'omitidos': 0, 'fallidos': 0, 'recuperados': 0}
+    
+    def ejecutar(self):
+        """Atiende la cola hasta que se interrumpe con Ctrl+C"""
+        hilos = [threading.Thread(target=self._trabajador, args=(numero,), daemon=True)
+                 for numero in range(1, self.trabajadores + 1)]
+        hilos.append(threading.Thread(target=self._latidos, daemon=True))
+        for hilo in hilos:
+            hilo.start()
+        try:
+            # Sin join mientras se espera: un Ctrl+C dentro de join puede dar el hilo por terminado
+            while any(hilo.is_alive() for hilo in hilos):
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            print("\n👋 Deteniendo el trabajador; los trabajos en curso vuelven a la cola...")
+            self.detener()
+            for hilo in hilos:
+                hilo.join()
+    
+    def detener(self):
+        self._parar.set()
+        with self._lock:
+            for activo in self._activos.values():
+                activo['cancelar'] = True
+    
+    def _progreso(self, activo):
+        if activo['cancelar'] or activo['perdido']:
+            raise DescargaCancelada("Trabajo devuelto a la cola")
+    
+    def _latidos(self):
+        ultima_recuperacion = 0.0
+        while not self._parar.wait(COLA_CARPETA['latido_s']):
+            with self._lock:
+                activos = list(self._activos.items())
+            for ruta, activo in activos:
+                if not self.cola.latido(ruta):
+                    activo['perdido'] = True
+            
+            if time.monotonic() - ultima_recuperacion >= COLA_CARPETA['caducidad_s'] / 2:
+                ultima_recuperacion = time.monotonic()
+                try:
+                    recuperados = self.cola.recuperar_caducados()
+                except OSError as e:
+                    print(f"   ⚠️  No se pudo revisar la cola: {e}")
+                    continue
+                if recuperados:
+                    self.resultados['recuperados'] += recuperados
+                    print(f"   ♻️  {recuperados} trabajos abandonados devueltos a la cola")
+    
+    def _trabajador(self, numero):
+        import random
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
+        nombre = f"{self.nombre}-{numero}"
+        while not self._parar.is_set():
+            try:
+                reclamado = self.cola.reclamar(nombre)
+            except OSError as e:
+                print(f"   ⚠️  No se pudo leer la cola: {e}")
+                reclamado = None
+            if reclamado is None:
+                # Con la cola vacía se espera con algo de azar para no sondear todos a la vez
+                self._parar.wait(COLA_CARPETA['espera_s'] * random.uniform(0.5, 1.5))
+                continue
             
-            duracion = info.get('duration')
-            duracion_str = "N/A"
+            ruta, trabajo = reclamado
+            activo = {'cancelar': False, 'perdido': False}
+            with self._lock:
+                self._activos[ruta] = activo
+                self._contador += 1
+                indice = self._contador
             
-            if duracion is not None:
-                try:
-                    duracion_int = int(float(duracion)) if duracion else 0
-                    if duracion_int > 0:
-                        minutos = duracion_int // 60
-                        segundos = duracion_int % 60
-                        duracion_str = f"{minutos}:{segundos:02d}"
-                except (ValueError, TypeError):
-                    duracion_str = "N/A"
-            
-            titulo = info.get('title') or info.get('fulltitle') or 'Post de Instagram'
-            autor = (info.get('uploader') or 
-                    info.get('uploader_id') or 
-                    info.get('channel') or 
-                    'Usuario de Instagram')
-            
-            descripcion = info.get('description') or info.get('alt_title') or 'Sin descripción'
-            if len(descripcion) > 100:
-                descripcion = descripcion[:100] + '...'
-            
-            likes = info.get('like_count', 'N/A')
-            views = info.get('view_count', 'N/A')
-            
-            return {
-                'titulo': titulo,
-                'autor': autor,
-                'duracion': duracion_str,
-                'descripcion': descripcion,
-                'likes': likes if likes != 'N/A' else None,
-                'views': views if views != 'N/A' else None,
-                'plataforma': 'Instagram'
-            }
+            try:
+                with observar_descargas(lambda metricas, d: self._progreso(activo)), \
+                        prioridad_descargas(trabajo.get('prioridad') or 1.0):
+                    resultado = ejecutar_trabajo_lote(indice, trabajo,
+                                                      trabajo.get('destino') or self.carpeta_destino)
+            except Exception as e:
+                resultado = {'exito': False, 'omitido': False, 'error': str(e), 'duracion_s': 0.0}
+            finally:
+                with self._lock:
+                    del self._activos[ruta]
             
-    except Exception as e:
-        print(f"Error al obtener información de Instagram: {e}")
-        return {
-            'titulo': 'Post de Instagram',
-            'autor': 'Usuario de Instagram',
-            'duracion': 'N/A',
-            'descripcion': 'Información no disponible',
-            'plataforma': 'Instagram'
-        }
+            if activo['cancelar'] and not resultado['exito']:
+                self.cola.devolver(ruta, trabajo)
+                continue
+            if not self.cola.terminar(ruta, trabajo, resultado):
+                print(f"   ⚠️  {trabajo['url']}: otro trabajador recuperó el trabajo por falta de latido")
+                continue
+            
+            registrar_sincronizacion(resultado)
+            clave = 'omitidos' if resultado['omitido'] else 'completados' if resultado['exito'] else 'fallidos'
+            self.resultados[clave] += 1
+            estado = "⏭️ " if resultado['omitido'] else "✅" if resultado['exito'] else "❌"
+            detalle = "" if resultado['exito'] else f" - {resultado['error']}"
+            print(f"[{nombre}] {estado} {trabajo['url']} ({resultado['duracion_s']:.1f} s){detalle}")
 
-def descargar_instagram(url, carpeta_destino, nuevo_nombre):
-    """Descarga video de Instagram usando yt-dlp"""
+def ejecutar_trabajador_cola(carpeta_cola, carpeta_destino, trabajadores=4):
+    """Descarga trabajos de una cola en carpeta hasta que se interrumpe con Ctrl+C"""
+    if not crear_carpeta_si_no_existe(carpeta_destino):
+        return False
     try:
-        import yt_dlp
-        
-        ydl_opts = {
-            'outtmpl': os.path.join(carpeta_destino, f'{nuevo_nombre}.%(ext)s'),
-            'format': 'best[height<=1080]/best',
-            'noplaylist': True,
-            'ignoreerrors': False,
-            'no_warnings': False,
-            'extract_flat': False,
-            'http_headers': {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                'Accept-Language': 'en-us,en;q=0.5',
-                'Accept-Encoding': 'gzip,deflate',
-                'Accept-Charset': 'ISO-8859-1,utf-8;q=0.7,*;q=0.7',
-                'Keep-Alive': '115',
-                'Connection': 'keep-alive',
-            }
-        }
-        
-        print(f"\n   📥 Iniciando descarga desde Instagram...")
-        print("   ℹ️  Nota: Solo funciona con posts públicos")
-        print("-" * 50)
-        
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
-        
-        print("-" * 50)
-        print("✅ ¡Descarga de Instagram completada!")
-        
-        return True
-        
-    except Exception as e:
-        print(f"❌ Error durante la descarga de Instagram: {e}")
-        
-        error_msg = str(e).lower()
-        if "private" in error_msg or "login" in error_msg:
-            print("   💡 La cuenta o el post puede ser privado.")
-        elif "not available" in error_msg or "removed" in error_msg:
-            print("   💡 El post no está disponible o fue eliminado.")
-        elif "rate" in error_msg or "too many" in error_msg:
-            print("   💡 Instagram está limitando las descargas. Espera un momento.")
-        else:
-            print("   💡 Verifica que el post sea público y la URL sea correcta.")
-        
+        trabajador = TrabajadorCola(carpeta_cola, carpeta_destino, trabajadores)
+    except OSError as e:
+        print(f"❌ No se pudo abrir la cola {carpeta_cola}: {e}")
         return False
+    
+    estados = trabajador.cola.resumen()
+    print(f"📬 Cola {os.path.abspath(carpeta_cola)}: {estados['pendientes']} pendientes, "
+          f"{estados['en_curso']} en curso ({trabajador.trabajadores} trabajadores como {trabajador.nombre})")
+    print(f"📁 Destino por defecto: {os.path.abspath(carpeta_destino)}")
+    print("   Ctrl+C para detenerlo")
+    print("-" * 50)
+    trabajador.ejecutar()
+    
+    resultados = trabajador.resultados
+    print("-" * 50)
+    print(f"✅ Completadas: {resultados['completados']}   ⏭️  Ya descargadas: {resultados['omitidos']}   "
+          f"❌ Fallidas: {resultados['fallidos']}   ♻️  Recuperadas: {resultados['recuperados']}")
+    return True
 
-# ===================== FUNCIONES UNIVERSALES =====================
+# ===================== DEPENDENCIAS =====================
 
-def descargar_video_universal(url, carpeta_destino, nuevo_nombre):
-    """Función universal que detecta la plataforma y usa el método apropiado"""
-    plataforma = detectar_plataforma(url)
-    
-    if plataforma == 'youtube':
-        return descargar_youtube(url, carpeta_destino, nuevo_nombre)
-    elif plataforma == 'facebook':
-        return descargar_facebook(url, carpeta_destino, nuevo_nombre)
-    elif plataforma == 'instagram':
-        return descargar_instagram(url, carpeta_destino, nuevo_nombre)
+# Resultados del último sondeo de dependencias y tiempos de arranque
+# (se muestran con --startup-profile)
+tiempos_arranque = {}
+_capacidades = None
+
+def carpeta_cache():
+    """Devuelve la carpeta de caché del usuario para este programa"""
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or os.path.join(str(Path.home()), 'AppData', 'Local')
     else:
-        print(f"❌ Plataforma no soportada. Solo YouTube, Facebook e Instagram son compatibles.")
-        return False
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(str(Path.home()), '.cache')
+    return os.path.join(base, 'avdownloader')
 
-def obtener_info_universal(url):
-    """Función universal para obtener información del video"""
-    plataforma = detectar_plataforma(url)
+def firma_archivo(ruta):
+    """Devuelve [mtime_ns, tamaño] de un archivo, o None si no existe"""
+    try:
+        estado = os.stat(ruta)
+        return [estado.st_mtime_ns, estado.st_size]
+    except (OSError, TypeError):
+        return None
+
+def localizar_yt_dlp():
+    """Devuelve (ruta, firma) del módulo yt-dlp sin importarlo, o (None, None)"""
+    if getattr(sys, 'frozen', False):
+        # En el ejecutable de PyInstaller yt-dlp va dentro del propio binario
+        return sys.executable, firma_archivo(sys.executable)
     
-    if plataforma == 'youtube':
-        return obtener_info_youtube(url)
-    elif plataforma == 'facebook':
-        return obtener_info_facebook(url)
-    elif plataforma == 'instagram':
-        return obtener_info_instagram(url)
-    else:
+    import importlib.util
+    spec = importlib.util.find_spec('yt_dlp')
+    if spec is None or not spec.submodule_search_locations:
+        return None, None
+    
+    ruta = os.path.join(list(spec.submodule_search_locations)[0], 'version.py')
+    return ruta, firma_archivo(ruta)
+
+def sondear_version_yt_dlp(ruta):
+    """Lee la versión de yt-dlp de su version.py (o importándolo si va empaquetado)"""
+    # En el ejecutable de PyInstaller la ruta es el propio binario: nunca se lee como texto
+    if not getattr(sys, 'frozen', False):
+        try:
+            with open(ruta, encoding='utf-8') as f:
+                coincidencia = re.search(r"^__version__\s*=\s*['\"]([^'\"]+)", f.read(), re.M)
+            if coincidencia:
+                return coincidencia.group(1)
+        except (OSError, ValueError):
+            pass
+    
+    import yt_dlp.version
+    return yt_dlp.version.__version__
+
+def sondear_version_ffmpeg(ruta):
+    """Ejecuta ffmpeg -version y devuelve la versión, o None si no funciona"""
+    import subprocess
+    try:
+        result = subprocess.run([ruta, '-version'],
+                                capture_output=True, text=True, timeout=5)
+    except (subprocess.TimeoutExpired, OSError):
         return None
+    if result.returncode != 0:
+        return None
+    
+    primera_linea = result.stdout.splitlines()[0] if result.stdout else ''
+    coincidencia = re.match(r'ffmpeg version (\S+)', primera_linea)
+    return coincidencia.group(1) if coincidencia else 'desconocida'
+
+def sondear_capacidades(usar_cache=True):
+    """Devuelve las rutas y versiones de yt-dlp y ffmpeg, usando la caché en disco
+    
+    Cada entrada de la caché guarda la firma (mtime y tamaño) del binario que se
+    sondeó, así que basta con actualizar o reinstalar yt-dlp o ffmpeg para que
+    se vuelva a sondear.
+    """
+    global _capacidades
+    if usar_cache and _capacidades is not None:
+        return _capacidades
+    
+    inicio = time.perf_counter()
+    ruta_cache = os.path.join(carpeta_cache(), 'capacidades.json')
+    
+    cache = {}
+    if usar_cache:
+        try:
+            with open(ruta_cache, encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+    
+    import shutil
+    ruta_yt_dlp, firma_yt_dlp = localizar_yt_dlp()
+    ruta_ffmpeg = shutil.which('ffmpeg')
+    firma_ffmpeg = firma_archivo(ruta_ffmpeg)
+    
+    capacidades = {}
+    sondeados = []
+    
+    anterior = cache.get('yt_dlp') or {}
+    if ruta_yt_dlp is None:
+        capacidades['yt_dlp'] = {'ruta': None, 'firma': None, 'version': None}
+    elif anterior.get('ruta') == ruta_yt_dlp and anterior.get('firma') == firma_yt_dlp:
+        capacidades['yt_dlp'] = anterior
+    else:
+        capacidades['yt_dlp'] = {'ruta': ruta_yt_dlp, 'firma': firma_yt_dlp,
+                                 'version': sondear_version_yt_dlp(ruta_yt_dlp)}
+        sondeados.append('yt_dlp')
+    
+    anterior = cache.get('ffmpeg') or {}
+    if ruta_ffmpeg is None:
+        capacidades['ffmpeg'] = {'ruta': None, 'firma': None, 'version': None}
+    elif anterior.get('ruta') == ruta_ffmpeg and anterior.get('firma') == firma_ffmpeg:
+        capacidades['ffmpeg'] = anterior
+    else:
+        capacidades['ffmpeg'] = {'ruta': ruta_ffmpeg, 'firma': firma_ffmpeg,
+                                 'version': sondear_version_ffmpeg(ruta_ffmpeg)}
+        sondeados.append('ffmpeg')
+    
+    if sondeados and usar_cache:
+        try:
+            Path(ruta_cache).parent.mkdir(parents=True, exist_ok=True)
+            temporal = f"{ruta_cache}.{os.getpid()}.tmp"
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(capacidades, f)
+            os.replace(temporal, ruta_cache)
+        except OSError:
+            pass
+    
+    tiempos_arranque['sondeo_s'] = time.perf_counter() - inicio
+    tiempos_arranque['sondeo_desde_cache'] = bool(cache) and not sondeados
+    _capacidades = capacidades
+    return capacidades
 
 def verificar_dependencias():
-    """Verifica que yt-dlp esté instalado"""
-    try:
-        import yt_dlp
-        print("✅ yt-dlp: Instalado")
-        
-        # Verificar versión
-        version = yt_dlp.version.__version__
-        print(f"   📦 Versión: {version}")
-        
-    except ImportError:
+    """Verifica que yt-dlp esté instalado y si ffmpeg está disponible"""
+    capacidades = sondear_capacidades()
+    
+    version = capacidades['yt_dlp']['version']
+    if version is None:
         print("❌ yt-dlp: No instalado")
         print("\nInstálalo ejecutando:")
         print("pip install yt-dlp")
         return False
     
+    print("✅ yt-dlp: Instalado")
+    print(f"   📦 Versión: {version}")
+    
     # Verificar ffmpeg (requerido para conversión de audio)
-    try:
-        import subprocess
-        result = subprocess.run(['ffmpeg', '-version'], 
-                              capture_output=True, text=True, timeout=5)
-        if result.returncode == 0:
-            print("✅ ffmpeg: Instalado")
-        else:
-            print("⚠️  ffmpeg: No encontrado")
-    except (subprocess.TimeoutExpired, FileNotFoundError, Exception):
+    if capacidades['ffmpeg']['version']:
+        print("✅ ffmpeg: Instalado")
+    else:
         print("⚠️  ffmpeg: No encontrado")
         print("   💡 IMPORTANTE: ffmpeg es requerido para descargar audio (MP3/WAV)")
         print("   📥 Descarga desde: https://ffmpeg.org/")
@@ -640,7 +4599,191 @@ def verificar_dependencias():
     
     return True
 
-def main():
+def mostrar_perfil_arranque():
+    """Muestra el tiempo de importación, del sondeo de dependencias y de cargar yt-dlp"""
+    if 'sondeo_s' not in tiempos_arranque:
+        sondear_capacidades()
+    
+    # yt-dlp se importa de forma diferida; aquí se mide lo que costará en el primer uso
+    ya_importado = 'yt_dlp' in sys.modules
+    inicio = time.perf_counter()
+    try:
+        import yt_dlp  # noqa: F401
+        tiempo_yt_dlp = time.perf_counter() - inicio
+    except ImportError:
+        tiempo_yt_dlp = None
+    
+    origen = "caché" if tiempos_arranque['sondeo_desde_cache'] else "sondeo completo"
+    print("⏱️  Perfil de arranque:", file=sys.stderr)
+    print(f"   📦 Importación del script: {tiempos_arranque['importacion_s'] * 1000:.1f} ms", file=sys.stderr)
+    print(f"   🔍 Sondeo de dependencias: {tiempos_arranque['sondeo_s'] * 1000:.1f} ms ({origen})", file=sys.stderr)
+    if tiempo_yt_dlp is None:
+        print("   📥 Importación de yt-dlp: no instalado", file=sys.stderr)
+    elif ya_importado:
+        print("   📥 Importación de yt-dlp: ya estaba cargado", file=sys.stderr)
+    else:
+        print(f"   📥 Importación de yt-dlp (diferida): {tiempo_yt_dlp * 1000:.1f} ms", file=sys.stderr)
+
+# ===================== DESCARGA ADELANTADA =====================
+# En el modo interactivo la información y la descarga empiezan mientras el
+# usuario contesta las preguntas. Los videos más largos que duracion_max_s solo
+# adelantan la información, para no gastar red en algo que quizá se cancele.
+ADELANTO = {
+    'activo': True,
+    'duracion_max_s': 15 * 60,
+}
+
+class DescargaAdelantada:
+    """Descarga especulativa de una URL mientras el usuario contesta las preguntas
+    
+    Nada más recibir la URL se pide la información en segundo plano. En cuanto
+    se conocen perfil y formato empieza la descarga, sin publicar, en la
+    carpeta de preparación de la carpeta de Descargas (el destino y el nombre
+    definitivos aún no se saben, y es el destino por defecto; si no existe, en
+    la caché). Si el usuario confirma, se espera a que termine y se publica con
+    su destino y nombre; si no, se cancela y se borra lo descargado. Las
+    métricas de la descarga solo se registran al confirmarla.
+    """
+    
+    def __init__(self, url, plataforma):
+        self.url = url
+        self.plataforma = plataforma
+        self.metadatos = None
+        self.resultado = None
+        self.error = None
+        self.descargado = 0
+        self.total = None
+        self._preparacion = None
+        self._metricas = []
+        self._hilo = None
+        self._cancelada = False
+        self._terminada = False
+        self._lock = threading.Lock()
+        self._info_lista = threading.Event()
+        self._fin = threading.Event()
+        threading.Thread(target=self._obtener_info, daemon=True).start()
+    
+    def _obtener_info(self):
+        try:
+            self.metadatos = MetadatosVideo.desde_info(extraer_info(self.url), self.plataforma)
+        except Exception:
+            self.metadatos = None
+        finally:
+            self._info_lista.set()
+    
+    def obtener_metadatos(self):
+        """Espera la información adelantada; None si no se pudo obtener"""
+        self._info_lista.wait()
+        return self.metadatos
+    
+    def iniciar(self, tipo=None, calidad=None):
+        """Empieza la descarga especulativa con el tipo y la calidad elegidos"""
+        salidas = None
+        if self.plataforma == 'youtube':
+            tipo = resolver_tipo_descarga(tipo)[0]
+            perfil, salidas = perfil_de_tipo(tipo)
+            formato = resolver_calidad(tipo, calidad)[0]
+        else:
+            perfil = self.plataforma
+            formato = 'auto' if POLITICA_FORMATOS['activa'] else None
+        
+        # En la misma carpeta (y sistema de archivos) que el destino más probable,
+        # para que al confirmar la publicación sea un rename
+        base = carpeta_descargas_por_defecto()
+        if not os.path.isdir(base):
+            base = os.path.join(carpeta_cache(), 'adelantadas')
+        outtmpl = os.path.join(base, 'adelantada.%(ext)s')
+        self._preparacion = preparacion_descarga(self.url, perfil, formato, outtmpl, salidas)[2]
+        self._hilo = threading.Thread(target=self._descargar, args=(perfil, formato, outtmpl, salidas),
+                                      daemon=True)
+        self._hilo.start()
+    
+    def _progreso(self, metricas, d):
+        if self._cancelada:
+            raise DescargaCancelada("Descarga adelantada cancelada")
+        self.descargado, self.total = metricas.bytes, metricas.total_estimado
+    
+    def _descargar(self, perfil, formato, outtmpl, salidas):
+        try:
+            # Se espera a la información para no extraerla dos veces y para
+            # conocer la duración
+            self._info_lista.wait()
+            duracion = self.metadatos and self.metadatos.duracion_s
+            if not self._cancelada and duracion is not None and duracion <= ADELANTO['duracion_max_s']:
+                with observar_descargas(self._progreso), retener_metricas(self._metricas):
+                    self.resultado = descargar_con_info(self.url, perfil, outtmpl, formato, silencioso=True,
+                                                        publicar=False, salidas=salidas)
+        except Exception as e:
+            self.error = e
+        finally:
+            with self._lock:
+                self._terminada = True
+                cancelada = self._cancelada
+            if cancelada:
+                descartar_preparacion(self._preparacion)
+            self._fin.set()
+    
+    def confirmar(self, carpeta_destino, nombre):
+        """Termina la descarga adelantada y la publica con su destino y nombre
+        
+        Devuelve True o False como descargar_video_universal, o None si la
+        descarga no se adelantó y hay que hacerla de la forma normal.
+        """
+        if self._hilo is None:
+            return None
+        
+        if not self._fin.is_set():
+            print("   ⏳ Terminando la descarga, que empezó mientras contestabas...")
+            while not self._fin.wait(0.5):
+                if self.total:
+                    print(f"\r   📥 {100 * self.descargado / self.total:5.1f}% "
+                          f"de {self.total / 1048576:.1f} MB", end='', flush=True)
+            if self.total:
+                print()
+        
+        if self.error is not None:
+            self._registrar_metricas()
+            error = clasificar_error(self.error)
+            mostrar_error_descarga(error, self.plataforma, DEFECTOS_METADATOS[self.plataforma][2])
+            return False
+        if self.resultado is None:
+            return None
+        
+        if self.resultado['omitido']:
+            anotar_resultado(None, self.resultado)
+        else:
+            self.resultado.update(completar_publicacion(self.resultado.pop('publicacion'),
+                                                        carpeta_destino, nombre))
+            rutas = self.resultado.get('rutas') or [self.resultado['ruta']]
+            print(f"✅ ¡Descarga de {DEFECTOS_METADATOS[self.plataforma][2]} completada! "
+                  f"({', '.join(os.path.basename(ruta or '') for ruta in rutas)})")
+        self._registrar_metricas()
+        return True
+    
+    def _registrar_metricas(self):
+        for metricas in self._metricas:
+            registro_metricas.registrar(metricas)
+        del self._metricas[:]
+    
+    def esperar(self, segundos=None):
+        """Espera a que el hilo de la descarga termine; False si se agota el tiempo"""
+        return self._hilo is None or self._fin.wait(segundos)
+    
+    def cancelar(self):
+        """Interrumpe la descarga adelantada y borra lo descargado (sin esperar)"""
+        with self._lock:
+            if self._cancelada:
+                return
+            self._cancelada = True
+            terminada = self._terminada
+        # Si sigue en marcha, la borra el propio hilo al terminar
+        if terminada:
+            descartar_preparacion(self._preparacion)
+        # Lo que no se confirma no cuenta como descarga
+        del self._metricas[:]
+
+def modo_interactivo():
+    """Pide URL, destino y nombre al usuario y descarga un video cada vez"""
     print("=" * 70)
     print("    DESCARGADOR UNIVERSAL DE VIDEOS")
     print("      YouTube + Facebook + Instagram")
@@ -656,6 +4799,7 @@ def main():
     print()
     
     while True:
+        adelantada = None
         try:
             # Solicitar URL del video
             print("1. URL del video:")
@@ -674,25 +4818,33 @@ def main():
             
             print(f"   🎯 Plataforma detectada: {plataforma.upper()}")
             
+            # La información se pide ya en segundo plano, mientras se contesta el resto
+            adelantada = DescargaAdelantada(url, plataforma)
+            
+            # En YouTube se pregunta ahora qué descargar para poder empezar la descarga
+            tipo = calidad = None
+            if plataforma == 'youtube':
+                tipo, calidad = pedir_tipo_y_calidad()
+            if ADELANTO['activo']:
+                adelantada.iniciar(tipo, calidad)
+            
             # Obtener información del video
             print(f"\n   📡 Obteniendo información del contenido...")
-            info_video = obtener_info_universal(url)
+            info_video = adelantada.obtener_metadatos()
             
             if info_video:
-                print(f"   🏷️  Plataforma: {info_video['plataforma']}")
-                print(f"   📹 Título: {info_video['titulo']}")
-                print(f"   👤 Autor: {info_video['autor']}")
-                print(f"   ⏱️  Duración: {info_video['duracion']}")
+                print(f"   🏷️  Plataforma: {info_video.nombre_plataforma}")
+                print(f"   📹 Título: {info_video.titulo}")
+                print(f"   👤 Autor: {info_video.autor}")
+                print(f"   ⏱️  Duración: {info_video.duracion}")
                 
-                # Mostrar información específica según la plataforma
-                if 'vistas' in info_video and info_video['vistas'] and info_video['vistas'] != 'N/A':
-                    print(f"   👁️  Vistas: {info_video['vistas']}")
-                if 'likes' in info_video and info_video['likes'] and info_video['likes'] != 'N/A':
-                    print(f"   ❤️  Likes: {info_video['likes']}")
-                if 'views' in info_video and info_video['views'] and info_video['views'] != 'N/A':
-                    print(f"   👁️  Visualizaciones: {info_video['views']:,}")
+                # Vistas y likes solo si la plataforma los da
+                if info_video.vistas_texto:
+                    print(f"   👁️  Vistas: {info_video.vistas_texto}")
+                if info_video.likes_texto:
+                    print(f"   ❤️  Likes: {info_video.likes_texto}")
                     
-                print(f"   📝 Descripción: {info_video['descripcion']}")
+                print(f"   📝 Descripción: {info_video.descripcion}")
             else:
                 print("   ⚠️  No se pudo obtener información del contenido, pero se intentará descargar.")
             
@@ -706,7 +4858,7 @@ def main():
             if not carpeta_destino:
                 # Usar carpeta de descargas del usuario por defecto
                 try:
-                    carpeta_destino = os.path.join(str(Path.home()), "Downloads")
+                    carpeta_destino = carpeta_descargas_por_defecto()
                     print(f"   📁 Usando carpeta por defecto: {carpeta_destino}")
                 except Exception:
                     # Fallback si no se puede acceder a la carpeta del usuario
@@ -757,7 +4909,9 @@ def main():
             
             if respuesta in ['s', 'si', 'sí', 'y', 'yes']:
                 print()
-                exito = descargar_video_universal(url, carpeta_destino, nuevo_nombre)
+                exito = adelantada.confirmar(carpeta_destino, nuevo_nombre)
+                if exito is None:
+                    exito = descargar_video_universal(url, carpeta_destino, nuevo_nombre, tipo, calidad)
                 
                 if exito:
                     print(f"\n✅ El archivo se guardó en: {os.path.abspath(carpeta_destino)}")
@@ -783,9 +4937,224 @@ def main():
             print(f"\n❌ Error inesperado: {e}")
             print("Intentando nuevamente...")
             print()
+        finally:
+            # Lo que se adelantó y no se confirmó se descarta
+            if adelantada is not None:
+                adelantada.cancelar()
+    
+    # Antes de salir se deja que la última descarga cancelada borre lo que bajó
+    if adelantada is not None:
+        adelantada.esperar(10)
     
     print("\n¡Gracias por usar el descargador universal!")
     print("=" * 70)
 
+def parsear_argumentos(argv=None):
+    """Define y procesa los argumentos de línea de comandos"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        description="Descargador universal de videos (YouTube, Facebook e Instagram). "
+                    "Sin argumentos se ejecuta en modo interactivo.")
+    parser.add_argument('--lote', metavar='ARCHIVO',
+                        help="Archivo con una descarga por línea: url[,tipo[,calidad[,nombre[,tramos]]]] "
+                             "('-' para leer de stdin)")
+    parser.add_argument('--lista', metavar='URL', action='append', default=[],
+                        help="Lista de reproducción o canal a descargar (o sincronizar si ya se "
+                             "descargó antes). Se puede repetir")
+    parser.add_argument('--tipo', default=None,
+                        help="Tipo de descarga para las entradas de --lista y las líneas del lote sin tipo: "
+                             "video, audio_mp3, audio_wav o varias salidas de una sola descarga "
+                             "(p. ej. mp3+wav o mp4+mp3@192k+wav)")
+    parser.add_argument('--calidad', default=None, metavar='CALIDAD',
+                        help="Número de opción del menú o selector de formato de yt-dlp "
+                             "para las entradas sin calidad")
+    parser.add_argument('--tramo', metavar='INICIO-FIN', action='append', default=[],
+                        help="Descarga solo esa parte de las entradas de --lista y las líneas del lote "
+                             "sin tramos (p. ej. 1:30-2:00 o 1:02:00- hasta el final). Se puede repetir")
+    parser.add_argument('--recorte-rapido', action='store_true',
+                        help="Corta los tramos en el fotograma clave anterior al inicio, sin "
+                             "recodificar su video")
+    parser.add_argument('--destino', metavar='CARPETA', default=None,
+                        help="Carpeta donde guardar las descargas del lote (por defecto: Descargas)")
+    parser.add_argument('--servicio', metavar='[HOST:]PUERTO', nargs='?', const='127.0.0.1:8765',
+                        help="Arranca un servicio HTTP/JSON que recibe y ejecuta trabajos de descarga "
+                             "(por defecto: 127.0.0.1:8765)")
+    parser.add_argument('--encolar', metavar='CARPETA',
+                        help="Añade los trabajos de --lote y --lista a una cola en carpeta compartida "
+                             "en vez de descargarlos")
+    parser.add_argument('--cola', metavar='CARPETA',
+                        help="Trabaja para una cola en carpeta compartida (puede haber varios "
+                             "trabajadores en una o varias máquinas) hasta Ctrl+C")
+    parser.add_argument('--trabajadores', type=int, default=4, metavar='N',
+                        help="Número de descargas simultáneas en modo lote, servicio o cola (por defecto: 4)")
+    parser.add_argument('--transcodificadores', type=int, default=None, metavar='N',
+                        help="Conversiones MP3/WAV simultáneas en un pool separado de las descargas "
+                             "(por defecto: número de núcleos; 0 convierte dentro de cada descarga)")
+    parser.add_argument('--informe', metavar='ARCHIVO',
+                        help="Guarda el resultado de cada trabajo del lote en formato JSON lines")
+    parser.add_argument('--politica', metavar='ARCHIVO',
+                        help="Política de formatos en JSON (altura, tamaño, tasa, codecs, presupuesto "
+                             "de tiempo). Con ella la calidad por defecto pasa a ser 'auto'")
+    parser.add_argument('--limite', metavar='PLATAFORMA=TASA[:CONCURRENCIA]', action='append', default=[],
+                        help="Peticiones por segundo iniciales y descargas simultáneas máximas "
+                             "de una plataforma (p. ej. instagram=0.5:2). Se puede repetir")
+    parser.add_argument('--ancho-banda', metavar='TASA[@HH:MM-HH:MM]', action='append', default=[],
+                        help="Ancho de banda total para todas las descargas, en bytes por segundo "
+                             "(p. ej. 5M@08:00-20:00 limita a 5 MB/s de día). Se puede repetir; "
+                             "fuera de las franjas indicadas no hay límite")
+    parser.add_argument('--peso-ancho', metavar='PLATAFORMA=PESO', action='append', default=[],
+                        help="Peso de una plataforma en el reparto del ancho de banda (por defecto: 1)")
+    parser.add_argument('--reintentos', type=int, default=REINTENTOS['intentos'], metavar='N',
+                        help="Reintentos de cada descarga ante errores de red, del servidor o de "
+                             f"límite de tasa (por defecto: {REINTENTOS['intentos']}; 0 para desactivar)")
+    parser.add_argument('--segmentos', type=int, default=DESCARGA_SEGMENTADA['segmentos'], metavar='N',
+                        help="Conexiones simultáneas para descargar cada archivo progresivo grande "
+                             f"(por defecto: {DESCARGA_SEGMENTADA['segmentos']}; 1 para desactivar)")
+    parser.add_argument('--fragmentos', type=int, default=DESCARGA_PISTAS['fragmentos'], metavar='N',
+                        help="Fragmentos simultáneos de cada pista en los formatos de pistas separadas "
+                             f"(por defecto: {DESCARGA_PISTAS['fragmentos']})")
+    parser.add_argument('--pistas-secuenciales', action='store_true',
+                        help="Descarga las pistas de video y audio una detrás de otra")
+    parser.add_argument('--fsync', action='store_true',
+                        help="Fuerza la escritura a disco de cada archivo antes de publicarlo en el destino")
+    parser.add_argument('--sin-adelanto', action='store_true',
+                        help="En el modo interactivo no empieza la descarga hasta confirmarla "
+                             "(por defecto se adelanta mientras se contestan las preguntas)")
+    parser.add_argument('--audio-en-flujo', action='store_true',
+                        help="Convierte el audio MP3/WAV con ffmpeg mientras se descarga, "
+                             "sin archivo intermedio")
+    parser.add_argument('--metricas', metavar='ARCHIVO',
+                        help="Añade las métricas de cada descarga (latencias, velocidad, reintentos, "
+                             "postproceso) a un archivo JSON lines")
+    parser.add_argument('--metricas-prometheus', metavar='ARCHIVO',
+                        help="Mantiene un archivo .prom con las métricas por plataforma para el "
+                             "textfile collector de node_exporter")
+    parser.add_argument('--archivo-descargas', metavar='RUTA', default=None,
+                        help="Base de datos SQLite con las descargas completadas "
+                             "(por defecto en la carpeta de datos del usuario)")
+    parser.add_argument('--sin-archivo', action='store_true',
+                        help="No consultar ni actualizar el archivo de descargas")
+    parser.add_argument('--consultar-archivo', metavar='TEXTO', nargs='?', const='',
+                        help="Muestra las descargas registradas (filtrando por id, título, URL o ruta)")
+    parser.add_argument('--exportar-archivo', metavar='RUTA',
+                        help="Exporta el archivo de descargas a CSV o JSON (según la extensión)")
+    parser.add_argument('--startup-profile', '--perfil-arranque', dest='perfil_arranque',
+                        action='store_true',
+                        help="Muestra el tiempo de importación y del sondeo de dependencias")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parsear_argumentos(argv)
+    
+    if args.perfil_arranque:
+        mostrar_perfil_arranque()
+    
+    DESCARGA_SEGMENTADA['segmentos'] = max(1, args.segmentos)
+    REINTENTOS['intentos'] = max(0, args.reintentos)
+    DESCARGA_PISTAS['fragmentos'] = max(1, args.fragmentos)
+    DESCARGA_PISTAS['paralelo'] = not args.pistas_secuenciales
+    AUDIO_EN_FLUJO['activo'] = args.audio_en_flujo
+    ADELANTO['activo'] = not args.sin_adelanto
+    RECORTES['preciso'] = not args.recorte_rapido
+    PUBLICACION['fsync'] = args.fsync
+    registro_metricas.ruta_jsonl = args.metricas
+    registro_metricas.ruta_prometheus = args.metricas_prometheus
+    
+    try:
+        if args.tipo:
+            resolver_tipo_descarga(args.tipo)
+        tramos = normalizar_tramos(args.tramo)
+        for especificacion in args.limite:
+            configurar_limite_plataforma(especificacion)
+        for especificacion in args.ancho_banda:
+            configurar_ancho_banda(especificacion)
+        for especificacion in args.peso_ancho:
+            plataforma, _, peso = especificacion.partition('=')
+            if plataforma.strip().lower() not in ANCHO_BANDA['pesos'] or not float(peso or 0) > 0:
+                raise ValueError(f"Peso no válido: {especificacion} (usa plataforma=peso)")
+            ANCHO_BANDA['pesos'][plataforma.strip().lower()] = float(peso)
+        if args.politica:
+            cargar_politica_formatos(args.politica)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    
+    if not args.sin_archivo or args.consultar_archivo is not None or args.exportar_archivo:
+        try:
+            abrir_archivo_descargas(args.archivo_descargas)
+        except Exception as e:
+            print(f"⚠️  No se pudo abrir el archivo de descargas: {e}")
+    
+    if args.consultar_archivo is not None or args.exportar_archivo:
+        if archivo_descargas is None:
+            return 1
+        if args.consultar_archivo is not None:
+            mostrar_registros_archivo(archivo_descargas.consultar(args.consultar_archivo))
+        if args.exportar_archivo:
+            total = archivo_descargas.exportar(args.exportar_archivo)
+            print(f"📋 {total} registros exportados a: {os.path.abspath(args.exportar_archivo)}")
+        return 0
+    
+    if args.servicio:
+        if not verificar_dependencias():
+            return 1
+        direccion = args.servicio if ':' in args.servicio else f"127.0.0.1:{args.servicio}"
+        carpeta_destino = args.destino or carpeta_descargas_por_defecto()
+        return 0 if ejecutar_servicio(direccion, carpeta_destino, args.trabajadores) else 1
+    
+    if args.cola:
+        if not verificar_dependencias():
+            return 1
+        carpeta_destino = args.destino or carpeta_descargas_por_defecto()
+        return 0 if ejecutar_trabajador_cola(args.cola, carpeta_destino, args.trabajadores) else 1
+    
+    if not args.lote and not args.lista:
+        if args.encolar:
+            print("❌ --encolar necesita trabajos de --lote o --lista")
+            return 1
+        modo_interactivo()
+        return 0
+    
+    if not verificar_dependencias():
+        return 1
+    
+    trabajos = []
+    if args.lote:
+        try:
+            trabajos = leer_trabajos_lote(args.lote)
+        except OSError as e:
+            print(f"❌ No se pudo leer el archivo de lote: {e}")
+            return 1
+        for trabajo in trabajos:
+            trabajo['tipo'] = trabajo['tipo'] or args.tipo
+            trabajo['calidad'] = trabajo['calidad'] or args.calidad
+            trabajo['tramos'] = trabajo['tramos'] or tramos
+        trabajos, duplicados = quitar_trabajos_duplicados(trabajos)
+        if duplicados:
+            print(f"⏭️  {duplicados} líneas repetidas (misma URL en otra forma) omitidas")
+    
+    if args.lista:
+        import itertools
+        trabajos = itertools.chain(trabajos, *(trabajos_de_fuente(url, args.tipo, args.calidad, tramos)
+                                               for url in args.lista))
+    
+    if args.encolar:
+        try:
+            total = encolar_trabajos(args.encolar, trabajos, args.destino)
+        except OSError as e:
+            print(f"❌ No se pudo escribir en la cola {args.encolar}: {e}")
+            return 1
+        print(f"📬 {total} trabajos añadidos a la cola {os.path.abspath(args.encolar)}")
+        return 0
+    
+    carpeta_destino = args.destino or carpeta_descargas_por_defecto()
+    resultados = ejecutar_lote(trabajos, carpeta_destino, args.trabajadores, args.informe,
+                               args.transcodificadores, al_terminar=registrar_sincronizacion)
+    
+    return 0 if all(r['exito'] for r in resultados) else 2
+
+tiempos_arranque['importacion_s'] = time.perf_counter() - _inicio_importacion
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,192 @@
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import types
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# script.py está en la raíz del repositorio, no en un paquete
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def carpetas_usuario(tmp_path, monkeypatch):
+    """Las pruebas nunca tocan la caché ni los datos reales del usuario"""
+    for variable, carpeta in (('XDG_CACHE_HOME', 'cache'), ('LOCALAPPDATA', 'cache'),
+                              ('XDG_DATA_HOME', 'datos'), ('APPDATA', 'datos')):
+        monkeypatch.setenv(variable, str(tmp_path / carpeta))
+
+
+@pytest.fixture
+def yt_dlp():
+    return pytest.importorskip('yt_dlp')
+
+
+@pytest.fixture(scope='session')
+def ffmpeg():
+    ruta = shutil.which('ffmpeg')
+    if ruta is None:
+        pytest.skip("ffmpeg no está en el PATH")
+    return ruta
+
+
+def generar_medio(ffmpeg, ruta, segundos, video=True):
+    """Genera un MP4 (o un M4A sin video) sintético con ffmpeg"""
+    entradas = ['-f', 'lavfi', '-i', 'sine=frequency=440:sample_rate=44100']
+    salida = ['-c:a', 'aac', '-b:a', '96k']
+    if video:
+        entradas = ['-f', 'lavfi', '-i', 'testsrc2=size=320x180:rate=25'] + entradas
+        salida = ['-c:v', 'libx264', '-preset', 'ultrafast', '-g', '50', '-pix_fmt', 'yuv420p'] + salida
+    subprocess.run([ffmpeg, '-hide_banner', '-loglevel', 'error', '-y', *entradas, '-t', str(segundos),
+                    *salida, '-movflags', '+faststart', ruta], check=True)
+    return ruta
+
+
+class ServidorMedios:
+    """Servidor HTTP local con rangos que cuenta las peticiones, los rangos y los bytes servidos"""
+
+    def __init__(self, carpeta):
+        self.carpeta = carpeta
+        self.peticiones = Counter()
+        self.bytes = Counter()
+        self.rangos = []
+        self.pausa = None
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, formato, *args):
+                pass
+
+            def do_HEAD(self):
+                self.responder(cuerpo=False)
+
+            def do_GET(self):
+                self.responder(cuerpo=True)
+
+            def responder(self, cuerpo):
+                nombre = os.path.basename(self.path.split('?', 1)[0])
+                ruta = os.path.join(servidor.carpeta, nombre)
+                servidor.peticiones[nombre] += 1
+                if not os.path.isfile(ruta):
+                    self.send_error(404)
+                    return
+
+                total = os.path.getsize(ruta)
+                inicio, fin = 0, total - 1
+                rango = re.match(r'bytes=(\d+)-(\d*)$', self.headers.get('Range') or '')
+                if rango:
+                    inicio = int(rango.group(1))
+                    fin = min(int(rango.group(2) or fin), total - 1)
+                    servidor.rangos.append((nombre, inicio, fin))
+                self.send_response(206 if rango else 200)
+                self.send_header('Content-Type', 'video/mp4' if nombre.endswith('.mp4') else 'audio/mp4')
+                self.send_header('Content-Length', str(fin - inicio + 1))
+                self.send_header('Accept-Ranges', 'bytes')
+                if rango:
+                    self.send_header('Content-Range', f'bytes {inicio}-{fin}/{total}')
+                self.end_headers()
+                if not cuerpo:
+                    return
+
+                try:
+                    with open(ruta, 'rb') as f:
+                        f.seek(inicio)
+                        pendiente = fin - inicio + 1
+                        while pendiente > 0:
+                            datos = f.read(min(65536, pendiente))
+                            self.wfile.write(datos)
+                            servidor.bytes[nombre] += len(datos)
+                            pendiente -= len(datos)
+                            if servidor.pausa:
+                                servidor.pausa()
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+        self._http = ThreadingHTTPServer(('127.0.0.1', 0), Manejador)
+        self._http.daemon_threads = True
+        threading.Thread(target=self._http.serve_forever, daemon=True).start()
+
+    def url(self, nombre):
+        return f"http://127.0.0.1:{self._http.server_address[1]}/{nombre}"
+
+    def cerrar(self):
+        self._http.shutdown()
+        self._http.server_close()
+
+
+@pytest.fixture
+def servidor(tmp_path):
+    carpeta = tmp_path / 'servidor'
+    carpeta.mkdir()
+    servidor = ServidorMedios(str(carpeta))
+    yield servidor
+    servidor.cerrar()
+
+
+@pytest.fixture
+def sin_limites(monkeypatch):
+    """Las pruebas no necesitan limitador: las peticiones no esperan tokens"""
+    import script
+
+    for plataforma in list(script.LIMITES_PLATAFORMA):
+        monkeypatch.setitem(script.LIMITES_PLATAFORMA, plataforma, {
+            'tasa': 1000.0, 'tasa_min': 1000.0, 'tasa_max': 1000.0, 'rafaga': 1000, 'concurrencia': 16})
+    monkeypatch.setattr(script, '_controladores', {})
+
+
+class YoutubeDLFalso:
+    """YoutubeDL mínimo para probar el pool y la caché sin yt-dlp ni red"""
+
+    creadas = 0
+
+    def __init__(self, params):
+        YoutubeDLFalso.creadas += 1
+        self.params = dict(params)
+        outtmpl = self.params.get('outtmpl')
+        self.params['outtmpl'] = outtmpl if isinstance(outtmpl, dict) else {'default': outtmpl or '%(title)s.%(ext)s'}
+        self.format_selector = self.build_format_selector(self.params.get('format'))
+        self.llamadas = []
+        self.cerrada = False
+
+    @staticmethod
+    def sanitize_info(info, remove_private_keys=False):
+        return dict(info)
+
+    def build_format_selector(self, formato):
+        return ('selector', formato)
+
+    def extract_info(self, url, download=True, process=True):
+        self.llamadas.append(('extract_info', url))
+        return {'id': url.rsplit('/', 1)[-1], 'title': 'Falso', 'duration': 10, 'formats': []}
+
+    def process_ie_result(self, info, download=True):
+        """Escribe un archivo en la plantilla de salida en lugar de descargar"""
+        self.llamadas.append(('process_ie_result', info['id']))
+        ruta = self.params['outtmpl']['default'].replace('%(id)s', info['id']).replace('%(ext)s', 'mp4')
+        if download:
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            with open(ruta, 'wb') as f:
+                f.write(b'video')
+        return {**info, 'requested_downloads': [{'filepath': ruta}]}
+
+    def close(self):
+        self.cerrada = True
+
+
+@pytest.fixture
+def youtube_dl_falso(monkeypatch):
+    """El pool de yt-dlp crea instancias de YoutubeDLFalso"""
+    import script
+
+    YoutubeDLFalso.creadas = 0
+    monkeypatch.setitem(sys.modules, 'yt_dlp', types.SimpleNamespace(YoutubeDL=YoutubeDLFalso))
+    monkeypatch.setattr(script, 'clase_youtube_dl', lambda: YoutubeDLFalso)
+    monkeypatch.setattr(script, 'pool_ydl', script.PoolYoutubeDL())
+    return YoutubeDLFalso
@@ -0,0 +1,149 @@
+"""Pruebas de la descarga adelantada del modo interactivo"""
+
+import os
+import threading
+import time
+
+import pytest
+
+import script
+from script import DescargaAdelantada, MetricasDescarga
+from conftest import generar_medio
+
+
+@pytest.fixture
+def registradas(monkeypatch):
+    registradas = []
+    monkeypatch.setattr(script.registro_metricas, 'registrar', registradas.append)
+    return registradas
+
+
+@pytest.fixture
+def descargas(tmp_path, monkeypatch):
+    """Carpeta de Descargas del usuario dentro de la carpeta temporal"""
+    carpeta = tmp_path / 'Downloads'
+    carpeta.mkdir()
+    monkeypatch.setattr(script, 'carpeta_descargas_por_defecto', lambda: str(carpeta))
+    return carpeta
+
+
+def descarga_simulada(monkeypatch, continuar=None):
+    """Sustituye la extracción y la descarga por versiones sin red
+
+    La descarga escribe un archivo en la carpeta de preparación y cierra sus
+    métricas como lo hace descargar_con_info; si se da continuar, espera a ese
+    evento avisando del progreso (lo que permite cancelarla a medias).
+    """
+    monkeypatch.setattr(script, 'extraer_info', lambda url: {'id': 'abc', 'title': 'Prueba', 'duration': 30})
+
+    def descargar(url, perfil, outtmpl, formato=None, silencioso=False, publicar=True, salidas=None, **_):
+        metricas = MetricasDescarga(url, 'facebook', perfil)
+        try:
+            while continuar is not None and not continuar.wait(0.01):
+                if metricas.observador:
+                    metricas.observador(metricas, {'status': 'downloading'})
+            carpeta_destino, plantilla, preparacion = script.preparacion_descarga(url, perfil, formato, outtmpl,
+                                                                                  salidas)
+            os.makedirs(preparacion, exist_ok=True)
+            ruta = os.path.join(preparacion, plantilla.replace('%(ext)s', 'mp4'))
+            with open(ruta, 'wb') as f:
+                f.write(b'video')
+        except Exception as e:
+            metricas.terminar(error=e)
+            raise
+        metricas.terminar('ok', ruta)
+        return {'omitido': False, 'ruta': ruta, 'tamano': 5, 'publicacion': {
+            'rutas': [ruta], 'raiz': 'adelantada', 'preparacion': preparacion, 'plataforma': 'facebook',
+            'id_video': 'abc', 'clave_perfil': perfil, 'url': url, 'titulo': 'Prueba'}}
+
+    monkeypatch.setattr(script, 'descargar_con_info', descargar)
+
+
+def test_se_prepara_junto_al_destino_y_se_publica_al_confirmar(tmp_path, descargas, registradas, monkeypatch):
+    descarga_simulada(monkeypatch)
+    adelantada = DescargaAdelantada('https://www.facebook.com/watch?v=1', 'facebook')
+    adelantada.iniciar()
+    assert adelantada.esperar(5)
+
+    # La descarga espera en la carpeta oculta de Descargas y no cuenta todavía
+    assert os.listdir(descargas) == ['.avd-staging']
+    assert registradas == []
+
+    destino = tmp_path / 'destino'
+    destino.mkdir()
+    assert adelantada.confirmar(str(destino), 'mi video')
+    assert os.listdir(destino) == ['mi video.mp4']
+    assert os.listdir(descargas) == []
+    assert [m.resultado for m in registradas] == ['ok']
+
+
+def test_cancelar_no_deja_rastro(descargas, registradas, monkeypatch):
+    continuar = threading.Event()
+    descarga_simulada(monkeypatch, continuar)
+    adelantada = DescargaAdelantada('https://www.facebook.com/watch?v=1', 'facebook')
+    adelantada.iniciar()
+    time.sleep(0.05)
+
+    adelantada.cancelar()
+    assert adelantada.esperar(5)
+    assert isinstance(adelantada.error, script.DescargaCancelada)
+    assert os.listdir(descargas) == []
+    assert registradas == []
+
+
+def test_cancelar_una_descarga_terminada(descargas, registradas, monkeypatch):
+    descarga_simulada(monkeypatch)
+    adelantada = DescargaAdelantada('https://www.facebook.com/watch?v=1', 'facebook')
+    adelantada.iniciar()
+    assert adelantada.esperar(5)
+
+    adelantada.cancelar()
+    assert os.listdir(descargas) == []
+    assert registradas == []
+
+
+def test_sin_carpeta_de_descargas_se_usa_la_cache(tmp_path, registradas, monkeypatch):
+    monkeypatch.setattr(script, 'carpeta_descargas_por_defecto', lambda: str(tmp_path / 'no_existe'))
+    descarga_simulada(monkeypatch)
+    adelantada = DescargaAdelantada('https://www.facebook.com/watch?v=1', 'facebook')
+    adelantada.iniciar()
+    assert adelantada.esperar(5)
+    assert adelantada.resultado['ruta'].startswith(os.path.join(script.carpeta_cache(), 'adelantadas'))
+
+    destino = tmp_path / 'destino'
+    destino.mkdir()
+    assert adelantada.confirmar(str(destino), 'video')
+    assert os.listdir(destino) == ['video.mp4']
+
+
+def test_videos_largos_solo_adelantan_la_informacion(descargas, monkeypatch):
+    monkeypatch.setattr(script, 'extraer_info', lambda url: {'id': 'abc', 'title': 'Largo', 'duration': 7200})
+    monkeypatch.setattr(script, 'descargar_con_info', lambda *a, **k: pytest.fail("no debe descargar"))
+    adelantada = DescargaAdelantada('https://www.facebook.com/watch?v=1', 'facebook')
+    adelantada.iniciar()
+
+    assert adelantada.obtener_metadatos().titulo == 'Largo'
+    assert adelantada.esperar(5)
+    assert adelantada.confirmar('.', 'video') is None
+
+
+def test_descarga_real_adelantada(tmp_path, descargas, registradas, servidor, yt_dlp, ffmpeg, sin_limites,
+                                  monkeypatch):
+    generar_medio(ffmpeg, os.path.join(servidor.carpeta, 'clip.mp4'), 2)
+    url = servidor.url('clip.mp4')
+    extraer = script.extraer_info
+    # El extractor genérico no da la duración de un archivo suelto
+    monkeypatch.setattr(script, 'extraer_info', lambda url: {**extraer(url), 'duration': 2})
+
+    adelantada = DescargaAdelantada(url, 'facebook')
+    adelantada.iniciar()
+    assert adelantada.esperar(60)
+    assert adelantada.error is None
+    assert registradas == []
+
+    destino = tmp_path / 'destino'
+    destino.mkdir()
+    assert adelantada.confirmar(str(destino), 'clip')
+    assert os.listdir(destino) == ['clip.mp4']
+    assert os.listdir(descargas) == []
+    assert [m.resultado for m in registradas] == ['ok']
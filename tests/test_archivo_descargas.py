@@ -0,0 +1,89 @@
+"""Pruebas del archivo SQLite de descargas completadas"""
+
+import json
+import os
+import threading
+
+import pytest
+
+import script
+from script import ArchivoDescargas
+
+
+@pytest.fixture
+def archivo(tmp_path):
+    archivo = ArchivoDescargas(str(tmp_path / 'datos' / 'archivo.sqlite3'))
+    yield archivo
+    archivo.cerrar()
+
+
+def test_registrar_y_buscar(archivo):
+    archivo.registrar('youtube', 'aaaaaaaaaaa', 'video:best', 'https://youtu.be/aaaaaaaaaaa',
+                      'Título', '/videos/a.mp4', 1234)
+    registro = archivo.buscar('youtube', 'aaaaaaaaaaa', 'video:best')
+    assert registro['titulo'] == 'Título'
+    assert registro['tamano'] == 1234
+    # Otro perfil del mismo video es otra descarga
+    assert archivo.buscar('youtube', 'aaaaaaaaaaa', 'audio_mp3') is None
+
+
+def test_el_archivo_persiste_entre_ejecuciones(tmp_path):
+    ruta = str(tmp_path / 'archivo.sqlite3')
+    primero = ArchivoDescargas(ruta)
+    primero.registrar('facebook', '123', 'facebook', 'https://fb.watch/x', 'Video', '/v.mp4', 1)
+    primero.cerrar()
+
+    segundo = ArchivoDescargas(ruta)
+    assert segundo.buscar('facebook', '123', 'facebook')['url'] == 'https://fb.watch/x'
+    assert segundo.resolver_alias('https://fb.watch/x') == ('facebook', '123')
+    segundo.cerrar()
+
+
+def test_registros_simultaneos(archivo):
+    def registrar(n):
+        for m in range(20):
+            archivo.registrar('youtube', f'{n}-{m}', 'video', f'https://youtu.be/{n}{m}', None, None, None)
+
+    hilos = [threading.Thread(target=registrar, args=(n,)) for n in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert len(archivo.consultar()) == 160
+
+
+def test_consultar_y_exportar(archivo, tmp_path):
+    archivo.registrar('youtube', 'aaaaaaaaaaa', 'video', 'https://youtu.be/aaaaaaaaaaa', 'Gatos', '/a.mp4', 1)
+    archivo.registrar('youtube', 'bbbbbbbbbbb', 'video', 'https://youtu.be/bbbbbbbbbbb', 'Perros', '/b.mp4', 2)
+    assert [r['id_video'] for r in archivo.consultar('Gatos')] == ['aaaaaaaaaaa']
+    assert len(archivo.consultar(limite=1)) == 1
+
+    assert archivo.exportar(str(tmp_path / 'archivo.json')) == 2
+    with open(tmp_path / 'archivo.json', encoding='utf-8') as f:
+        assert {r['titulo'] for r in json.load(f)} == {'Gatos', 'Perros'}
+    assert archivo.exportar(str(tmp_path / 'archivo.csv')) == 2
+    assert (tmp_path / 'archivo.csv').read_text(encoding='utf-8').startswith('plataforma,id_video,')
+
+
+def test_solo_cuenta_si_el_archivo_sigue_existiendo(archivo, tmp_path, monkeypatch):
+    ruta = tmp_path / 'a.mp4'
+    ruta.write_bytes(b'video')
+    archivo.registrar('youtube', 'aaaaaaaaaaa', 'video', 'https://youtu.be/aaaaaaaaaaa', None, str(ruta), 5)
+    monkeypatch.setattr(script, 'archivo_descargas', archivo)
+
+    assert script.buscar_descarga_previa('youtube', 'aaaaaaaaaaa', 'video')['ruta'] == str(ruta)
+    os.remove(ruta)
+    assert script.buscar_descarga_previa('youtube', 'aaaaaaaaaaa', 'video') is None
+
+
+def test_la_segunda_descarga_se_omite(archivo, tmp_path, youtube_dl_falso, monkeypatch):
+    monkeypatch.setattr(script, 'archivo_descargas', archivo)
+    plantilla = str(tmp_path / '%(id)s.%(ext)s')
+    primera = script.descargar_con_info('https://youtu.be/aaaaaaaaaaa', 'youtube-video', plantilla)
+    assert not primera['omitido'] and primera['tamano'] == 5
+
+    # Otra forma de la misma URL ya no descarga ni extrae
+    segunda = script.descargar_con_info('https://www.youtube.com/shorts/aaaaaaaaaaa', 'youtube-video', plantilla)
+    assert (segunda['omitido'], segunda['ruta'], segunda['tamano']) == (True, primera['ruta'], 5)
+    with script.pool_ydl.prestar('youtube-video') as ydl:
+        assert ydl.llamadas == [('extract_info', 'https://youtu.be/aaaaaaaaaaa'), ('process_ie_result', 'aaaaaaaaaaa')]
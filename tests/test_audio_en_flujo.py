@@ -0,0 +1,56 @@
+"""Pruebas del audio que se convierte con ffmpeg mientras se descarga"""
+
+import os
+
+import pytest
+
+import script
+from script import admite_audio_en_flujo, transmitir_audio_a_ffmpeg
+from conftest import generar_medio
+
+
+def test_que_formatos_admiten_el_flujo():
+    formato = {'url': 'https://x/a.m4a', 'protocol': 'https'}
+    assert admite_audio_en_flujo(formato)
+    assert not admite_audio_en_flujo({**formato, 'protocol': 'm3u8_native'})
+    assert not admite_audio_en_flujo({**formato, 'fragments': [{}]})
+    assert not admite_audio_en_flujo({**formato, 'requested_formats': [{}, {}]})
+    assert not admite_audio_en_flujo({**formato, 'is_live': True})
+    assert not admite_audio_en_flujo({'protocol': 'https'})
+
+
+@pytest.fixture
+def ydl(yt_dlp):
+    ydl = script.clase_youtube_dl()({'quiet': True})
+    yield ydl
+    ydl.close()
+
+
+def test_se_convierte_a_trozos_mientras_se_descarga(tmp_path, servidor, ydl, ffmpeg, capsys):
+    generar_medio(ffmpeg, os.path.join(servidor.carpeta, 'audio.m4a'), 3, video=False)
+    tamano = os.path.getsize(os.path.join(servidor.carpeta, 'audio.m4a'))
+    carpeta = tmp_path / 'destino'
+    carpeta.mkdir()
+    destino = str(carpeta / 'audio.mp3')
+    info = {'url': servidor.url('audio.m4a'), 'title': 'Prueba',
+            'downloader_options': {'http_chunk_size': tamano // 3 + 1}}
+    avisos = []
+    ydl.add_progress_hook(avisos.append)
+
+    assert transmitir_audio_a_ffmpeg(ydl, info, destino, 'youtube-mp3')
+    assert os.listdir(carpeta) == ['audio.mp3']
+    assert os.path.getsize(destino) > 0
+    assert len(servidor.rangos) == 3
+    assert avisos[-1]['status'] == 'finished'
+    assert avisos[-1]['downloaded_bytes'] == tamano
+    assert 'convertido en flujo' in capsys.readouterr().out
+
+
+def test_si_falla_se_vuelve_a_la_descarga_normal(tmp_path, servidor, ydl, ffmpeg, capsys):
+    carpeta = tmp_path / 'destino'
+    carpeta.mkdir()
+    info = {'url': servidor.url('no_existe.m4a')}
+
+    assert not transmitir_audio_a_ffmpeg(ydl, info, str(carpeta / 'audio.mp3'), 'youtube-mp3')
+    assert os.listdir(carpeta) == []
+    assert 'se usa la descarga normal' in capsys.readouterr().out
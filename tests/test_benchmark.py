@@ -0,0 +1,84 @@
+"""Pruebas del banco de pruebas de descargas contra el servidor local"""
+
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+import benchmark
+
+
+@pytest.fixture
+def medios(tmp_path):
+    carpeta = tmp_path / 'medios'
+    carpeta.mkdir()
+    (carpeta / 'video-1.mp4').write_bytes(bytes(range(256)) * 1024)
+    return str(carpeta)
+
+
+def levantar(carpeta, **opciones):
+    servidor = benchmark.crear_servidor(carpeta, **opciones)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}/media/video-1.mp4"
+
+
+def pedir(url, rango=None):
+    peticion = urllib.request.Request(url, headers={'Range': rango} if rango else {})
+    try:
+        with urllib.request.urlopen(peticion) as respuesta:
+            return respuesta.status, respuesta.headers, respuesta.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, b''
+
+
+def test_rangos(medios):
+    servidor, url = levantar(medios)
+    try:
+        estado, cabeceras, cuerpo = pedir(url, 'bytes=10-19')
+        assert (estado, cuerpo) == (206, bytes(range(10, 20)))
+        assert cabeceras['Content-Range'] == 'bytes 10-19/262144'
+        assert pedir(url, 'bytes=-4')[2] == bytes(range(252, 256))
+        assert pedir(url, 'bytes=300000-')[0] == 416
+        assert pedir(url)[0] == 200
+        assert pedir(url.replace('video-1', 'otro'))[0] == 404
+    finally:
+        servidor.shutdown()
+
+
+def test_sin_rangos_se_envia_todo(medios):
+    servidor, url = levantar(medios, rangos=False)
+    try:
+        estado, cabeceras, cuerpo = pedir(url, 'bytes=10-19')
+        assert estado == 200
+        assert len(cuerpo) == 262144
+        assert 'Accept-Ranges' not in cabeceras
+    finally:
+        servidor.shutdown()
+
+
+def test_latencia_y_ancho_de_banda(medios):
+    servidor, url = levantar(medios, latencia=0.1, ancho_banda=1024 * 1024)
+    try:
+        inicio = time.monotonic()
+        pedir(url)
+        # 256 KiB a 1 MiB/s más la latencia (el último bloque sale sin espera)
+        assert time.monotonic() - inicio >= 0.25
+    finally:
+        servidor.shutdown()
+
+
+def test_medicion_en_subproceso(medios, yt_dlp, ffmpeg):
+    servidor, url = levantar(medios)
+    try:
+        resultado = benchmark.medir_en_subproceso({
+            'perfil': 'video', 'tamano_mb': 1, 'concurrencia': 2, 'archivos': 3,
+            'segmentos': 1, 'audio_en_flujo': False, 'url': url})
+    finally:
+        servidor.shutdown()
+    assert 'error' not in resultado, resultado.get('error')
+    assert resultado['bytes'] == 3 * 262144
+    assert resultado['mb_s'] > 0
+    assert resultado['cpu_s'] >= 0
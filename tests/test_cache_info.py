@@ -0,0 +1,73 @@
+"""Pruebas de la caché de la información extraída"""
+
+from collections import OrderedDict
+
+import pytest
+
+import script
+from script import descargar_con_info, extraer_info, guardar_info_cache, obtener_info_cache
+
+
+@pytest.fixture(autouse=True)
+def cache_vacia(monkeypatch):
+    monkeypatch.setattr(script, '_cache_info', OrderedDict())
+
+
+def test_guardar_y_obtener():
+    info = {'id': 'abc', 'title': 'Video', 'thumbnails': [{}], 'subtitles': {}}
+    guardar_info_cache(' https://youtu.be/abc ', info)
+    assert obtener_info_cache('https://youtu.be/abc')['title'] == 'Video'
+    # Los campos que ningún perfil usa no se guardan
+    assert 'thumbnails' not in info and 'subtitles' not in info
+
+
+def test_consumir_quita_la_entrada():
+    guardar_info_cache('https://youtu.be/abc', {'id': 'abc'})
+    assert obtener_info_cache('https://youtu.be/abc', consumir=True) == {'id': 'abc'}
+    assert obtener_info_cache('https://youtu.be/abc') is None
+
+
+def test_se_guarda_lo_que_tardo_la_extraccion():
+    guardar_info_cache('https://youtu.be/abc', {'id': 'abc'}, 1.5)
+    assert obtener_info_cache('https://youtu.be/abc', con_duracion=True) == ({'id': 'abc'}, 1.5)
+    assert obtener_info_cache('https://youtu.be/abc') == {'id': 'abc'}
+    assert obtener_info_cache('https://youtu.be/xyz', con_duracion=True) == (None, None)
+
+
+def test_las_entradas_caducan(monkeypatch):
+    guardar_info_cache('https://youtu.be/abc', {'id': 'abc'})
+    monkeypatch.setattr(script, 'CACHE_INFO_TTL', -1)
+    assert obtener_info_cache('https://youtu.be/abc') is None
+
+
+def test_las_listas_no_se_guardan():
+    guardar_info_cache('https://www.youtube.com/playlist?list=PL1', {'_type': 'playlist', 'entries': []})
+    assert obtener_info_cache('https://www.youtube.com/playlist?list=PL1') is None
+
+
+def test_se_descartan_las_mas_antiguas(monkeypatch):
+    monkeypatch.setattr(script, 'CACHE_INFO_MAX', 2)
+    for n in range(3):
+        guardar_info_cache(f'https://youtu.be/{n}', {'id': str(n)})
+    obtener_info_cache('https://youtu.be/1')
+    guardar_info_cache('https://youtu.be/3', {'id': '3'})
+    assert obtener_info_cache('https://youtu.be/0') is None
+    assert obtener_info_cache('https://youtu.be/2') is None
+    assert obtener_info_cache('https://youtu.be/1') is not None
+
+
+def test_extraer_info_extrae_una_sola_vez(youtube_dl_falso):
+    primera = extraer_info('https://youtu.be/abc')
+    assert extraer_info('https://youtu.be/abc') is primera
+    with script.pool_ydl.prestar('metadata-probe') as ydl:
+        assert ydl.llamadas == [('extract_info', 'https://youtu.be/abc')]
+
+
+def test_la_descarga_reutiliza_la_informacion(youtube_dl_falso, tmp_path):
+    extraer_info('https://youtu.be/abc')
+    descargar_con_info('https://youtu.be/abc', 'youtube-video', str(tmp_path / 'abc.%(ext)s'))
+    # Sin información en caché se vuelve a extraer
+    descargar_con_info('https://youtu.be/abc', 'youtube-video', str(tmp_path / 'abc.%(ext)s'))
+    with script.pool_ydl.prestar('youtube-video') as ydl:
+        assert ydl.llamadas == [('process_ie_result', 'abc'), ('extract_info', 'https://youtu.be/abc'),
+                                ('process_ie_result', 'abc')]
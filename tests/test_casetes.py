@@ -0,0 +1,45 @@
+"""Pruebas de la grabación y reproducción de extracciones en casetes"""
+
+import base64
+import json
+import os
+
+import pytest
+
+import benchmark
+
+
+@pytest.fixture
+def casete(tmp_path, servidor, yt_dlp):
+    """Graba la extracción de un archivo del servidor local y apaga el servidor"""
+    with open(os.path.join(servidor.carpeta, 'video.mp4'), 'wb') as f:
+        f.write(os.urandom(256 * 1024))
+    url = servidor.url('video.mp4')
+    ruta = benchmark.grabar_casete(url, str(tmp_path / 'casetes'))
+    servidor.cerrar()
+    assert ruta == benchmark.ruta_casete(str(tmp_path / 'casetes'), url)
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_la_grabacion_guarda_las_peticiones(casete):
+    assert casete['intercambios']
+    assert casete['yt_dlp']
+    # De los medios solo se guarda el principio
+    for intercambio in casete['intercambios']:
+        assert len(base64.b64decode(intercambio['cuerpo'])) <= 64 * 1024
+
+
+def test_la_reproduccion_no_usa_la_red(casete):
+    mediciones = benchmark.medir_extraccion(casete)
+    assert set(mediciones) == set(benchmark.FASES_EXTRACCION)
+    assert mediciones['red']['s'] >= 0
+
+    con_memoria = benchmark.medir_extraccion(casete, memoria=True)
+    assert all('pico_kib' in con_memoria[fase] for fase in benchmark.FASES_EXTRACCION if fase != 'red')
+
+
+def test_una_peticion_fuera_del_casete_falla(casete):
+    vacio = {**casete, 'intercambios': []}
+    with pytest.raises(Exception):
+        benchmark.medir_extraccion(vacio)
@@ -0,0 +1,133 @@
+"""Pruebas del cortacircuitos de ControladorPlataforma"""
+
+import threading
+import time
+
+import pytest
+
+import script
+from script import (ControladorPlataforma, ErrorDesconocido, ErrorLimiteTasa, ErrorPermanente,
+                    ErrorTransitorio)
+
+
+@pytest.fixture
+def controlador(monkeypatch):
+    monkeypatch.setitem(script.CIRCUITO, 'pausa_s', 0.05)
+    monkeypatch.setitem(script.CIRCUITO, 'pausa_max_s', 0.2)
+    return ControladorPlataforma('youtube', tasa=1000.0, tasa_min=1.0, tasa_max=2000.0,
+                                 rafaga=100, concurrencia=8)
+
+
+def peticiones(controlador, resultado, veces):
+    for _ in range(veces):
+        controlador.adquirir()
+        controlador.liberar(resultado)
+
+
+def test_se_abre_con_fallos_transitorios(controlador):
+    peticiones(controlador, 'fallo', script.CIRCUITO['minimo'] - 1)
+    assert controlador.circuito == 'cerrado'
+
+    peticiones(controlador, 'fallo', 1)
+    assert controlador.circuito == 'abierto'
+    assert controlador.aperturas == 1
+
+
+def test_no_se_abre_por_debajo_del_umbral(controlador):
+    peticiones(controlador, 'ok', 6)
+    peticiones(controlador, 'fallo', 5)
+    assert controlador.circuito == 'cerrado'
+
+
+def test_errores_permanentes_no_abren(controlador):
+    peticiones(controlador, 'permanente', 10)
+    assert controlador.circuito == 'cerrado'
+    assert controlador.aperturas == 0
+
+
+def test_abierto_espera_la_pausa(controlador):
+    peticiones(controlador, 'fallo', script.CIRCUITO['minimo'])
+
+    inicio = time.monotonic()
+    controlador.adquirir()
+    assert time.monotonic() - inicio >= 0.04
+    assert controlador.circuito == 'medio_abierto'
+
+
+def test_medio_abierto_deja_pasar_una_sola_prueba(controlador):
+    peticiones(controlador, 'fallo', script.CIRCUITO['minimo'])
+    controlador.adquirir()
+
+    segunda = threading.Event()
+
+    def adquirir():
+        controlador.adquirir()
+        segunda.set()
+        controlador.liberar('ok')
+
+    hilo = threading.Thread(target=adquirir)
+    hilo.start()
+    # Mientras la prueba está en curso nadie más pasa
+    assert not segunda.wait(0.2)
+
+    controlador.liberar('ok')
+    assert segunda.wait(1)
+    hilo.join()
+    assert controlador.circuito == 'cerrado'
+
+
+def test_prueba_fallida_reabre_con_pausa_doble(controlador):
+    peticiones(controlador, 'fallo', script.CIRCUITO['minimo'])
+
+    controlador.adquirir()
+    controlador.liberar('fallo')
+    assert controlador.circuito == 'abierto'
+    assert controlador.aperturas == 2
+    assert controlador._pausa == pytest.approx(0.1)
+
+    controlador.adquirir()
+    controlador.liberar('fallo')
+    controlador.adquirir()
+    controlador.liberar('fallo')
+    # La pausa no pasa de pausa_max_s
+    assert controlador._pausa == pytest.approx(0.2)
+
+    controlador.adquirir()
+    controlador.liberar('ok')
+    assert controlador.circuito == 'cerrado'
+    assert controlador._pausa == pytest.approx(script.CIRCUITO['pausa_s'])
+
+
+def test_cerrar_olvida_los_fallos_anteriores(controlador):
+    peticiones(controlador, 'fallo', script.CIRCUITO['minimo'])
+    peticiones(controlador, 'ok', 1)
+    assert controlador.circuito == 'cerrado'
+
+    peticiones(controlador, 'fallo', script.CIRCUITO['minimo'] - 1)
+    assert controlador.circuito == 'cerrado'
+
+
+def test_permiso_informa_segun_el_error(controlador):
+    resultados = []
+    liberar = controlador.liberar
+    controlador.liberar = lambda resultado='ok': (resultados.append(resultado), liberar(resultado))
+
+    with controlador.permiso():
+        pass
+    for error in (ErrorLimiteTasa('429', 'limite'), ErrorTransitorio('timeout', 'red'),
+                  ErrorPermanente('privado', 'privado'), ErrorDesconocido('raro')):
+        with pytest.raises(type(error)):
+            with controlador.permiso():
+                raise error
+
+    assert resultados == ['ok', 'limitado', 'fallo', 'permanente', 'desconocido']
+    assert controlador.activos == 0
+
+
+def test_errores_desconocidos_no_abren(controlador):
+    for _ in range(script.CIRCUITO['minimo'] * 2):
+        with pytest.raises(RuntimeError):
+            with controlador.permiso():
+                raise RuntimeError("Fallo local sin motivo conocido")
+    assert controlador.circuito == 'cerrado'
+    assert controlador.aperturas == 0
@@ -0,0 +1,188 @@
+"""Pruebas de la cola en carpeta: reclamo por rename, latido y recuperación de caducados"""
+
+import os
+import threading
+
+import pytest
+
+import script
+from script import ColaCarpeta
+
+
+@pytest.fixture
+def cola(tmp_path):
+    return ColaCarpeta(str(tmp_path / 'cola'))
+
+
+def archivos(cola, subcarpeta):
+    return sorted(os.listdir(os.path.join(cola.carpeta, subcarpeta)))
+
+
+def test_reclama_el_mas_antiguo_primero(cola):
+    primero = cola.encolar({'url': 'https://youtu.be/aaaaaaaaaaa'})
+    cola.encolar({'url': 'https://youtu.be/bbbbbbbbbbb'})
+
+    ruta, trabajo = cola.reclamar('t1')
+    assert trabajo['id'] == primero
+    assert os.path.basename(ruta) == f"{primero}@t1.json"
+    assert cola.resumen() == {'pendientes': 1, 'en_curso': 1, 'terminados': 0, 'fallidos': 0}
+
+
+def test_carrera_de_reclamos_solo_gana_uno(cola):
+    cola.encolar({'url': 'https://youtu.be/aaaaaaaaaaa'})
+
+    # Varios trabajadores (cada uno con su propia instancia) reclaman a la vez
+    trabajadores = 16
+    barrera = threading.Barrier(trabajadores)
+    ganadores = []
+
+    def reclamar(numero):
+        otra = ColaCarpeta(cola.carpeta)
+        barrera.wait()
+        reclamado = otra.reclamar(f"t{numero}")
+        if reclamado is not None:
+            ganadores.append(reclamado)
+
+    hilos = [threading.Thread(target=reclamar, args=(n,)) for n in range(trabajadores)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert len(ganadores) == 1
+    assert archivos(cola, 'pendientes') == []
+    assert archivos(cola, 'en_curso') == [os.path.basename(ganadores[0][0])]
+
+
+def test_cada_trabajo_se_reclama_una_sola_vez(cola):
+    ids = {cola.encolar({'url': f"https://youtu.be/{n:011d}"}) for n in range(40)}
+    reclamados = []
+    lock = threading.Lock()
+
+    def trabajar(numero):
+        while True:
+            reclamado = cola.reclamar(f"t{numero}")
+            if reclamado is None:
+                return
+            with lock:
+                reclamados.append(reclamado[1]['id'])
+
+    hilos = [threading.Thread(target=trabajar, args=(n,)) for n in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert sorted(reclamados) == sorted(ids)
+
+
+def test_terminar_guarda_el_resultado(cola):
+    cola.encolar({'url': 'https://youtu.be/aaaaaaaaaaa'})
+    cola.encolar({'url': 'https://youtu.be/bbbbbbbbbbb'})
+    ruta_ok, trabajo_ok = cola.reclamar('t1')
+    ruta_error, trabajo_error = cola.reclamar('t1')
+
+    assert cola.terminar(ruta_ok, trabajo_ok, {'exito': True})
+    assert cola.terminar(ruta_error, trabajo_error, {'exito': False, 'error': 'privado'})
+    assert cola.resumen() == {'pendientes': 0, 'en_curso': 0, 'terminados': 1, 'fallidos': 1}
+    assert archivos(cola, 'tmp') == []
+
+
+def test_devolver_vuelve_a_pendientes(cola):
+    id_trabajo = cola.encolar({'url': 'https://youtu.be/aaaaaaaaaaa'})
+    ruta, trabajo = cola.reclamar('t1')
+
+    assert cola.devolver(ruta, trabajo)
+    assert archivos(cola, 'pendientes') == [f"{id_trabajo}.json"]
+    assert cola.reclamar('t2')[1]['id'] == id_trabajo
+
+
+def test_trabajo_con_latido_no_se_recupera(cola):
+    cola.encolar({'url': 'https://youtu.be/aaaaaaaaaaa'})
+    ruta, _ = cola.reclamar('t1')
+
+    assert cola.latido(ruta)
+    assert cola.recuperar_caducados() == 0
+    assert cola.resumen()['en_curso'] == 1
+
+
+def test_trabajo_caducado_vuelve_a_la_cola(cola, monkeypatch):
+    id_trabajo = cola.encolar({'url': 'https://youtu.be/aaaaaaaaaaa'})
+    ruta, trabajo = cola.reclamar('t1')
+
+    # Con caducidad negativa cualquier latido ya ha caducado
+    monkeypatch.setitem(script.COLA_CARPETA, 'caducidad_s', -1)
+    assert cola.recuperar_caducados() == 1
+    assert archivos(cola, 'en_curso') == []
+    assert archivos(cola, 'tmp') == []
+
+    # El trabajador original ya no lo tiene: ni latido ni resultado
+    assert not cola.latido(ruta)
+    assert not cola.terminar(ruta, trabajo, {'exito': True})
+
+    ruta, trabajo = cola.reclamar('t2')
+    assert trabajo['id'] == id_trabajo
+    assert trabajo['recuperaciones'] == 1
+
+
+def test_recuperacion_sin_duplicados_entre_trabajadores(cola, monkeypatch):
+    cola.encolar({'url': 'https://youtu.be/aaaaaaaaaaa'})
+    cola.reclamar('t1')
+    monkeypatch.setitem(script.COLA_CARPETA, 'caducidad_s', -1)
+
+    barrera = threading.Barrier(8)
+    recuperados = []
+
+    def recuperar():
+        otra = ColaCarpeta(cola.carpeta)
+        barrera.wait()
+        recuperados.append(otra.recuperar_caducados())
+
+    hilos = [threading.Thread(target=recuperar) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert sum(recuperados) == 1
+    assert cola.resumen()['pendientes'] == 1
+
+
+def test_trabajo_abandonado_demasiadas_veces_falla(cola, monkeypatch):
+    id_trabajo = cola.encolar({'url': 'https://youtu.be/aaaaaaaaaaa'})
+    monkeypatch.setitem(script.COLA_CARPETA, 'caducidad_s', -1)
+
+    for _ in range(script.COLA_CARPETA['recuperaciones']):
+        assert cola.reclamar('t1') is not None
+        assert cola.recuperar_caducados() == 1
+
+    assert cola.reclamar('t1') is not None
+    assert cola.recuperar_caducados() == 0
+    assert archivos(cola, 'fallidos') == [f"{id_trabajo}.json"]
+    assert cola.resumen() == {'pendientes': 0, 'en_curso': 0, 'terminados': 0, 'fallidos': 1}
+
+
+def test_no_se_recupera_un_trabajo_ya_terminado(cola, monkeypatch):
+    # Un trabajador que se cae entre guardar el resultado y borrar su copia en tmp/
+    id_trabajo = cola.encolar({'url': 'https://youtu.be/aaaaaaaaaaa'})
+    ruta, trabajo = cola.reclamar('t1')
+    cola._escribir('terminados', f"{id_trabajo}.json", {**trabajo, 'resultado': {'exito': True}})
+    os.rename(ruta, os.path.join(cola.carpeta, 'tmp', os.path.basename(ruta)))
+
+    monkeypatch.setitem(script.COLA_CARPETA, 'caducidad_s', -1)
+    assert cola.recuperar_caducados() == 0
+    assert archivos(cola, 'tmp') == []
+    assert cola.resumen() == {'pendientes': 0, 'en_curso': 0, 'terminados': 1, 'fallidos': 0}
+
+
+def test_escrituras_a_medias_se_borran(cola, monkeypatch):
+    a_medias = os.path.join(cola.carpeta, 'tmp', 'abc.escribiendo')
+    with open(a_medias, 'w') as f:
+        f.write('{"url": ')
+
+    assert cola.recuperar_caducados() == 0
+    assert os.path.exists(a_medias)
+
+    monkeypatch.setitem(script.COLA_CARPETA, 'caducidad_s', -1)
+    assert cola.recuperar_caducados() == 0
+    assert not os.path.exists(a_medias)
@@ -0,0 +1,77 @@
+"""Pruebas del arranque: importación diferida de yt-dlp y caché del sondeo de dependencias"""
+
+import os
+import stat
+import subprocess
+import sys
+import types
+
+import pytest
+
+import script
+from script import sondear_capacidades
+
+
+def test_importar_el_script_no_carga_yt_dlp():
+    raiz = os.path.dirname(os.path.abspath(script.__file__))
+    salida = subprocess.run([sys.executable, '-c', "import sys, script; print('yt_dlp' in sys.modules)"],
+                            cwd=raiz, capture_output=True, text=True, check=True).stdout
+    assert salida.strip() == 'False'
+
+
+@pytest.fixture
+def ffmpeg_falso(tmp_path, monkeypatch):
+    """Un ffmpeg de mentira en el PATH que solo sabe decir su versión"""
+    carpeta = tmp_path / 'bin'
+    carpeta.mkdir()
+    ruta = carpeta / 'ffmpeg'
+    ruta.write_text('#!/bin/sh\necho "ffmpeg version 9.9-prueba"\n')
+    ruta.chmod(ruta.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv('PATH', str(carpeta))
+    monkeypatch.setattr(script, '_capacidades', None)
+    return ruta
+
+
+@pytest.mark.skipif(os.name == 'nt', reason="el ffmpeg falso es un script de shell")
+def test_el_sondeo_se_guarda_en_cache(ffmpeg_falso, monkeypatch):
+    sondeos = []
+    sondear = script.sondear_version_ffmpeg
+    monkeypatch.setattr(script, 'sondear_version_ffmpeg', lambda ruta: sondeos.append(ruta) or sondear(ruta))
+
+    assert sondear_capacidades()['ffmpeg']['version'] == '9.9-prueba'
+    assert not script.tiempos_arranque['sondeo_desde_cache']
+
+    # Otro arranque: la versión sale de la caché en disco sin ejecutar ffmpeg
+    monkeypatch.setattr(script, '_capacidades', None)
+    assert sondear_capacidades()['ffmpeg']['version'] == '9.9-prueba'
+    assert len(sondeos) == 1
+    assert os.path.exists(os.path.join(script.carpeta_cache(), 'capacidades.json'))
+
+    # Si el binario cambia se vuelve a sondear
+    with open(ffmpeg_falso, 'a') as f:
+        f.write('# actualizado\n')
+    monkeypatch.setattr(script, '_capacidades', None)
+    sondear_capacidades()
+    assert len(sondeos) == 2
+
+
+def test_sin_ffmpeg(tmp_path, monkeypatch):
+    monkeypatch.setenv('PATH', str(tmp_path))
+    monkeypatch.setattr(script, '_capacidades', None)
+    assert sondear_capacidades()['ffmpeg'] == {'ruta': None, 'firma': None, 'version': None}
+
+
+def test_en_el_ejecutable_la_version_no_se_lee_del_binario(tmp_path, monkeypatch):
+    binario = tmp_path / 'avdownloader'
+    binario.write_bytes(b'\x7fELF\xff\xfe__version__ = "0.0"')
+    yt_dlp = types.ModuleType('yt_dlp')
+    yt_dlp.version = types.ModuleType('yt_dlp.version')
+    yt_dlp.version.__version__ = '2099.01.01'
+    monkeypatch.setitem(sys.modules, 'yt_dlp', yt_dlp)
+    monkeypatch.setitem(sys.modules, 'yt_dlp.version', yt_dlp.version)
+    monkeypatch.setattr(sys, 'frozen', True, raising=False)
+    monkeypatch.setattr(sys, 'executable', str(binario))
+
+    ruta, firma = script.localizar_yt_dlp()
+    assert ruta == str(binario) and firma is not None
+    assert script.sondear_version_yt_dlp(ruta) == '2099.01.01'
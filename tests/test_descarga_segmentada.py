@@ -0,0 +1,117 @@
+"""Pruebas de la descarga HTTP en varios rangos simultáneos con reanudación"""
+
+import json
+import os
+import threading
+
+import pytest
+
+import script
+from script import DESCARGA_SEGMENTADA, admite_descarga_segmentada
+
+TAMANO = 2 * 1024 * 1024
+
+
+@pytest.fixture
+def archivo(servidor):
+    """Archivo de bytes aleatorios servido como video"""
+    datos = os.urandom(TAMANO)
+    with open(os.path.join(servidor.carpeta, 'video.mp4'), 'wb') as f:
+        f.write(datos)
+    return datos
+
+
+@pytest.fixture
+def segmentada(monkeypatch):
+    monkeypatch.setitem(DESCARGA_SEGMENTADA, 'umbral', 256 * 1024)
+    monkeypatch.setitem(DESCARGA_SEGMENTADA, 'bloque', 64 * 1024)
+    monkeypatch.setitem(script.PUBLICACION, 'buffer', 64 * 1024)
+
+
+def descargar(yt_dlp, url, carpeta, hook=None):
+    opciones = {'outtmpl': os.path.join(carpeta, 'video.%(ext)s'), 'quiet': True, 'noprogress': True}
+    ydl = script.clase_youtube_dl()(opciones)
+    if hook:
+        ydl.add_progress_hook(hook)
+    try:
+        ydl.download([url])
+    finally:
+        ydl.close()
+    return os.path.join(carpeta, 'video.mp4')
+
+
+def test_que_formatos_se_segmentan(segmentada):
+    formato = {'url': 'https://x/v.mp4', 'protocol': 'https', 'filesize': TAMANO}
+    assert admite_descarga_segmentada(formato, 'v.mp4')
+    assert not admite_descarga_segmentada({**formato, 'filesize': 1024}, 'v.mp4')
+    assert not admite_descarga_segmentada({**formato, 'protocol': 'm3u8_native'}, 'v.mp4')
+    assert not admite_descarga_segmentada({**formato, 'fragments': [{}]}, 'v.mp4')
+    assert not admite_descarga_segmentada({**formato, 'section_start': 10}, 'v.mp4')
+    assert not admite_descarga_segmentada(formato, '-')
+
+
+def test_descarga_en_varios_rangos(tmp_path, servidor, archivo, segmentada, yt_dlp):
+    ruta = descargar(yt_dlp, servidor.url('video.mp4'), str(tmp_path / 'destino'))
+    with open(ruta, 'rb') as f:
+        assert f.read() == archivo
+    # Petición de prueba más al menos una por segmento
+    assert servidor.peticiones['video.mp4'] >= DESCARGA_SEGMENTADA['segmentos'] + 1
+    assert sorted(os.listdir(tmp_path / 'destino')) == ['video.mp4']
+
+
+def test_se_reanuda_desde_donde_se_quedo(tmp_path, servidor, archivo, segmentada, yt_dlp):
+    carpeta = tmp_path / 'destino'
+    carpeta.mkdir()
+    temporal = str(carpeta / 'video.mp4.part')
+    tamano_segmento = TAMANO // DESCARGA_SEGMENTADA['segmentos']
+    segmentos = []
+    with open(temporal, 'wb') as f:
+        f.truncate(TAMANO)
+        for inicio in range(0, TAMANO, tamano_segmento):
+            hecho = tamano_segmento // 2
+            f.seek(inicio)
+            f.write(archivo[inicio:inicio + hecho])
+            segmentos.append([inicio, inicio + tamano_segmento - 1, hecho])
+    with open(temporal + '.segmentos', 'w', encoding='utf-8') as f:
+        json.dump({'total': TAMANO, 'segmentos': segmentos}, f)
+
+    ruta = descargar(yt_dlp, servidor.url('video.mp4'), str(carpeta))
+    with open(ruta, 'rb') as f:
+        assert f.read() == archivo
+    # Solo se piden los rangos que faltaban (además de la petición de prueba)
+    pedidos = [(inicio, fin) for nombre, inicio, fin in servidor.rangos if (inicio, fin) != (0, 0)]
+    assert pedidos
+    for inicio, fin in pedidos:
+        assert any(s[0] + s[2] <= inicio <= fin <= s[1] for s in segmentos)
+    assert os.listdir(carpeta) == ['video.mp4']
+
+
+def test_cancelar_detiene_los_segmentos_y_guarda_el_estado(tmp_path, servidor, archivo, segmentada, yt_dlp):
+    servidor.pausa = lambda: threading.Event().wait(0.1)
+    carpeta = str(tmp_path / 'destino')
+
+    class Cancelada(Exception):
+        pass
+
+    def cancelar(d):
+        if d['status'] == 'downloading' and d.get('downloaded_bytes'):
+            raise Cancelada()
+
+    with pytest.raises(Exception):
+        descargar(yt_dlp, servidor.url('video.mp4'), carpeta, cancelar)
+    assert not [hilo for hilo in threading.enumerate() if 'descargar_segmento' in hilo.name]
+
+    with open(os.path.join(carpeta, 'video.mp4.part.segmentos'), encoding='utf-8') as f:
+        estado = json.load(f)
+    hecho = sum(segmento[2] for segmento in estado['segmentos'])
+    assert 0 < hecho < TAMANO
+
+    # Sin más peticiones después de cancelar
+    peticiones = servidor.peticiones['video.mp4']
+    threading.Event().wait(0.3)
+    assert servidor.peticiones['video.mp4'] == peticiones
+
+    servidor.pausa = None
+    ruta = descargar(yt_dlp, servidor.url('video.mp4'), carpeta)
+    with open(ruta, 'rb') as f:
+        assert f.read() == archivo
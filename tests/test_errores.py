@@ -0,0 +1,107 @@
+"""Pruebas de la clasificación de errores y de los reintentos de descargar_con_info"""
+
+import pytest
+
+import script
+from script import (ErrorDesconocido, ErrorLimiteTasa, ErrorPermanente, ErrorTransitorio,
+                    clasificar_error)
+
+
+class ErrorHttp(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP Error {status}")
+        self.status = status
+
+
+@pytest.mark.parametrize('mensaje, clase, motivo', [
+    ('ERROR: HTTP Error 429: Too Many Requests', ErrorLimiteTasa, 'limite'),
+    ('ERROR: [youtube] x: Private video. Sign in if you have access', ErrorPermanente, 'privado'),
+    ('ERROR: [youtube] x: Video unavailable. This video has been removed', ErrorPermanente, 'no_disponible'),
+    ('ERROR: The uploader has not made this video available in your country', ErrorPermanente, 'region'),
+    ('ERROR: Sign in to confirm your age', ErrorPermanente, 'edad'),
+    ('ERROR: Did not get any data blocks', ErrorTransitorio, 'red'),
+    ('ERROR: Incomplete data received', ErrorTransitorio, 'red'),
+    ('ERROR: Read timed out', ErrorTransitorio, 'red'),
+])
+def test_motivos_por_mensaje(mensaje, clase, motivo):
+    error = clasificar_error(Exception(mensaje))
+    assert type(error) is clase
+    assert error.motivo == motivo
+
+
+def test_estado_http_de_la_causa():
+    try:
+        try:
+            raise ErrorHttp(503)
+        except ErrorHttp as causa:
+            raise RuntimeError("ERROR: unable to download video data") from causa
+    except RuntimeError as e:
+        error = clasificar_error(e)
+    assert isinstance(error, ErrorTransitorio)
+    assert error.estado_http == 503
+
+
+def test_403_solo_se_reintenta_al_descargar():
+    assert isinstance(clasificar_error(ErrorHttp(403)), ErrorPermanente)
+    assert isinstance(clasificar_error(ErrorHttp(403), 'extraccion'), ErrorPermanente)
+
+    error = clasificar_error(ErrorHttp(403), 'descarga')
+    assert isinstance(error, ErrorTransitorio)
+    assert (error.motivo, error.intentos) == ('acceso', 1)
+
+
+def test_error_desconocido_se_reintenta_una_vez():
+    error = clasificar_error(RuntimeError("algo raro"))
+    assert isinstance(error, ErrorDesconocido)
+    assert error.transitorio
+    assert error.intentos == 1
+
+
+def test_un_error_ya_clasificado_no_cambia():
+    error = ErrorPermanente("privado", 'privado')
+    assert clasificar_error(error) is error
+
+
+@pytest.fixture
+def reintentos(monkeypatch):
+    monkeypatch.setattr(script, 'espera_reintento', lambda intento: 0)
+    monkeypatch.setitem(script.REINTENTOS, 'intentos', 3)
+    llamadas = []
+
+    def descargar(error, en_descarga=True):
+        def falla(url, perfil, *args):
+            metricas = args[-1]
+            llamadas.append(url)
+            if en_descarga:
+                metricas.iniciar_descarga()
+            raise error
+        monkeypatch.setattr(script, '_descargar_con_info', falla)
+        with pytest.raises(script.ErrorDescarga) as info:
+            script.descargar_con_info('https://youtu.be/aaaaaaaaaaa', 'youtube-video', None, None, True)
+        return info.value
+
+    return descargar, llamadas
+
+
+def test_reintentos_de_errores_transitorios(reintentos):
+    descargar, llamadas = reintentos
+    error = descargar(Exception("Connection reset by peer"))
+    assert error.motivo == 'red'
+    assert len(llamadas) == 4
+
+
+def test_errores_permanentes_no_se_reintentan(reintentos):
+    descargar, llamadas = reintentos
+    descargar(Exception("Private video"))
+    assert len(llamadas) == 1
+
+
+def test_403_al_descargar_se_reintenta_una_vez(reintentos):
+    descargar, llamadas = reintentos
+    error = descargar(ErrorHttp(403))
+    assert error.motivo == 'acceso'
+    assert len(llamadas) == 2
+
+    del llamadas[:]
+    descargar(ErrorHttp(403), en_descarga=False)
+    assert len(llamadas) == 1
@@ -0,0 +1,70 @@
+"""Pruebas de las etapas de descarga y conversión del lote con pools separados"""
+
+import threading
+import time
+
+import script
+from script import ejecutar_lote
+
+
+def lote(cantidad):
+    return [{'url': f'https://youtu.be/{n:011d}', 'tipo': 'audio_mp3', 'calidad': None, 'nombre': None}
+            for n in range(cantidad)]
+
+
+def etapas_simuladas(monkeypatch, conversion=0.05, fallar=()):
+    """Descargas instantáneas que dejan la conversión pendiente y conversiones lentas"""
+    estado = {'descargas': [], 'conversiones': [], 'activas': 0, 'maximo': 0, 'diferidas': []}
+    lock = threading.Lock()
+
+    def descargar(url, carpeta_destino, nombre, informe=None, diferir_transcodificacion=False, **_):
+        estado['diferidas'].append(diferir_transcodificacion)
+        with lock:
+            estado['descargas'].append(time.monotonic())
+        if diferir_transcodificacion:
+            informe['transcodificacion'] = {'url': url}
+        return True
+
+    def convertir(pendiente):
+        with lock:
+            estado['activas'] += 1
+            estado['maximo'] = max(estado['maximo'], estado['activas'])
+        time.sleep(conversion)
+        with lock:
+            estado['activas'] -= 1
+            estado['conversiones'].append(time.monotonic())
+        if pendiente['url'] in fallar:
+            raise RuntimeError('ffmpeg falló')
+        return {'ruta': pendiente['url'] + '.mp3'}
+
+    monkeypatch.setattr(script, 'descargar_video_universal', descargar)
+    monkeypatch.setattr(script, 'completar_transcodificacion', convertir)
+    return estado
+
+
+def test_las_descargas_no_esperan_a_la_conversion(tmp_path, monkeypatch):
+    estado = etapas_simuladas(monkeypatch)
+    resultados = ejecutar_lote(lote(8), str(tmp_path), trabajadores=2, transcodificadores=2)
+
+    assert all(estado['diferidas'])
+    assert estado['maximo'] == 2
+    # La cola acotada deja que las descargas se adelanten a las conversiones
+    assert sorted(estado['descargas'])[3] < sorted(estado['conversiones'])[0]
+    assert all(r['exito'] and r['ruta'].endswith('.mp3') for r in resultados)
+    assert all('transcodificacion' not in r and r['transcodificacion_s'] > 0 for r in resultados)
+
+
+def test_sin_pool_de_conversion_no_se_difiere(tmp_path, monkeypatch):
+    estado = etapas_simuladas(monkeypatch)
+    resultados = ejecutar_lote(lote(3), str(tmp_path), trabajadores=2, transcodificadores=0)
+    assert estado['diferidas'] == [False] * 3
+    assert estado['conversiones'] == []
+    assert all(r['exito'] for r in resultados)
+
+
+def test_un_fallo_al_convertir_marca_el_trabajo(tmp_path, monkeypatch):
+    trabajos = lote(3)
+    etapas_simuladas(monkeypatch, conversion=0, fallar={trabajos[1]['url']})
+    resultados = ejecutar_lote(trabajos, str(tmp_path), trabajadores=1, transcodificadores=1)
+    assert [r['exito'] for r in resultados] == [True, False, True]
+    assert resultados[1]['error'] == 'ffmpeg falló'
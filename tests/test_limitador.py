@@ -0,0 +1,109 @@
+"""Pruebas de la cubeta de tokens y la concurrencia AIMD de ControladorPlataforma"""
+
+import threading
+import time
+
+import pytest
+
+from script import ControladorPlataforma
+
+
+def controlador(tasa=1000.0, rafaga=100, concurrencia=8):
+    return ControladorPlataforma('youtube', tasa=tasa, tasa_min=1.0, tasa_max=2000.0,
+                                 rafaga=rafaga, concurrencia=concurrencia)
+
+
+def correctas(controlador, veces):
+    for _ in range(veces):
+        with controlador.permiso():
+            pass
+
+
+def limitada(controlador):
+    with pytest.raises(RuntimeError):
+        with controlador.permiso():
+            raise RuntimeError('HTTP Error 429: Too Many Requests')
+
+
+def test_limitacion_reduce_a_la_mitad():
+    c = controlador()
+    limitada(c)
+    assert c.limitaciones == 1
+    assert c.tasa == pytest.approx(500.0)
+    assert c.concurrencia == 4
+    assert c.activos == 0
+
+
+def test_concurrencia_sube_de_uno_en_uno_por_ventana():
+    c = controlador()
+    limitada(c)
+    limitada(c)
+    assert c.concurrencia == 2
+
+    # Hacen falta tantas respuestas correctas como el límite actual para subir uno
+    correctas(c, 1)
+    assert c.concurrencia == 2
+    correctas(c, 1)
+    assert c.concurrencia == 3
+    correctas(c, 2)
+    assert c.concurrencia == 3
+    correctas(c, 1)
+    assert c.concurrencia == 4
+    assert isinstance(c.concurrencia, int)
+
+
+def test_concurrencia_no_pasa_del_maximo():
+    c = controlador(concurrencia=2)
+    correctas(c, 20)
+    assert c.concurrencia == 2
+    assert c.tasa == pytest.approx(1002.0)
+
+
+def test_limitacion_reinicia_la_ventana():
+    c = controlador()
+    limitada(c)
+    correctas(c, 3)
+    limitada(c)
+    assert c.concurrencia == 2
+    correctas(c, 1)
+    assert c.concurrencia == 2
+
+
+def test_errores_sin_limitacion_no_reducen():
+    c = controlador()
+    with pytest.raises(ValueError):
+        with c.permiso():
+            raise ValueError('otra cosa')
+    assert c.limitaciones == 0
+    assert c.concurrencia == 8
+
+
+def test_concurrencia_limita_los_permisos_simultaneos():
+    c = controlador(concurrencia=2)
+    dentro = []
+    maximo = []
+    lock = threading.Lock()
+
+    def trabajar():
+        with c.permiso():
+            with lock:
+                dentro.append(1)
+                maximo.append(len(dentro))
+            time.sleep(0.05)
+            with lock:
+                dentro.pop()
+
+    hilos = [threading.Thread(target=trabajar) for _ in range(6)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert max(maximo) == 2
+
+
+def test_la_cubeta_espacia_las_peticiones():
+    c = controlador(tasa=20.0, rafaga=1)
+    inicio = time.monotonic()
+    correctas(c, 3)
+    # La primera sale de la ráfaga y las dos siguientes esperan 1/20 s cada una
+    assert time.monotonic() - inicio >= 0.09
@@ -0,0 +1,101 @@
+"""Pruebas de la enumeración plana de listas y canales con marca de sincronización"""
+
+import pytest
+
+import script
+from script import ArchivoDescargas, registrar_sincronizacion, trabajos_de_fuente, url_de_entrada
+from conftest import YoutubeDLFalso
+
+CANAL = 'https://www.youtube.com/@canal'
+LISTA = 'https://www.youtube.com/playlist?list=PL123'
+
+
+def entrada(numero):
+    return {'_type': 'url', 'ie_key': 'Youtube', 'id': f'{numero:011d}', 'url': f'{numero:011d}',
+            'title': f'Video {numero}'}
+
+
+class YoutubeDLListas(YoutubeDLFalso):
+    """Devuelve listas planas cuyas entradas se generan a medida que se piden"""
+
+    listas = {}
+    pedidas = []
+
+    def extract_info(self, url, download=True, process=True, ie_key=None):
+        if url not in self.listas:
+            return {'_type': 'video', 'id': 'abc'}
+
+        def entradas():
+            for elemento in self.listas[url]:
+                YoutubeDLListas.pedidas.append(elemento.get('id'))
+                yield elemento
+
+        return {'_type': 'playlist', 'title': url, 'entries': entradas()}
+
+
+@pytest.fixture
+def listas(youtube_dl_falso, sin_limites, tmp_path, monkeypatch):
+    monkeypatch.setattr(script, 'clase_youtube_dl', lambda: YoutubeDLListas)
+    YoutubeDLListas.listas = {}
+    YoutubeDLListas.pedidas = []
+    archivo = ArchivoDescargas(str(tmp_path / 'archivo.sqlite3'))
+    monkeypatch.setattr(script, 'archivo_descargas', archivo)
+    yield YoutubeDLListas.listas
+    archivo.cerrar()
+
+
+def test_la_enumeracion_es_perezosa(listas):
+    listas[LISTA] = [entrada(n) for n in range(100)]
+    trabajos = trabajos_de_fuente(LISTA, tipo='video')
+    primeros = [next(trabajos) for _ in range(3)]
+
+    assert [t['url'] for t in primeros] == [f'https://www.youtube.com/watch?v={n:011d}' for n in range(3)]
+    assert primeros[0]['nombre'] == 'Video 0 [00000000000]'
+    assert (primeros[0]['fuente'], primeros[0]['id_fuente']) == (LISTA, '00000000000')
+    assert len(YoutubeDLListas.pedidas) == 3
+
+
+def test_un_video_suelto_es_un_solo_trabajo(listas):
+    assert list(trabajos_de_fuente('https://youtu.be/aaaaaaaaaaa', tipo='video')) == [
+        {'url': 'https://youtu.be/aaaaaaaaaaa', 'tipo': 'video', 'calidad': None, 'nombre': None, 'tramos': None}]
+
+
+def test_se_saltan_las_entradas_ya_sincronizadas(listas):
+    listas[LISTA] = [entrada(n) for n in range(5)]
+    for trabajo in list(trabajos_de_fuente(LISTA))[:3]:
+        registrar_sincronizacion({**trabajo, 'exito': True})
+    # Un fallo no cuenta como sincronizado
+    registrar_sincronizacion({'fuente': LISTA, 'id_fuente': f'{4:011d}', 'exito': False})
+
+    assert [t['id_fuente'] for t in trabajos_de_fuente(LISTA)] == [f'{3:011d}', f'{4:011d}']
+
+
+def test_los_canales_paran_en_la_marca(listas, monkeypatch):
+    monkeypatch.setattr(script, 'MARCA_CONSECUTIVOS', 3)
+    listas[CANAL] = [entrada(n) for n in range(50)]
+    for n in range(10, 50):
+        script.archivo_descargas.registrar_sincronizado(CANAL, f'{n:011d}')
+    # En una lista las entradas no van por fecha: se recorre entera
+    listas[LISTA] = list(listas[CANAL])
+    for n in range(10, 50):
+        script.archivo_descargas.registrar_sincronizado(LISTA, f'{n:011d}')
+
+    assert len(list(trabajos_de_fuente(CANAL))) == 10
+    assert len(YoutubeDLListas.pedidas) == 13
+    assert len(list(trabajos_de_fuente(LISTA))) == 10
+    assert len(YoutubeDLListas.pedidas) == 63
+
+
+def test_las_pestanas_del_canal_se_recorren(listas):
+    listas[CANAL] = [{'_type': 'url', 'ie_key': 'YoutubeTab', 'url': CANAL + '/videos'},
+                     {'_type': 'url', 'ie_key': 'YoutubeTab', 'url': CANAL + '/shorts'}]
+    listas[CANAL + '/videos'] = [entrada(1), entrada(2)]
+    listas[CANAL + '/shorts'] = [entrada(3)]
+    assert [t['id_fuente'] for t in trabajos_de_fuente(CANAL)] == [f'{n:011d}' for n in (1, 2, 3)]
+
+
+def test_url_de_entrada():
+    assert url_de_entrada({'url': 'https://www.facebook.com/watch/?v=1'}) == 'https://www.facebook.com/watch/?v=1'
+    assert url_de_entrada({'ie_key': 'Youtube', 'id': 'aaaaaaaaaaa', 'url': 'aaaaaaaaaaa'}) == \
+        'https://www.youtube.com/watch?v=aaaaaaaaaaa'
+    assert url_de_entrada({}) is None
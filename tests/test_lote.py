@@ -0,0 +1,74 @@
+"""Pruebas del modo por lotes: lectura del archivo y pool de descargas"""
+
+import json
+import threading
+import time
+
+import script
+from script import ejecutar_lote, leer_trabajos_lote
+
+
+def test_leer_trabajos_lote(tmp_path):
+    ruta = tmp_path / 'urls.txt'
+    ruta.write_text('\ufeff# comentario\n'
+                    '\n'
+                    'https://youtu.be/aaaaaaaaaaa\n'
+                    'https://youtu.be/bbbbbbbbbbb, audio_mp3 ,2\n'
+                    'https://www.facebook.com/watch?v=1\tvideo\t\tmi video\n'
+                    'https://youtu.be/ccccccccccc,video,1,"uno, dos"\n', encoding='utf-8')
+
+    trabajos = leer_trabajos_lote(str(ruta))
+    assert [t['linea'] for t in trabajos] == [3, 4, 5, 6]
+    assert trabajos[0]['url'] == 'https://youtu.be/aaaaaaaaaaa'
+    assert (trabajos[0]['tipo'], trabajos[0]['calidad'], trabajos[0]['nombre']) == (None, None, None)
+    assert (trabajos[1]['tipo'], trabajos[1]['calidad']) == ('audio_mp3', '2')
+    assert (trabajos[2]['tipo'], trabajos[2]['nombre']) == ('video', 'mi video')
+    assert trabajos[3]['nombre'] == 'uno, dos'
+
+
+def descargas_simuladas(monkeypatch, duracion=0.02, fallar=()):
+    """Sustituye la descarga por una espera que cuenta cuántas hay a la vez"""
+    estado = {'activas': 0, 'maximo': 0, 'nombres': []}
+    lock = threading.Lock()
+
+    def descargar(url, carpeta_destino, nombre, informe=None, **_):
+        with lock:
+            estado['activas'] += 1
+            estado['maximo'] = max(estado['maximo'], estado['activas'])
+            estado['nombres'].append(nombre)
+        time.sleep(duracion)
+        with lock:
+            estado['activas'] -= 1
+        if url in fallar:
+            raise RuntimeError('falló')
+        return True
+
+    monkeypatch.setattr(script, 'descargar_video_universal', descargar)
+    return estado
+
+
+def trabajos(cantidad):
+    return [{'url': f'https://youtu.be/{n:011d}', 'tipo': None, 'calidad': None, 'nombre': None}
+            for n in range(cantidad)]
+
+
+def test_el_pool_limita_las_descargas_simultaneas(tmp_path, monkeypatch):
+    estado = descargas_simuladas(monkeypatch)
+    resultados = ejecutar_lote(trabajos(12), str(tmp_path), trabajadores=3)
+
+    assert estado['maximo'] == 3
+    assert [r['indice'] for r in resultados] == list(range(1, 13))
+    assert all(r['exito'] for r in resultados)
+    assert resultados[0]['nombre'] == 'video_youtube_00001'
+
+
+def test_los_fallos_quedan_en_el_informe(tmp_path, monkeypatch):
+    lote = trabajos(3)
+    descargas_simuladas(monkeypatch, fallar={lote[1]['url']})
+    informe = tmp_path / 'informe.jsonl'
+    resultados = ejecutar_lote(lote, str(tmp_path / 'destino'), trabajadores=2, ruta_informe=str(informe))
+
+    assert [r['exito'] for r in resultados] == [True, False, True]
+    assert resultados[1]['error'] == 'falló'
+    lineas = [json.loads(linea) for linea in informe.read_text(encoding='utf-8').splitlines()]
+    assert sorted(linea['indice'] for linea in lineas) == [1, 2, 3]
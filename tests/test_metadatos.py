@@ -0,0 +1,56 @@
+"""Pruebas de los metadatos de video comunes a todas las plataformas"""
+
+import pytest
+
+import script
+from script import MetadatosVideo, formatear_duracion, obtener_metadatos
+
+
+def test_desde_info():
+    metadatos = MetadatosVideo.desde_info({
+        'id': 'abc', 'title': 'Título', 'channel': 'Canal', 'duration': 125.7,
+        'view_count': '1234567', 'like_count': None, 'description': 'x' * 500,
+        'formats': [{'format_id': '18'}]}, 'youtube')
+
+    assert (metadatos.titulo, metadatos.autor, metadatos.duracion) == ('Título', 'Canal', '2:05')
+    assert metadatos.vistas == 1234567
+    assert metadatos.vistas_texto == '1,234,567'
+    assert metadatos.likes_texto is None
+    assert metadatos.descripcion == 'x' * 100 + '...'
+    assert metadatos.nombre_plataforma == 'YouTube'
+    # Solo se guarda lo justo de la descripción y ningún otro campo
+    assert len(metadatos._descripcion) == 101
+    with pytest.raises(AttributeError):
+        metadatos.formats = []
+
+
+def test_valores_por_defecto():
+    metadatos = MetadatosVideo.desde_info({'duration': 'desconocida'}, 'instagram')
+    assert metadatos.como_dict() == {
+        'plataforma': 'instagram', 'id_video': None, 'titulo': 'Post de Instagram',
+        'autor': 'Usuario de Instagram', 'duracion_s': None, 'vistas': None, 'likes': None,
+        'descripcion': 'Sin descripción'}
+    assert metadatos.duracion == 'N/A'
+
+
+def test_formatear_duracion():
+    assert formatear_duracion(0) == 'N/A'
+    assert formatear_duracion(59) == '0:59'
+    assert formatear_duracion(3725) == '62:05'
+
+
+def test_obtener_metadatos_sin_informacion(monkeypatch, capsys):
+    def fallar(url):
+        raise RuntimeError('sin red')
+
+    monkeypatch.setattr(script, 'extraer_info', fallar)
+    metadatos = obtener_metadatos('https://www.facebook.com/watch?v=1')
+    assert metadatos.titulo == 'Video de Facebook'
+    assert metadatos.descripcion == 'Información no disponible'
+    assert 'Error al obtener información de Facebook: sin red' in capsys.readouterr().out
+
+
+def test_obtener_metadatos(monkeypatch):
+    monkeypatch.setattr(script, 'extraer_info', lambda url: {'id': 'C1', 'uploader': 'autor'})
+    metadatos = obtener_metadatos('https://www.instagram.com/p/C1/')
+    assert (metadatos.plataforma, metadatos.id_video, metadatos.autor) == ('instagram', 'C1', 'autor')
@@ -0,0 +1,80 @@
+"""Pruebas de las métricas por descarga y su exportación a JSONL y Prometheus"""
+
+import json
+import os
+
+import pytest
+
+import script
+from script import MetricasDescarga, RegistroMetricas
+
+
+@pytest.fixture
+def registro(tmp_path, monkeypatch):
+    registro = RegistroMetricas(str(tmp_path / 'metricas.jsonl'), str(tmp_path / 'avdownloader.prom'))
+    monkeypatch.setattr(script, 'registro_metricas', registro)
+    return registro
+
+
+def test_los_hooks_alimentan_las_metricas():
+    metricas = MetricasDescarga('https://youtu.be/aaaaaaaaaaa', 'youtube', 'youtube-video')
+    # Video y audio llegan a la vez desde hilos distintos
+    metricas.hook_progreso({'status': 'downloading', 'filename': 'v.mp4', 'downloaded_bytes': 0,
+                            'total_bytes': 1000})
+    metricas.hook_progreso({'status': 'downloading', 'filename': 'a.m4a', 'downloaded_bytes': 100,
+                            'total_bytes_estimate': 500})
+    metricas.hook_progreso({'status': 'downloading', 'filename': 'v.mp4', 'downloaded_bytes': 400})
+    assert metricas.bytes == 500
+    assert metricas.total_estimado == 1500
+    assert metricas.primer_byte_s is not None
+    assert metricas.descarga_s is None
+
+    metricas.hook_progreso({'status': 'finished', 'filename': 'v.mp4', 'total_bytes': 1000})
+    metricas.hook_progreso({'status': 'finished', 'filename': 'a.m4a', 'downloaded_bytes': 500})
+    assert metricas.bytes == 1500
+    assert metricas.descarga_s is not None
+
+    metricas.hook_postproceso({'status': 'started', 'postprocessor': 'Merger'})
+    metricas.hook_postproceso({'status': 'finished', 'postprocessor': 'Merger'})
+    metricas.anotar_reintento()
+    metricas.anotar_reintento(fragmento=True)
+    datos = metricas.como_dict()
+    assert (datos['reintentos'], datos['reintentos_fragmento']) == (1, 1)
+    assert datos['postproceso_s'] >= 0
+
+
+def test_patron_de_reintentos():
+    assert script.PATRON_REINTENTO.search('[download] Got error: x. Retrying (1/10)...')
+    assert script.PATRON_REINTENTO.search('Retrying fragment 3 (2/10)...').group(1)
+
+
+def test_se_exportan_jsonl_y_prometheus(registro, tmp_path):
+    correcta = MetricasDescarga('https://youtu.be/aaaaaaaaaaa', 'youtube', 'youtube-video')
+    correcta.hook_progreso({'status': 'downloading', 'filename': 'v.mp4', 'downloaded_bytes': 10})
+    correcta.hook_progreso({'status': 'finished', 'filename': 'v.mp4', 'total_bytes': 2048})
+    correcta.terminar('ok')
+    fallida = MetricasDescarga('https://youtu.be/bbbbbbbbbbb', 'youtube', 'youtube-video')
+    fallida.terminar(error=script.ErrorPermanente('Private video', 'privado'))
+
+    lineas = [json.loads(linea) for linea in (tmp_path / 'metricas.jsonl').read_text(encoding='utf-8').splitlines()]
+    assert [linea['resultado'] for linea in lineas] == ['ok', 'error']
+    assert lineas[0]['bytes'] == 2048
+    assert lineas[1]['motivo_error'] == 'privado'
+
+    texto = (tmp_path / 'avdownloader.prom').read_text(encoding='utf-8')
+    assert 'avdownloader_descargas_total{plataforma="youtube",resultado="ok"} 1' in texto
+    assert 'avdownloader_descargas_total{plataforma="youtube",resultado="error"} 1' in texto
+    assert 'avdownloader_bytes_total{plataforma="youtube"} 2048' in texto
+    assert '# TYPE avdownloader_extraccion_segundos summary' in texto
+    # La escritura atómica no deja temporales
+    assert sorted(os.listdir(tmp_path)) == ['avdownloader.prom', 'metricas.jsonl']
+
+
+def test_velocidad_reciente(registro):
+    assert registro.velocidad_reciente('youtube') is None
+    for velocidad in (1000, 2000):
+        metricas = MetricasDescarga('https://youtu.be/aaaaaaaaaaa', 'youtube', 'youtube-video')
+        metricas._inicio_descarga, metricas._fin_descarga = 0.0, 1.0
+        metricas._bytes_archivo['v.mp4'] = velocidad
+        metricas.terminar('ok')
+    assert registro.velocidad_reciente('youtube') == pytest.approx(0.7 * 1000 + 0.3 * 2000)
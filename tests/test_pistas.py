@@ -0,0 +1,102 @@
+"""Pruebas de la descarga en paralelo de las pistas separadas (DASH)"""
+
+import os
+import subprocess
+import threading
+import time
+
+import pytest
+
+import script
+from script import POLITICA_FORMATOS, descargar_pistas_en_paralelo, elegir_formato
+from conftest import generar_medio
+
+
+class YoutubeDLPistas:
+    """Solo el _descargar que usa descargar_pistas_en_paralelo, con tiempos"""
+
+    def __init__(self, duracion=0.05, fallar=()):
+        self.duracion = duracion
+        self.fallar = fallar
+        self.tiempos = {}
+
+    def _descargar(self, nombre, info):
+        inicio = time.monotonic()
+        time.sleep(self.duracion)
+        self.tiempos[nombre] = (inicio, time.monotonic(), threading.current_thread().name)
+        if nombre in self.fallar:
+            raise RuntimeError(f"falló {nombre}")
+        return True, True
+
+
+def test_las_pistas_se_descargan_a_la_vez():
+    ydl = YoutubeDLPistas()
+    pistas = {'pendientes': 2, 'hilos': []}
+    # La primera vuelve en el acto; la segunda espera a la primera
+    assert descargar_pistas_en_paralelo(ydl, pistas, 'video', {}) == (True, True)
+    assert 'video' not in ydl.tiempos
+    assert descargar_pistas_en_paralelo(ydl, pistas, 'audio', {}) == (True, True)
+
+    (inicio_video, fin_video, hilo_video), (inicio_audio, fin_audio, hilo_audio) = (
+        ydl.tiempos['video'], ydl.tiempos['audio'])
+    assert max(inicio_video, inicio_audio) < min(fin_video, fin_audio)
+    assert hilo_audio == threading.current_thread().name != hilo_video
+
+
+def test_el_error_de_una_pista_llega_al_bucle():
+    ydl = YoutubeDLPistas(fallar={'video'})
+    pistas = {'pendientes': 2, 'hilos': []}
+    descargar_pistas_en_paralelo(ydl, pistas, 'video', {})
+    with pytest.raises(RuntimeError, match='falló video'):
+        descargar_pistas_en_paralelo(ydl, pistas, 'audio', {})
+
+
+def test_politica_con_pistas_separadas():
+    info = {'duration': 100, 'formats': [
+        {'format_id': '18', 'url': 'x', 'height': 360, 'vcodec': 'avc1', 'acodec': 'mp4a', 'tbr': 500},
+        {'format_id': '137', 'url': 'x', 'height': 1080, 'vcodec': 'avc1', 'acodec': 'none', 'tbr': 4000},
+        {'format_id': '140', 'url': 'x', 'vcodec': 'none', 'acodec': 'mp4a', 'abr': 128},
+    ]}
+    assert elegir_formato(info, 'video', politica=POLITICA_FORMATOS) == '18'
+    assert elegir_formato(info, 'video', politica={**POLITICA_FORMATOS, 'pistas_separadas': True}) == '137+140'
+
+
+def test_descarga_y_union_de_pistas(tmp_path, servidor, yt_dlp, ffmpeg, sin_limites, monkeypatch):
+    medios = tmp_path / 'medios'
+    medios.mkdir()
+    generar_medio(ffmpeg, str(medios / 'clip.mp4'), 2)
+    for nombre, argumentos in (('video.mp4', ['-an']), ('audio.m4a', ['-vn'])):
+        subprocess.run([ffmpeg, '-hide_banner', '-loglevel', 'error', '-i', str(medios / 'clip.mp4'),
+                        *argumentos, '-c', 'copy', os.path.join(servidor.carpeta, nombre)], check=True)
+
+    clase = script.clase_youtube_dl()
+    descargar = clase._descargar
+    tiempos = {}
+
+    def medir(self, name, info, *args, **kwargs):
+        inicio = time.monotonic()
+        try:
+            return descargar(self, name, info, *args, **kwargs)
+        finally:
+            tiempos[info['format_id']] = (inicio, time.monotonic())
+
+    monkeypatch.setattr(clase, '_descargar', medir)
+    # Cada bloque de 64 KiB tarda un poco: las pistas duran lo bastante para solaparse
+    servidor.pausa = lambda: time.sleep(0.02)
+    info = {'id': 'clip', 'title': 'clip', 'extractor': 'generic', 'extractor_key': 'Generic',
+            'webpage_url': servidor.url('clip'), 'formats': [
+                {'format_id': 'v', 'url': servidor.url('video.mp4'), 'ext': 'mp4',
+                 'vcodec': 'avc1.42c00d', 'acodec': 'none', 'protocol': 'http'},
+                {'format_id': 'a', 'url': servidor.url('audio.m4a'), 'ext': 'm4a',
+                 'vcodec': 'none', 'acodec': 'mp4a.40.2', 'protocol': 'http'}]}
+    destino = tmp_path / 'destino'
+    with clase({'format': 'v+a', 'outtmpl': str(destino / '%(id)s.%(ext)s'), 'quiet': True,
+                'no_warnings': True, 'merge_output_format': 'mp4'}) as ydl:
+        ydl.process_ie_result(info, download=True)
+
+    assert os.listdir(destino) == ['clip.mp4']
+    (inicio_v, fin_v), (inicio_a, fin_a) = tiempos['v'], tiempos['a']
+    assert max(inicio_v, inicio_a) < min(fin_v, fin_a)
+    flujos = subprocess.run([ffmpeg, '-hide_banner', '-i', str(destino / 'clip.mp4')],
+                            capture_output=True, text=True).stderr
+    assert 'Video: h264' in flujos and 'Audio: aac' in flujos
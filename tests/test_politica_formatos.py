@@ -0,0 +1,84 @@
+"""Pruebas de la política de formatos para la calidad 'auto'"""
+
+import json
+
+import pytest
+
+import script
+from script import POLITICA_FORMATOS, cargar_politica_formatos, describir_formato, elegir_formato
+
+
+def formato(format_id, altura=None, vcodec='avc1.64001f', acodec='mp4a.40.2', **extra):
+    return {'format_id': format_id, 'url': f'https://x/{format_id}', 'ext': 'mp4',
+            'height': altura, 'vcodec': vcodec, 'acodec': acodec, **extra}
+
+
+INFO = {'duration': 100, 'formats': [
+    formato('18', 360, tbr=500),
+    formato('22', 720, tbr=1500, filesize=20 * 1048576),
+    formato('37', 1080, tbr=4000),
+    formato('38', 2160, tbr=15000),
+    formato('vp9-720', 720, vcodec='vp09.00.40.08', tbr=1200),
+    formato('140', vcodec='none', abr=128),
+    formato('251', vcodec='none', acodec='opus', abr=160),
+    formato('249', vcodec='none', acodec='opus', abr=50),
+    formato('sb0', ext='mhtml', vcodec='none', acodec='none'),
+]}
+
+
+def politica(**cambios):
+    return {**POLITICA_FORMATOS, **cambios}
+
+
+def test_mejor_calidad_dentro_de_los_limites():
+    assert elegir_formato(INFO, 'video', politica=politica()) == '37'
+    assert elegir_formato(INFO, 'video', politica=politica(altura_max=None)) == '38'
+    assert elegir_formato(INFO, 'audio', politica=politica()) == '251'
+    assert elegir_formato(INFO, 'audio', politica=politica(abr_max=130)) == '140'
+
+
+def test_menor_que_cumple_el_minimo():
+    assert elegir_formato(INFO, 'video', politica=politica(objetivo='menor', altura_min=480)) == '22'
+    assert elegir_formato(INFO, 'audio', politica=politica(objetivo='menor', abr_min=100)) == '140'
+
+
+def test_a_igual_calidad_gana_el_codec_preferido():
+    assert elegir_formato(INFO, 'video', politica=politica(altura_max=720)) == '22'
+    preferencia = politica(altura_max=720, codecs_video=['vp09', 'avc1'])
+    assert elegir_formato(INFO, 'video', politica=preferencia) == 'vp9-720'
+
+
+def test_limites_de_tasa_y_tamano():
+    assert elegir_formato(INFO, 'video', politica=politica(tasa_max_kbps=1000)) == '18'
+    # 37 se estima en 4000 kbps * 100 s = 50 MB; 22 declara 20 MB
+    assert elegir_formato(INFO, 'video', politica=politica(tamano_max_mb=30, altura_max=None)) == '22'
+    assert elegir_formato(INFO, 'video', politica=politica(altura_min=4320)) is None
+
+
+def test_presupuesto_de_tiempo_con_la_velocidad_medida(monkeypatch):
+    monkeypatch.setattr(script.registro_metricas, 'velocidad_reciente',
+                        lambda plataforma: 100 * 1024 if plataforma == 'youtube' else None)
+    # 100 KiB/s durante 120 s ≈ 12 MB: solo cabe el de 360p (500 kbps * 100 s ≈ 6 MB)
+    presupuesto = politica(tiempo_max_s=120)
+    assert elegir_formato(INFO, 'video', 'youtube', presupuesto) == '18'
+    assert elegir_formato(INFO, 'video', 'facebook', presupuesto) == '37'
+
+
+def test_cargar_politica(tmp_path, monkeypatch):
+    monkeypatch.setattr(script, 'POLITICA_FORMATOS', dict(POLITICA_FORMATOS))
+    ruta = tmp_path / 'politica.json'
+    ruta.write_text(json.dumps({'objetivo': 'menor', 'altura_min': 720}), encoding='utf-8')
+    cargar_politica_formatos(str(ruta))
+    assert script.POLITICA_FORMATOS['activa']
+    assert script.POLITICA_FORMATOS['altura_min'] == 720
+    assert script.POLITICA_FORMATOS['altura_max'] == 1080
+
+    for contenido in ({'altura': 720}, {'objetivo': 'rapido'}, [1, 2]):
+        ruta.write_text(json.dumps(contenido), encoding='utf-8')
+        with pytest.raises(ValueError):
+            cargar_politica_formatos(str(ruta))
+
+
+def test_describir_formato():
+    assert describir_formato(INFO, '22') == '22, 720p, avc1, ~20.0 MB'
+    assert describir_formato(INFO, '140') == '140, 128 kbps, mp4a'
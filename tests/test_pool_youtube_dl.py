@@ -0,0 +1,69 @@
+"""Pruebas del pool de instancias de YoutubeDL por perfil"""
+
+import threading
+
+from script import PoolYoutubeDL
+
+
+def test_las_instancias_se_reutilizan(youtube_dl_falso):
+    pool = PoolYoutubeDL()
+    with pool.prestar('youtube-video') as primera:
+        pass
+    with pool.prestar('youtube-video') as segunda:
+        pass
+    assert primera is segunda
+    assert youtube_dl_falso.creadas == 1
+
+
+def test_cada_perfil_tiene_sus_instancias(youtube_dl_falso):
+    pool = PoolYoutubeDL()
+    with pool.prestar('youtube-video') as video, pool.prestar('youtube-mp3') as mp3:
+        assert video is not mp3
+    assert mp3.params['postprocessors'][0]['preferredcodec'] == 'mp3'
+
+
+def test_prestamos_simultaneos_usan_instancias_distintas(youtube_dl_falso):
+    pool = PoolYoutubeDL()
+    barrera = threading.Barrier(4)
+    prestadas = []
+
+    def usar():
+        with pool.prestar('facebook') as ydl:
+            prestadas.append(ydl)
+            barrera.wait()
+
+    hilos = [threading.Thread(target=usar) for _ in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert len(set(map(id, prestadas))) == 4
+
+    # Una vez devueltas, ya no hace falta crear más
+    with pool.prestar('facebook'):
+        pass
+    assert youtube_dl_falso.creadas == 4
+
+
+def test_los_ajustes_del_prestamo_se_deshacen(youtube_dl_falso):
+    pool = PoolYoutubeDL()
+    with pool.prestar('youtube-video', outtmpl='/tmp/x.%(ext)s', formato='18', silencioso=True) as ydl:
+        assert ydl.params['outtmpl']['default'] == '/tmp/x.%(ext)s'
+        assert ydl.params['format'] == '18'
+        assert ydl.format_selector == ('selector', '18')
+        assert ydl.params['quiet'] is True
+
+    assert ydl.params['outtmpl']['default'] != '/tmp/x.%(ext)s'
+    assert ydl.params['format'] != '18'
+    assert ydl.format_selector != ('selector', '18')
+    assert ydl.params['quiet'] is not True
+
+
+def test_cerrar_cierra_todas(youtube_dl_falso):
+    pool = PoolYoutubeDL()
+    with pool.prestar('instagram') as ydl:
+        pass
+    pool.cerrar()
+    assert ydl.cerrada
+    with pool.prestar('instagram') as otra:
+        assert otra is not ydl
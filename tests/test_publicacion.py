@@ -0,0 +1,132 @@
+"""Pruebas de la carpeta de preparación y la publicación atómica de archivos"""
+
+import os
+import threading
+import time
+
+import pytest
+
+import script
+from script import (carpeta_preparacion, descartar_preparacion, limpiar_preparaciones_caducadas,
+                    preasignar_archivo, publicar_archivo)
+from conftest import generar_medio
+
+
+def crear(ruta, contenido=b'datos'):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, 'wb') as f:
+        f.write(contenido)
+    return ruta
+
+
+def test_publicar_no_sobrescribe(tmp_path):
+    destino = str(tmp_path)
+    crear(os.path.join(destino, 'video.mp4'), b'anterior')
+    preparacion = carpeta_preparacion(destino, 'clave')
+
+    ruta = publicar_archivo(crear(os.path.join(preparacion, 'video.mp4'), b'nuevo'), destino)
+    assert ruta == os.path.join(destino, 'video (1).mp4')
+    with open(os.path.join(destino, 'video.mp4'), 'rb') as f:
+        assert f.read() == b'anterior'
+    assert not os.path.exists(os.path.join(preparacion, 'video.mp4'))
+
+
+def test_publicar_con_otro_nombre(tmp_path):
+    destino = str(tmp_path)
+    preparacion = carpeta_preparacion(destino, 'clave')
+    ruta = publicar_archivo(crear(os.path.join(preparacion, 'x.mp3')), destino, 'cancion')
+    assert ruta == os.path.join(destino, 'cancion.mp3')
+
+
+def test_publicaciones_simultaneas_con_el_mismo_nombre(tmp_path):
+    destino = str(tmp_path)
+    origenes = [crear(os.path.join(carpeta_preparacion(destino, f"clave{n}"), 'video.mp4'), bytes([n]))
+                for n in range(8)]
+    barrera = threading.Barrier(len(origenes))
+    rutas = []
+
+    def publicar(origen):
+        barrera.wait()
+        rutas.append(publicar_archivo(origen, destino))
+
+    hilos = [threading.Thread(target=publicar, args=(origen,)) for origen in origenes]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert len(set(rutas)) == len(origenes)
+    contenidos = set()
+    for ruta in rutas:
+        with open(ruta, 'rb') as f:
+            contenidos.add(f.read())
+    assert contenidos == {bytes([n]) for n in range(8)}
+
+
+def test_la_preparacion_depende_de_la_clave(tmp_path):
+    destino = str(tmp_path)
+    assert carpeta_preparacion(destino, 'a') == carpeta_preparacion(destino, 'a')
+    assert carpeta_preparacion(destino, 'a') != carpeta_preparacion(destino, 'b')
+    assert os.path.dirname(carpeta_preparacion(destino, 'a')) == os.path.join(destino, '.avd-staging')
+
+
+def test_descartar_la_ultima_preparacion_borra_la_carpeta_oculta(tmp_path):
+    destino = str(tmp_path)
+    primera = carpeta_preparacion(destino, 'a')
+    segunda = carpeta_preparacion(destino, 'b')
+    crear(os.path.join(primera, 'a.part'))
+    crear(os.path.join(segunda, 'b.part'))
+
+    descartar_preparacion(primera)
+    assert not os.path.exists(primera)
+    assert os.path.isdir(segunda)
+
+    descartar_preparacion(segunda)
+    assert os.listdir(destino) == []
+
+
+def test_limpiar_preparaciones_caducadas(tmp_path):
+    base = os.path.join(str(tmp_path), '.avd-staging')
+    vieja = os.path.join(base, 'vieja')
+    nueva = os.path.join(base, 'nueva')
+    crear(os.path.join(vieja, 'a.part'))
+    crear(os.path.join(nueva, 'b.part'))
+    antes = time.time() - script.PUBLICACION['caducidad_s'] - 60
+    os.utime(vieja, (antes, antes))
+
+    limpiar_preparaciones_caducadas(base)
+    assert not os.path.exists(vieja)
+    assert os.path.exists(os.path.join(nueva, 'b.part'))
+
+
+def test_preasignar_reserva_el_tamano(tmp_path):
+    ruta = str(tmp_path / 'archivo.part')
+    with open(ruta, 'wb') as f:
+        preasignar_archivo(f, 3 * 1024 * 1024)
+    assert os.path.getsize(ruta) == 3 * 1024 * 1024
+
+
+def test_descarga_sin_restos_en_el_destino(tmp_path, servidor, yt_dlp, ffmpeg, sin_limites):
+    generar_medio(ffmpeg, os.path.join(servidor.carpeta, 'clip.mp4'), 2)
+    destino = tmp_path / 'destino'
+
+    resultado = script.descargar_con_info(servidor.url('clip.mp4'), 'youtube-video',
+                                          str(destino / 'clip.%(ext)s'), formato='best', silencioso=True)
+    assert resultado['ruta'] == str(destino / 'clip.mp4')
+    assert os.listdir(destino) == ['clip.mp4']
+
+
+def test_audio_en_flujo_a_traves_de_la_preparacion(tmp_path, servidor, yt_dlp, ffmpeg, sin_limites,
+                                                    monkeypatch, capsys):
+    generar_medio(ffmpeg, os.path.join(servidor.carpeta, 'audio.m4a'), 3, video=False)
+    monkeypatch.setitem(script.AUDIO_EN_FLUJO, 'activo', True)
+    destino = tmp_path / 'destino'
+
+    resultado = script.descargar_con_info(servidor.url('audio.m4a'), 'youtube-mp3',
+                                          str(destino / 'audio.%(ext)s'))
+    salida = capsys.readouterr().out
+    assert 'Audio en flujo no disponible' not in salida
+    assert 'convertido en flujo' in salida
+    assert resultado['ruta'] == str(destino / 'audio.mp3')
+    assert os.listdir(destino) == ['audio.mp3']
+    assert os.path.getsize(resultado['ruta']) > 0
@@ -0,0 +1,73 @@
+"""Pruebas del reparto justo max-min ponderado del ancho de banda"""
+
+import time
+
+import pytest
+
+import script
+from script import RepartoAnchoBanda
+
+PRESUPUESTO = 1000000.0
+
+
+@pytest.fixture
+def reparto(monkeypatch):
+    # Una franja que cubre todo el día
+    monkeypatch.setitem(script.ANCHO_BANDA, 'franjas', [(0, 24 * 60, PRESUPUESTO)])
+    return RepartoAnchoBanda()
+
+
+def limitar_a(asignacion, tasa):
+    """Simula una descarga que va a tasa bytes/s sin que la frene su cuota"""
+    asignacion.tasa = tasa
+    asignacion.saturada = False
+    asignacion._actividad = time.monotonic()
+
+
+def test_sin_franjas_no_hay_asignacion(monkeypatch):
+    monkeypatch.setitem(script.ANCHO_BANDA, 'franjas', [])
+    with RepartoAnchoBanda().asignacion() as asignacion:
+        assert asignacion is None
+
+
+def test_reparto_segun_el_peso(reparto):
+    with reparto.asignacion(1.0) as a, reparto.asignacion(3.0) as b:
+        assert a.cuota == pytest.approx(PRESUPUESTO / 4)
+        assert b.cuota == pytest.approx(PRESUPUESTO * 3 / 4)
+
+
+def test_lo_que_no_se_usa_pasa_a_las_demas(reparto):
+    with reparto.asignacion() as lenta, reparto.asignacion() as rapida, reparto.asignacion() as otra:
+        limitar_a(lenta, 100000)
+        reparto.repartir()
+
+        # La lenta se queda con su tasa y un margen; el resto se reparte entre las otras
+        assert lenta.cuota == pytest.approx(125000)
+        assert rapida.cuota == pytest.approx((PRESUPUESTO - 125000) / 2)
+        assert otra.cuota == pytest.approx((PRESUPUESTO - 125000) / 2)
+        assert lenta.cuota + rapida.cuota + otra.cuota == pytest.approx(PRESUPUESTO)
+
+
+def test_si_todas_estan_saciadas_sobra_para_todas(reparto):
+    with reparto.asignacion() as a, reparto.asignacion() as b:
+        limitar_a(a, 100000)
+        limitar_a(b, 200000)
+        reparto.repartir()
+
+        sobrante = PRESUPUESTO - 125000 - 250000
+        assert a.cuota == pytest.approx(125000 + sobrante / 2)
+        assert b.cuota == pytest.approx(250000 + sobrante / 2)
+
+
+def test_al_terminar_una_descarga_se_reparte_su_parte(reparto):
+    with reparto.asignacion() as a:
+        with reparto.asignacion():
+            assert a.cuota == pytest.approx(PRESUPUESTO / 2)
+        assert a.cuota == pytest.approx(PRESUPUESTO)
+
+
+def test_fuera_de_franja_no_hay_limite(reparto, monkeypatch):
+    with reparto.asignacion() as a:
+        monkeypatch.setitem(script.ANCHO_BANDA, 'franjas', [])
+        reparto.repartir()
+        assert a.cuota is None
@@ -0,0 +1,90 @@
+"""Pruebas de la especificación de varias salidas"""
+
+import os
+import threading
+
+import pytest
+
+import script
+from script import (codificar_salidas, completar_publicacion, normalizar_salidas, parsear_salidas,
+                    perfil_de_tipo, rutas_salidas)
+from conftest import generar_medio
+
+
+def test_parsear_salidas():
+    assert parsear_salidas('MP4+mp3@192+wav') == [('mp4', None), ('mp3', '192k'), ('wav', None)]
+    assert parsear_salidas('mp3+mp3@320k') == [('mp3', '320k')]
+    assert normalizar_salidas('wav+mp3') == 'wav+mp3@320k'
+
+
+@pytest.mark.parametrize('especificacion', ['mp4+avi', 'wav@128k', 'mp3@rapido', ''])
+def test_parsear_salidas_invalidas(especificacion):
+    with pytest.raises(ValueError):
+        parsear_salidas(especificacion)
+
+
+def test_rutas_salidas_con_la_misma_extension():
+    salidas = parsear_salidas('mp4+mp3@128k+mp3@320k')
+    assert rutas_salidas('video', salidas) == ['video.mp4', 'video [128k].mp3', 'video [320k].mp3']
+
+
+def test_perfil_de_tipo():
+    assert perfil_de_tipo('audio_mp3') == ('youtube-mp3', None)
+    assert perfil_de_tipo('mp3+wav') == ('youtube-audio', 'mp3@320k+wav')
+    assert perfil_de_tipo('mp4+mp3@192k') == ('youtube-video', 'mp4+mp3@192k')
+
+
+def test_las_salidas_se_codifican_a_la_vez(tmp_path, monkeypatch):
+    carpeta = tmp_path / 'preparacion'
+    carpeta.mkdir()
+    origen = carpeta / 'video.mp4'
+    origen.write_bytes(b'original')
+    # Las dos conversiones tienen que coincidir: en serie la barrera no se abriría
+    barrera = threading.Barrier(2, timeout=5)
+
+    def ejecutar(comando, temporal, destino):
+        barrera.wait()
+        with open(destino, 'wb') as f:
+            f.write(comando[-1].encode())
+
+    monkeypatch.setattr(script, 'ejecutar_ffmpeg', ejecutar)
+    monkeypatch.setattr(os, 'cpu_count', lambda: 4)
+    rutas = codificar_salidas(str(origen), 'mp4+mp3@128k+wav', {})
+
+    assert rutas == [str(carpeta / 'video.mp4'), str(carpeta / 'video.mp3'), str(carpeta / 'video.wav')]
+    # El MP4 es el propio original, sin volver a escribirlo
+    assert origen.read_bytes() == b'original'
+    assert sorted(os.listdir(carpeta)) == ['video.mp3', 'video.mp4', 'video.wav']
+
+
+def test_completar_publicacion_conserva_el_sufijo_de_cada_salida(tmp_path, monkeypatch):
+    monkeypatch.setattr(script, 'archivo_descargas', None)
+    preparacion = tmp_path / 'preparacion'
+    preparacion.mkdir()
+    rutas = [preparacion / 'adelantada [128k].mp3', preparacion / 'adelantada [320k].mp3']
+    for ruta in rutas:
+        ruta.write_bytes(b'audio')
+    destino = tmp_path / 'destino'
+    destino.mkdir()
+
+    resultado = completar_publicacion({
+        'rutas': [str(r) for r in rutas], 'raiz': 'adelantada', 'preparacion': str(preparacion),
+        'plataforma': 'youtube', 'id_video': 'abc', 'clave_perfil': 'youtube-audio', 'url': 'u',
+        'titulo': 'Prueba'}, str(destino), 'cancion')
+    assert resultado['rutas'] == [str(destino / 'cancion [128k].mp3'), str(destino / 'cancion [320k].mp3')]
+    assert resultado['tamano'] == 10
+    assert not preparacion.exists()
+
+
+def test_descarga_real_con_varias_salidas(tmp_path, servidor, yt_dlp, ffmpeg, sin_limites):
+    generar_medio(ffmpeg, os.path.join(servidor.carpeta, 'clip.mp4'), 2)
+    destino = tmp_path / 'destino'
+
+    resultado = script.descargar_con_info(servidor.url('clip.mp4'), 'youtube-video',
+                                          str(destino / 'clip.%(ext)s'), formato='best', silencioso=True,
+                                          salidas='mp4+mp3@128k+wav')
+    # El extractor genérico también lee el archivo; con una descarga por salida serían cuatro copias
+    assert servidor.bytes['clip.mp4'] < 3 * os.path.getsize(os.path.join(servidor.carpeta, 'clip.mp4'))
+    assert resultado['rutas'] == [str(destino / 'clip.mp4'), str(destino / 'clip.mp3'), str(destino / 'clip.wav')]
+    assert sorted(os.listdir(destino)) == ['clip.mp3', 'clip.mp4', 'clip.wav']
+    assert all(os.path.getsize(ruta) > 0 for ruta in resultado['rutas'])
@@ -0,0 +1,126 @@
+"""Pruebas del modo servicio: cola de trabajos y API HTTP/JSON"""
+
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+import script
+from script import MetricasDescarga, ServicioDescargas, crear_servidor_servicio
+
+
+class TrabajosSimulados:
+    """Sustituye ejecutar_trabajo_lote; cada trabajo espera a que se le dé paso"""
+
+    def __init__(self):
+        self.paso = threading.Event()
+        self.ejecutados = []
+
+    def __call__(self, indice, trabajo, carpeta_destino, **_):
+        self.ejecutados.append(trabajo['url'])
+        metricas = MetricasDescarga(trabajo['url'], 'youtube', 'youtube-video')
+        while not self.paso.wait(0.01):
+            # Los avisos de progreso pasan por el observador del servicio
+            metricas.hook_progreso({'status': 'downloading', 'filename': 'v.mp4',
+                                    'downloaded_bytes': 50, 'total_bytes': 100, 'speed': 10.0})
+        if 'fallo' in trabajo['url']:
+            return {'exito': False, 'omitido': False, 'error': 'falló'}
+        return {'exito': True, 'omitido': False, 'ruta': f"{carpeta_destino}/{trabajo['nombre']}.mp4", 'tamano': 100}
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    trabajos = TrabajosSimulados()
+    monkeypatch.setattr(script, 'ejecutar_trabajo_lote', trabajos)
+    servicio = ServicioDescargas(str(tmp_path), trabajadores=1, conservar=2)
+    servidor = crear_servidor_servicio(servicio, '127.0.0.1:0')
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{servidor.server_address[1]}"
+
+    def pedir(metodo, ruta, datos=None):
+        cuerpo = None if datos is None else json.dumps(datos).encode('utf-8')
+        peticion = urllib.request.Request(base + ruta, data=cuerpo, method=metodo)
+        try:
+            with urllib.request.urlopen(peticion) as respuesta:
+                return respuesta.status, json.loads(respuesta.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    yield pedir, trabajos
+    servidor.shutdown()
+    servidor.server_close()
+    trabajos.paso.set()
+    servicio.cerrar()
+
+
+def esperar_estado(pedir, id_trabajo, estados, limite=5):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        trabajo = pedir('GET', f'/trabajos/{id_trabajo}')[1]
+        if trabajo['estado'] in estados:
+            return trabajo
+        time.sleep(0.01)
+    pytest.fail(f"El trabajo {id_trabajo} sigue en {trabajo['estado']}")
+
+
+def test_enviar_y_completar(api):
+    pedir, trabajos = api
+    codigo, trabajo = pedir('POST', '/trabajos', {'url': 'https://youtu.be/aaaaaaaaaaa', 'nombre': 'uno'})
+    assert codigo == 201
+    assert trabajo['estado'] == 'en_cola'
+
+    esperar_estado(pedir, trabajo['id'], ('en_curso',))
+    trabajos.paso.set()
+    terminado = esperar_estado(pedir, trabajo['id'], ('completado',))
+    assert terminado['resultado']['ruta'].endswith('uno.mp4')
+    assert pedir('GET', '/estado')[1] == {'trabajadores': 1, 'trabajos': {'completado': 1}}
+    assert [t['id'] for t in pedir('GET', '/trabajos?estado=completado')[1]] == [trabajo['id']]
+
+
+def test_el_progreso_se_puede_consultar(api):
+    pedir, trabajos = api
+    id_trabajo = pedir('POST', '/trabajos', {'url': 'https://youtu.be/aaaaaaaaaaa'})[1]['id']
+    fin = time.monotonic() + 5
+    while pedir('GET', f'/trabajos/{id_trabajo}')[1]['progreso']['porcentaje'] != 50.0:
+        assert time.monotonic() < fin
+        time.sleep(0.01)
+    trabajos.paso.set()
+
+
+def test_peticiones_no_validas(api):
+    pedir, _ = api
+    assert pedir('POST', '/trabajos', {})[0] == 400
+    assert pedir('POST', '/trabajos', {'url': 'https://vimeo.com/1'})[0] == 400
+    assert pedir('POST', '/trabajos', ['https://youtu.be/aaaaaaaaaaa'])[0] == 400
+    assert pedir('GET', '/trabajos/999999')[0] == 404
+    assert pedir('GET', '/otra')[0] == 404
+
+
+def test_cancelar_en_cola_y_en_curso(api):
+    pedir, trabajos = api
+    primero = pedir('POST', '/trabajos', {'url': 'https://youtu.be/aaaaaaaaaaa'})[1]['id']
+    segundo = pedir('POST', '/trabajos', {'url': 'https://youtu.be/bbbbbbbbbbb'})[1]['id']
+    esperar_estado(pedir, primero, ('en_curso',))
+
+    assert pedir('DELETE', f'/trabajos/{segundo}')[1]['estado'] == 'cancelado'
+    # El trabajo en curso se interrumpe en su siguiente aviso de progreso
+    assert pedir('POST', f'/trabajos/{primero}/cancelar')[0] == 200
+    cancelado = esperar_estado(pedir, primero, ('cancelado', 'completado', 'fallido'))
+    assert cancelado['estado'] == 'cancelado'
+    assert cancelado['error'] is None
+    assert trabajos.ejecutados == ['https://youtu.be/aaaaaaaaaaa']
+
+
+def test_fallidos_y_poda_de_terminados(api):
+    pedir, trabajos = api
+    trabajos.paso.set()
+    ids = [pedir('POST', '/trabajos', {'url': f'https://youtu.be/{url}'})[1]['id']
+           for url in ('aaaaaaaaaaa', 'fallo000000', 'ccccccccccc')]
+    esperar_estado(pedir, ids[2], ('completado',))
+    # Al enviar otro trabajo solo se conservan los dos últimos terminados
+    cuarto = pedir('POST', '/trabajos', {'url': 'https://youtu.be/ddddddddddd'})[1]['id']
+    assert [t['id'] for t in pedir('GET', '/trabajos')[1]] == ids[1:] + [cuarto]
+    assert pedir('GET', f'/trabajos/{ids[1]}')[1]['error'] == 'falló'
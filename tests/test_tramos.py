@@ -0,0 +1,140 @@
+"""Pruebas de los tramos de tiempo y del ajuste de su inicio"""
+
+import os
+import shutil
+import subprocess
+
+import pytest
+
+import script
+from script import (ajustar_inicio_tramo, decodificar_video, etiqueta_tramo, normalizar_tramos,
+                    parsear_tiempo, parsear_tramos, primer_fotograma_clave)
+from conftest import generar_medio
+
+
+@pytest.mark.parametrize('texto, segundos', [
+    ('90', 90.0), ('1:30', 90.0), ('1:02:03.5', 3723.5), (' 0:05 ', 5.0),
+])
+def test_parsear_tiempo(texto, segundos):
+    assert parsear_tiempo(texto) == segundos
+
+
+def test_parsear_tramos_ordena_y_quita_repetidos():
+    assert parsear_tramos('5:00-;1:30-2:00;90-120') == [(90.0, 120.0), (300.0, None)]
+    assert parsear_tramos(['-10', '1:00-1:10']) == [(0.0, 10.0), (60.0, 70.0)]
+    assert parsear_tramos('') == []
+
+
+@pytest.mark.parametrize('especificacion', ['90', '2:00-1:30', '10-10', 'a-b', '1:2:3:4-', '-5:-'])
+def test_parsear_tramos_invalidos(especificacion):
+    with pytest.raises(ValueError):
+        parsear_tramos(especificacion)
+
+
+def test_normalizar_tramos():
+    assert normalizar_tramos(['1:30-2:00.50', '5:00-']) == '90-120.5;300-'
+    assert normalizar_tramos(' ; ') is None
+
+
+def test_etiqueta_tramo():
+    assert etiqueta_tramo(90, 120) == '1m30s-2m00s'
+    assert etiqueta_tramo(120.5, None) == '2m00.5s-fin'
+    assert etiqueta_tramo(3723, 3730) == '1h02m03s-1h02m10s'
+
+
+def test_argumentos_inicio_h264_copian_la_configuracion():
+    argumentos = script.argumentos_inicio_h264({
+        'profile_idc': 66, 'level_idc': 31, 'seq_parameter_set_id': 0, 'entropy_coding_mode_flag': 0,
+        'colour_description_present_flag': 1, 'colour_primaries': 1, 'transfer_characteristics': 1,
+        'matrix_coefficients': 1, 'video_full_range_flag': 0, 'formato': 'yuv420p', 'escala': 90000})
+    assert argumentos[argumentos.index('-profile:v') + 1] == 'baseline'
+    parametros = argumentos[argumentos.index('-x264-params') + 1].split(':')
+    assert {'repeat-headers=1', 'sps-id=1', 'level=31', 'bframes=0', 'cabac=0'} <= set(parametros)
+    assert argumentos[argumentos.index('-color_primaries') + 1] == '1'
+    assert argumentos[argumentos.index('-color_range') + 1] == 'tv'
+    assert argumentos[argumentos.index('-video_track_timescale') + 1] == '90000'
+
+
+def test_argumentos_inicio_h264_respetan_el_retardo_de_reordenacion():
+    argumentos = script.argumentos_inicio_h264({'profile_idc': 100, 'level_idc': 40, 'seq_parameter_set_id': 31,
+                                                'entropy_coding_mode_flag': 1, 'max_num_reorder_frames': 1})
+    parametros = argumentos[argumentos.index('-x264-params') + 1].split(':')
+    assert {'sps-id=0', 'bframes=1', 'b-pyramid=none'} <= set(parametros)
+    assert 'cabac=0' not in parametros
+    assert script.argumentos_inicio_h264({'profile_idc': 88, 'level_idc': 30}) is None
+
+
+def test_contenedor_sin_lista_de_edicion():
+    assert 'webm' in ajustar_inicio_tramo('tramo.webm')
+
+
+@pytest.fixture
+def fuente(tmp_path, ffmpeg):
+    """Video H.264 con B-frames y un fotograma clave cada 2 s, como los de las plataformas"""
+    (tmp_path / 'medios').mkdir()
+    ruta = str(tmp_path / 'medios' / 'fuente.mp4')
+    subprocess.run([ffmpeg, '-hide_banner', '-loglevel', 'error', '-y', '-f', 'lavfi',
+                    '-i', 'testsrc2=size=320x180:rate=25', '-f', 'lavfi', '-i', 'sine=frequency=440',
+                    '-t', '8', '-c:v', 'libx264', '-preset', 'veryfast', '-g', '50', '-sc_threshold', '0',
+                    '-pix_fmt', 'yuv420p', '-c:a', 'aac', ruta], check=True)
+    return ruta
+
+
+def cortar(ffmpeg, fuente, inicio):
+    """Corta un tramo copiando los flujos, como lo hace yt-dlp al descargar tramos"""
+    ruta = os.path.join(os.path.dirname(fuente), f'tramo{inicio}.mp4')
+    subprocess.run([ffmpeg, '-hide_banner', '-loglevel', 'error', '-y', '-ss', str(inicio), '-i', fuente,
+                    '-t', '4', '-c', 'copy', ruta], check=True)
+    return ruta
+
+
+def test_solo_se_recodifica_el_principio(ffmpeg, fuente, monkeypatch):
+    tramo = cortar(ffmpeg, fuente, 1)
+    assert primer_fotograma_clave(tramo)[1] == pytest.approx(1.0)
+    fotogramas, _ = decodificar_video(tramo)
+    # Sin margen para recodificar el tramo entero: el ajuste tiene que salir del empalme
+    monkeypatch.setitem(script.RECORTES, 'max_recodificar_s', 0)
+
+    assert ajustar_inicio_tramo(tramo) is None
+    assert primer_fotograma_clave(tramo)[1] == pytest.approx(0.0)
+    assert decodificar_video(tramo) == (fotogramas, [])
+    assert sorted(os.listdir(os.path.dirname(tramo))) == ['fuente.mp4', 'tramo1.mp4']
+
+
+def test_tramo_que_ya_empieza_en_un_fotograma_clave(ffmpeg, fuente):
+    tramo = cortar(ffmpeg, fuente, 2)
+    copia = tramo + '.orig'
+    shutil.copy(tramo, copia)
+    assert ajustar_inicio_tramo(tramo) is None
+    with open(tramo, 'rb') as a, open(copia, 'rb') as b:
+        assert a.read() == b.read()
+
+
+def test_sin_empalme_se_recodifica_entero(ffmpeg, fuente, monkeypatch):
+    tramo = cortar(ffmpeg, fuente, 1)
+    monkeypatch.setattr(script, 'empalmar_inicio_h264', lambda *a: False)
+    assert ajustar_inicio_tramo(tramo) is None
+    assert primer_fotograma_clave(tramo)[1] == pytest.approx(0.0)
+
+
+def test_sin_empalme_los_tramos_largos_dan_el_motivo(ffmpeg, fuente, monkeypatch):
+    tramo = cortar(ffmpeg, fuente, 1)
+    monkeypatch.setattr(script, 'empalmar_inicio_h264', lambda *a: False)
+    monkeypatch.setitem(script.RECORTES, 'max_recodificar_s', 0)
+    assert 'dura más de 0 s' in ajustar_inicio_tramo(tramo)
+    assert primer_fotograma_clave(tramo)[1] == pytest.approx(1.0)
+
+
+def test_descarga_real_de_un_tramo(tmp_path, servidor, yt_dlp, ffmpeg, sin_limites):
+    generar_medio(ffmpeg, os.path.join(servidor.carpeta, 'largo.mp4'), 30)
+    destino = tmp_path / 'destino'
+
+    resultado = script.descargar_con_info(servidor.url('largo.mp4'), 'youtube-video',
+                                          str(destino / 'largo.%(ext)s'), formato='best', silencioso=True,
+                                          tramos='10-12')
+    assert os.listdir(destino) == ['largo.mp4']
+    # ffmpeg salta con un rango hasta el tramo en lugar de leer el video desde el principio
+    assert any(inicio > 0 for _, inicio, _ in servidor.rangos)
+    assert resultado['tamano'] < os.path.getsize(os.path.join(servidor.carpeta, 'largo.mp4')) / 5
+    assert decodificar_video(resultado['ruta']) == (50, [])
+    assert primer_fotograma_clave(resultado['ruta'])[1] == pytest.approx(0.0)
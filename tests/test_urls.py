@@ -0,0 +1,53 @@
+"""Pruebas de la clasificación y deduplicación de URLs sin red"""
+
+import pytest
+
+from script import clasificar_url, clasificar_urls, deduplicar_urls
+
+CANONICA = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+
+
+@pytest.mark.parametrize('url, tipo', [
+    ('https://youtu.be/dQw4w9WgXcQ', 'video'),
+    ('https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=30', 'video'),
+    ('https://music.youtube.com/watch?v=dQw4w9WgXcQ', 'video'),
+    ('https://m.youtube.com/shorts/dQw4w9WgXcQ', 'short'),
+    ('  https://youtu.be/dQw4w9WgXcQ  ', 'video'),
+])
+def test_formas_de_un_video_de_youtube(url, tipo):
+    assert clasificar_url(url) == ('youtube', tipo, 'dQw4w9WgXcQ', CANONICA)
+
+
+def test_reels_y_posts_de_instagram_comparten_url():
+    reel = clasificar_url('https://www.instagram.com/reel/Cxyz123/')
+    post = clasificar_url('https://instagr.am/p/Cxyz123/')
+    assert (reel.tipo, post.tipo) == ('reel', 'post')
+    assert reel.url_canonica == post.url_canonica == 'https://www.instagram.com/p/Cxyz123/'
+
+
+def test_urls_sin_id():
+    corta = clasificar_url('https://fb.watch/abc/')
+    assert (corta.plataforma, corta.id_canonico, corta.url_canonica) == ('facebook', None, 'https://fb.watch/abc/')
+
+    ajena = clasificar_url(' https://example.com/v ')
+    assert ajena == ('desconocida', 'desconocido', None, 'https://example.com/v')
+
+
+def test_clasificar_urls_conserva_el_orden():
+    urls = ['https://youtu.be/dQw4w9WgXcQ', 'https://example.com/v', 'https://youtu.be/dQw4w9WgXcQ']
+    assert clasificar_urls(urls) == [clasificar_url(url) for url in urls]
+
+
+def test_deduplicar_urls():
+    urls = [
+        'https://youtu.be/dQw4w9WgXcQ',
+        'https://www.youtube.com/shorts/dQw4w9WgXcQ',
+        'https://www.youtube.com/playlist?list=dQw4w9WgXcQ',
+        'https://fb.watch/abc/',
+        'https://fb.watch/abc/',
+    ]
+    unicas, duplicadas = deduplicar_urls(iter(urls))
+
+    # Una lista con el mismo id que un video es otro contenido
+    assert [url for url, _ in unicas] == [urls[0], urls[2], urls[3]]
+    assert duplicadas == {urls[1]: urls[0], urls[4]: urls[3]}